@@ -0,0 +1,140 @@
+"""
+Approximate nearest-neighbour index selection for per-video indexes.
+
+A flat index scans every vector: exact, but memory and query time grow linearly with the
+number of chunks. Above INDEX_ANN_MIN_VECTORS a FAISS index-factory string is used instead:
+
+    auto            Flat below INDEX_ANN_MIN_VECTORS, HNSW32 up to INDEX_IVF_MIN_VECTORS,
+                    IVF{nlist},PQ{m}x4fs (4-bit fast-scan PQ, quick to train) above that
+    Flat / HNSW32 / IVF1024,PQ64 / ...
+                    any faiss.index_factory string; `{nlist}` (~4 sqrt(n) lists) and `{m}`
+                    (~8 dims per sub-quantizer) are filled in, e.g. "IVF{nlist},PQ{m}"
+
+INDEX_ANN_STORAGE compresses the stored vectors of Flat / HNSW indexes: "float32" (as is),
+"float16" (SQfp16, half the bytes) or "sq8" (8-bit scalar quantizer, a quarter). IVF,PQ
+indexes are already compressed. Trained index types are trained on the video's own vectors.
+
+PQ distances are approximate; memory-mapped indexes re-rank the ANN candidates exactly
+against their full vectors (INDEX_ANN_RERANK), which recovers most of the lost recall.
+"""
+
+from __future__ import annotations
+
+import math
+
+import faiss
+import numpy as np
+
+ANN_FILE = "ann.faiss"
+STORAGE_SUFFIX = {"float32": "", "float16": "SQfp16", "sq8": "SQ8"}
+# Vectors sampled for training IVF centroids / PQ codebooks.
+_MAX_TRAINING_VECTORS = 100_000
+# faiss wants ~39 training points per centroid; fewer make k-means degenerate.
+_POINTS_PER_CENTROID = 39
+
+
+def _ivf_nlist(count: int) -> int:
+    """~4 * sqrt(n) inverted lists (a power of two), with enough points per list to train"""
+    nlist = 2 ** int(round(math.log2(max(1.0, 4 * math.sqrt(count)))))
+    return max(1, min(nlist, count // _POINTS_PER_CENTROID))
+
+
+def _pq_m(dim: int) -> int:
+    """PQ sub-quantizers: ~8 dims each, and must divide `dim`"""
+    m = max(1, dim // 8)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def resolve_factory(
+    setting: str,
+    count: int,
+    dim: int,
+    storage: str = "float32",
+    ann_min_vectors: int = 5000,
+    ivf_min_vectors: int = 200_000,
+) -> str:
+    """The faiss index-factory string to use for `count` vectors of `dim` dimensions"""
+    if storage not in STORAGE_SUFFIX:
+        raise ValueError(f"Unsupported INDEX_ANN_STORAGE {storage!r}; expected one of {tuple(STORAGE_SUFFIX)}")
+    setting = (setting or "auto").strip()
+    if count < ann_min_vectors:
+        # Small indexes: an exact scan is already fast and needs no training.
+        factory = "Flat"
+    elif setting.lower() == "auto":
+        factory = "HNSW32" if count < ivf_min_vectors else "IVF{nlist},PQ{m}x4fs"
+    else:
+        factory = setting
+    factory = factory.format(nlist=_ivf_nlist(count), m=_pq_m(dim))
+
+    suffix = STORAGE_SUFFIX[storage]
+    if suffix and factory == "Flat":
+        return suffix
+    if suffix and factory.startswith("HNSW") and "," not in factory:
+        return f"{factory},{suffix}"
+    return factory
+
+
+def build_index(vectors: np.ndarray, factory: str, seed: int = 0):
+    """Build (and train if needed) a faiss index over `vectors`; ids are row positions"""
+    matrix = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32))
+    index = faiss.index_factory(int(matrix.shape[1]), factory, faiss.METRIC_L2)
+    if not index.is_trained:
+        sample = matrix
+        if len(matrix) > _MAX_TRAINING_VECTORS:
+            rows = np.random.default_rng(seed).choice(len(matrix), _MAX_TRAINING_VECTORS, replace=False)
+            sample = matrix[np.sort(rows)]
+        index.train(sample)
+    index.add(matrix)
+    return index
+
+
+def configure_search(index, nprobe: int, ef_search: int) -> None:
+    """Apply query-time accuracy knobs that the index type supports"""
+    params = faiss.ParameterSpace()
+    if faiss.try_extract_index_ivf(index) is not None:
+        params.set_index_parameter(index, "nprobe", int(nprobe))
+    if "HNSW" in type(index).__name__:
+        params.set_index_parameter(index, "efSearch", int(ef_search))
+
+
+def read_index(path: str, nprobe: int, ef_search: int):
+    index = faiss.read_index(path)
+    configure_search(index, nprobe, ef_search)
+    return index
+
+
+def write_index(index, path: str) -> None:
+    faiss.write_index(index, path)
+
+
+def reconstruct_all(index) -> np.ndarray:
+    """All stored vectors in id order (decoded, so approximate for SQ / PQ indexes)"""
+    if not index.ntotal:
+        return np.zeros((0, index.d), dtype=np.float32)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # IVF lists are keyed by id only through a direct map, which is not saved with the index.
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def index_bytes(index) -> int:
+    """
+    Estimated in-memory size of a faiss index, from its counts and code sizes rather than a
+    serialized copy (which costs as much memory and time as the index itself).
+    """
+    index = faiss.downcast_index(index)
+    ntotal = int(index.ntotal)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # Codes plus a 64-bit id per vector in the inverted lists, plus the coarse quantizer.
+        return ntotal * (int(ivf.code_size) + 8) + index_bytes(ivf.quantizer)
+    if isinstance(index, faiss.IndexHNSW):
+        # 2M level-0 links, ~1 upper-level link per vector on average, and level / offset tables.
+        links = int(index.hnsw.nb_neighbors(0)) + 1
+        return ntotal * (links * 4 + 12) + index_bytes(index.storage)
+    if isinstance(index, faiss.IndexFlatCodes):
+        return ntotal * int(index.code_size)
+    return ntotal * int(index.d) * 4
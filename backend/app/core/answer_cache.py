@@ -0,0 +1,176 @@
+"""
+Per-video answer cache for repeated questions.
+
+Two lookup layers, both scoped to one video:
+1. Exact: normalized question text (case, punctuation and whitespace folded).
+2. Semantic: cosine similarity of question embeddings above a threshold, served from a
+   small per-video FAISS inner-product index of past questions.
+
+Entries expire after a TTL and each video keeps at most N entries (LRU). The whole
+video's cache is dropped when its index is rebuilt.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+
+def normalize_question(question: str) -> str:
+    text = re.sub(r"[^\w\s]", " ", (question or "").lower())
+    return " ".join(text.split())
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    sources: List[Dict] = field(default_factory=list)
+    vector_id: Optional[int] = None
+    created_at: float = field(default_factory=time.time)
+    hits: int = 0
+
+
+class _VideoAnswers:
+    def __init__(self):
+        self.entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self.index: Optional[faiss.IndexIDMap2] = None
+        self.by_vector_id: Dict[int, str] = {}
+        self.next_id = 0
+
+    def remove(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is None or entry.vector_id is None:
+            return
+        self.by_vector_id.pop(entry.vector_id, None)
+        if self.index is not None:
+            self.index.remove_ids(np.array([entry.vector_id], dtype=np.int64))
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    arr = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+    norm = np.linalg.norm(arr)
+    return arr / norm if norm else arr
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        ttl_seconds: int = 86400,
+        max_entries_per_video: int = 256,
+        max_videos: int = 1024,
+    ):
+        self.similarity_threshold = float(similarity_threshold)
+        self.ttl_seconds = int(ttl_seconds)
+        self.max_entries_per_video = max(1, int(max_entries_per_video))
+        self.max_videos = max(1, int(max_videos))
+        self._videos: "OrderedDict[str, _VideoAnswers]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.similarity_threshold > 0
+
+    def _expired(self, entry: CachedAnswer) -> bool:
+        return bool(self.ttl_seconds) and time.time() - entry.created_at > self.ttl_seconds
+
+    def _touch(self, video: _VideoAnswers, key: str) -> Optional[CachedAnswer]:
+        entry = video.entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry):
+            video.remove(key)
+            return None
+        entry.hits += 1
+        video.entries.move_to_end(key)
+        return entry
+
+    def lookup_exact(self, video_id: str, question: str) -> Optional[CachedAnswer]:
+        with self._lock:
+            video = self._videos.get(video_id)
+            entry = self._touch(video, normalize_question(question)) if video else None
+            if entry is not None:
+                self.exact_hits += 1
+            elif not self.semantic_enabled:
+                self.misses += 1
+            return entry
+
+    def lookup_similar(self, video_id: str, vector: List[float]) -> Optional[Tuple[CachedAnswer, float]]:
+        """Nearest past question for this video if its cosine similarity clears the threshold"""
+        with self._lock:
+            video = self._videos.get(video_id)
+            if video is None or video.index is None or video.index.ntotal == 0:
+                self.misses += 1
+                return None
+            scores, ids = video.index.search(_unit(vector), 1)
+            score, vector_id = float(scores[0][0]), int(ids[0][0])
+            key = video.by_vector_id.get(vector_id)
+            entry = self._touch(video, key) if key is not None and score >= self.similarity_threshold else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.semantic_hits += 1
+            return entry, score
+
+    def put(
+        self,
+        video_id: str,
+        question: str,
+        answer: str,
+        vector: Optional[List[float]] = None,
+        sources: Optional[List[Dict]] = None,
+    ) -> None:
+        key = normalize_question(question)
+        with self._lock:
+            video = self._videos.get(video_id)
+            if video is None:
+                video = self._videos[video_id] = _VideoAnswers()
+                while len(self._videos) > self.max_videos:
+                    self._videos.popitem(last=False)
+            self._videos.move_to_end(video_id)
+
+            video.remove(key)
+            entry = CachedAnswer(question=question, answer=answer, sources=list(sources or []))
+            if vector is not None and self.semantic_enabled:
+                unit = _unit(vector)
+                if video.index is None:
+                    video.index = faiss.IndexIDMap2(faiss.IndexFlatIP(unit.shape[1]))
+                if video.index.d == unit.shape[1]:
+                    entry.vector_id = video.next_id
+                    video.next_id += 1
+                    video.index.add_with_ids(unit, np.array([entry.vector_id], dtype=np.int64))
+                    video.by_vector_id[entry.vector_id] = key
+            video.entries[key] = entry
+
+            while len(video.entries) > self.max_entries_per_video:
+                video.remove(next(iter(video.entries)))
+
+    def invalidate(self, video_id: str) -> None:
+        with self._lock:
+            if self._videos.pop(video_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "videos": len(self._videos),
+                "entries": sum(len(v.entries) for v in self._videos.values()),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": ((self.exact_hits + self.semantic_hits) / lookups) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,160 @@
+"""
+Embedding and LLM backends, selected by EMBEDDING_BACKEND / LLM_BACKEND.
+
+- "openai": `OpenAIEmbeddings` / `ChatOpenAI` (needs OPENAI_API_KEY).
+- "fake": local, deterministic stand-ins for load tests, benchmarks and offline development.
+  `FakeEmbeddings` hashes words into a fixed-size bag-of-words vector (identical texts get
+  identical vectors, texts sharing words are similar, so retrieval still behaves sensibly);
+  `FakeChatModel` answers with a fixed string after FAKE_LLM_LATENCY_SECONDS and streams it
+  word by word, FAKE_LLM_TOKEN_LATENCY_SECONDS apart.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import math
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from app.core.config import settings
+
+OPENAI = "openai"
+FAKE = "fake"
+BACKENDS = (OPENAI, FAKE)
+
+_TOKEN_RE = re.compile(r"\S+\s*")
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic hashed bag-of-words embeddings with a fixed per-call latency"""
+
+    def __init__(self, dim: int = 256, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+
+    def _vector(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+        for token in text.lower().split():
+            h = int(hashlib.md5(token.encode()).hexdigest(), 16)
+            vec[h % self.dim] += 1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._vector(text)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Answers with `answer` after `latency` seconds (time to first token); streamed answers
+    arrive one word at a time, `token_latency` seconds apart.
+    """
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+    answer: str = "This is a fake answer produced for testing and benchmarking."
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _tokens(self) -> List[str]:
+        return _TOKEN_RE.findall(self.answer) or [self.answer]
+
+    def _total_latency(self) -> float:
+        return self.latency + self.token_latency * max(0, len(self._tokens()) - 1)
+
+    def _result(self) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._total_latency())
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._total_latency())
+        return self._result()
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for i, token in enumerate(self._tokens()):
+            time.sleep(self.latency if i == 0 else self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        for i, token in enumerate(self._tokens()):
+            await asyncio.sleep(self.latency if i == 0 else self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def _backend(name: str, value: str) -> str:
+    backend = (value or OPENAI).strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"{name} must be one of {', '.join(BACKENDS)} (got {value!r})")
+    return backend
+
+
+def _openai_api_key() -> str:
+    api_key = (settings.OPENAI_API_KEY or "").strip()
+    if not api_key:
+        raise ValueError(
+            "OPENAI_API_KEY is not set. Create a `.env` file in `backend/` (or set an env var) "
+            "with OPENAI_API_KEY=... then restart the backend."
+        )
+    return api_key
+
+
+def embedding_model_name() -> str:
+    """Model name that keys the embedding cache (fake vectors must never mix with real ones)"""
+    if _backend("EMBEDDING_BACKEND", settings.EMBEDDING_BACKEND) == FAKE:
+        return f"fake-hash-{settings.FAKE_EMBEDDING_DIM}"
+    return settings.EMBEDDING_MODEL
+
+
+def build_embeddings() -> Embeddings:
+    if _backend("EMBEDDING_BACKEND", settings.EMBEDDING_BACKEND) == FAKE:
+        return FakeEmbeddings(dim=settings.FAKE_EMBEDDING_DIM, latency=settings.FAKE_EMBEDDING_LATENCY_SECONDS)
+    from langchain_openai import OpenAIEmbeddings
+
+    # Prefer explicit key over relying on environment propagation.
+    return OpenAIEmbeddings(model=settings.EMBEDDING_MODEL, api_key=_openai_api_key())
+
+
+def build_llm() -> BaseChatModel:
+    if _backend("LLM_BACKEND", settings.LLM_BACKEND) == FAKE:
+        return FakeChatModel(
+            latency=settings.FAKE_LLM_LATENCY_SECONDS,
+            token_latency=settings.FAKE_LLM_TOKEN_LATENCY_SECONDS,
+        )
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(model=settings.LLM_MODEL, temperature=settings.LLM_TEMPERATURE, api_key=_openai_api_key())
@@ -0,0 +1,196 @@
+"""
+Building blocks for bulk (batch / playlist) ingestion.
+
+- `RateLimiter`: async token bucket shared by all transcript fetches of a batch, so a
+  course or channel is fetched concurrently without hammering YouTube.
+- `EmbeddingBatcher`: collects the chunk texts of many videos being ingested at once and
+  embeds them in requests of up to EMBEDDING_BATCH_SIZE texts, instead of one or more
+  small requests per video.
+- `PlaylistSource`: resolves a playlist id to video ids. `YouTubePlaylistSource` reads the
+  public playlist page; other sources (an API client, a fixed catalogue) plug in by
+  implementing `list_video_ids`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from app.core import metrics
+
+_PLAYLIST_ID_RE = re.compile(r"^[A-Za-z0-9_-]{13,64}$")
+_PAGE_VIDEO_ID_RE = re.compile(r'"videoId":"([A-Za-z0-9_-]{11})"')
+
+
+def extract_playlist_id(value: str) -> Optional[str]:
+    """Playlist id from a playlist URL (`...?list=ID`) or a bare id; None for anything else"""
+    value = (value or "").strip()
+    if "://" in value or value.startswith(("www.", "youtube.com", "m.youtube.com")):
+        parsed = urlparse(value if "://" in value else f"https://{value}")
+        ids = parse_qs(parsed.query).get("list")
+        # `watch?v=...&list=...` links a single video (played inside a playlist).
+        if ids and "v" not in parse_qs(parsed.query):
+            return ids[0]
+        return None
+    if _PLAYLIST_ID_RE.match(value) and value[:2] in ("PL", "UU", "LL", "FL", "OL", "RD"):
+        return value
+    return None
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second on average, bursts up to `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+
+@dataclass
+class _EmbedRequest:
+    texts: List[str]
+    future: asyncio.Future
+    vectors: List[Optional[List[float]]] = field(default_factory=list)
+    remaining: int = 0
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent `embed(texts)` calls into requests of up to `batch_size` texts.
+    A partial batch is sent after `linger` seconds without reaching the size.
+    A failed request fails every caller with texts in it.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], Awaitable[List[List[float]]]],
+        batch_size: int = 256,
+        linger: float = 0.5,
+    ):
+        self._embed = embed
+        self.batch_size = max(1, int(batch_size))
+        self.linger = float(linger)
+        self._pending: List[tuple] = []  # (request, position in request.texts)
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self.requests = 0
+        self.texts = 0
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        request = _EmbedRequest(texts=list(texts), future=loop.create_future())
+        request.vectors = [None] * len(texts)
+        request.remaining = len(texts)
+        self._pending.extend((request, i) for i in range(len(texts)))
+        while len(self._pending) >= self.batch_size:
+            self._flush()
+        if self._pending and self._timer is None:
+            self._timer = loop.call_later(self.linger, self._flush_all)
+        return await request.future
+
+    def _flush_all(self) -> None:
+        self._timer = None
+        while self._pending:
+            self._flush()
+
+    def _flush(self) -> None:
+        batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+        if not self._pending and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        task = asyncio.ensure_future(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[tuple]) -> None:
+        self.requests += 1
+        self.texts += len(batch)
+        metrics.observe_size("embedding", len(batch))
+        try:
+            with metrics.stage("embedding"):
+                vectors = await self._embed([request.texts[i] for request, i in batch])
+        except Exception as e:
+            for request, _ in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        for (request, i), vector in zip(batch, vectors):
+            if request.future.done():
+                continue
+            request.vectors[i] = vector
+            request.remaining -= 1
+            if request.remaining == 0:
+                request.future.set_result(request.vectors)
+
+
+class PlaylistSource:
+    """Resolves a playlist id to its video ids, in playlist order"""
+
+    async def list_video_ids(self, playlist_id: str) -> List[str]:
+        raise NotImplementedError
+
+
+class StaticPlaylistSource(PlaylistSource):
+    """Fixed playlist -> video ids mapping (catalogues kept in config, tests, benchmarks)"""
+
+    def __init__(self, playlists: Dict[str, List[str]]):
+        self._playlists = playlists
+
+    async def list_video_ids(self, playlist_id: str) -> List[str]:
+        if playlist_id not in self._playlists:
+            raise ValueError(f"Unknown playlist {playlist_id}")
+        return list(self._playlists[playlist_id])
+
+
+class YouTubePlaylistSource(PlaylistSource):
+    """
+    Video ids from the public playlist page (first page only, ~100 videos, as served
+    without an API key). Uses the same proxy as transcript fetching when one is configured.
+    """
+
+    URL = "https://www.youtube.com/playlist"
+
+    def __init__(self, proxy_url: Optional[str] = None, timeout: float = 15.0):
+        self._proxies = {"https": proxy_url, "http": proxy_url} if proxy_url else None
+        self._timeout = timeout
+
+    def _fetch(self, playlist_id: str) -> List[str]:
+        response = requests.get(
+            self.URL,
+            params={"list": playlist_id},
+            headers={"Accept-Language": "en-US,en;q=0.9", "User-Agent": "Mozilla/5.0"},
+            proxies=self._proxies,
+            timeout=self._timeout,
+        )
+        if response.status_code != 200:
+            raise ValueError(f"Could not load playlist {playlist_id} (HTTP {response.status_code})")
+        video_ids = list(dict.fromkeys(_PAGE_VIDEO_ID_RE.findall(response.text)))
+        if not video_ids:
+            raise ValueError(f"Playlist {playlist_id} is empty, private or unavailable")
+        return video_ids
+
+    async def list_video_ids(self, playlist_id: str) -> List[str]:
+        return await asyncio.to_thread(self._fetch, playlist_id)
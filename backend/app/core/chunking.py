@@ -0,0 +1,97 @@
+"""
+Timestamp-aware chunking of timed transcript segments.
+
+Segments are packed in order until the next one would exceed the token budget (measured
+with the same tiktoken encoder used for quota counting). Each chunk records where it sits
+in the video:
+
+    metadata = {"chunk_index": int, "start": seconds, "end": seconds, "tokens": int}
+
+Consecutive chunks share up to `overlap_tokens` worth of trailing segments.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+from langchain_core.documents import Document
+
+from app.core.quota import TokenCounter
+
+
+class SegmentChunker:
+    def __init__(self, counter: TokenCounter, max_tokens: int = 256, overlap_tokens: int = 32):
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        self._counter = counter
+        self.max_tokens = int(max_tokens)
+        self.overlap_tokens = max(0, min(int(overlap_tokens), self.max_tokens // 2))
+
+    def _pieces(self, segments: List[Dict]) -> List[Tuple[str, float, float, int]]:
+        """(text, start, end, tokens) per segment; oversized segments are split on word boundaries"""
+        pieces: List[Tuple[str, float, float, int]] = []
+        for seg in segments:
+            text = " ".join((seg.get("text") or "").split())
+            if not text:
+                continue
+            start = float(seg.get("start", 0.0))
+            end = start + float(seg.get("duration", 0.0))
+            tokens = self._counter.count(text)
+            if tokens <= self.max_tokens:
+                pieces.append((text, start, end, tokens))
+                continue
+
+            # Rare: one caption longer than the budget. Split by words, spreading time evenly.
+            words = text.split()
+            parts: List[str] = []
+            current: List[str] = []
+            for word in words:
+                if current and self._counter.count(" ".join(current + [word])) > self.max_tokens:
+                    parts.append(" ".join(current))
+                    current = []
+                current.append(word)
+            if current:
+                parts.append(" ".join(current))
+            step = (end - start) / len(parts)
+            for i, part in enumerate(parts):
+                pieces.append((part, start + i * step, start + (i + 1) * step, self._counter.count(part)))
+        return pieces
+
+    def split(self, segments: List[Dict]) -> List[Document]:
+        pieces = self._pieces(segments)
+        docs: List[Document] = []
+        window: List[Tuple[str, float, float, int]] = []
+        window_tokens = 0
+
+        def emit() -> None:
+            docs.append(
+                Document(
+                    page_content=" ".join(p[0] for p in window),
+                    metadata={
+                        "chunk_index": len(docs),
+                        "start": round(window[0][1], 3),
+                        "end": round(window[-1][2], 3),
+                        "tokens": window_tokens,
+                    },
+                )
+            )
+
+        for piece in pieces:
+            if window and window_tokens + piece[3] > self.max_tokens:
+                emit()
+                # Carry trailing pieces into the next chunk as overlap.
+                carried: List[Tuple[str, float, float, int]] = []
+                carried_tokens = 0
+                for prev in reversed(window):
+                    if carried_tokens + prev[3] > self.overlap_tokens or carried_tokens + prev[3] + piece[3] > self.max_tokens:
+                        break
+                    carried.insert(0, prev)
+                    carried_tokens += prev[3]
+                window, window_tokens = carried, carried_tokens
+            window.append(piece)
+            window_tokens += piece[3]
+
+        # The last piece appended is never part of an emitted chunk yet.
+        if window:
+            emit()
+        return docs
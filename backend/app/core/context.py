@@ -0,0 +1,148 @@
+"""
+Token-budgeted context assembly for the RAG prompt.
+
+Instead of joining a fixed top-k, the assembler takes a larger ranked candidate list and:
+1. drops near-duplicates (word-shingle Jaccard similarity against chunks already chosen),
+2. adds candidates in rank order while the assembled context fits the token budget,
+3. merges adjacent / overlapping chunks (consecutive `chunk_index` within the same
+   `video_id`) so overlap text is sent once, and orders blocks chronologically.
+
+Token counts before and after are returned so savings can be reported per request.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set
+
+from langchain_core.documents import Document
+
+from app.core.quota import TokenCounter
+
+_SHINGLE = 3
+# Longest word overlap considered when stitching adjacent chunks.
+_MAX_STITCH_WORDS = 400
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    docs: List[Document]
+    baseline_tokens: int
+    context_tokens: int
+    candidates: int
+    selected: int
+    duplicates_dropped: int
+
+    def usage(self) -> Dict[str, int]:
+        return {
+            "baseline_tokens": self.baseline_tokens,
+            "context_tokens": self.context_tokens,
+            "saved_tokens": max(0, self.baseline_tokens - self.context_tokens),
+            "candidates": self.candidates,
+            "selected": self.selected,
+            "blocks": len(self.docs),
+            "duplicates_dropped": self.duplicates_dropped,
+        }
+
+
+def _shingles(text: str) -> Set[str]:
+    words = text.lower().split()
+    if len(words) < _SHINGLE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + _SHINGLE]) for i in range(len(words) - _SHINGLE + 1)}
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _stitch(left: str, right: str) -> str:
+    """Join two adjacent chunks, dropping the words `right` repeats from the end of `left`"""
+    lw, rw = left.split(), right.split()
+    for n in range(min(len(lw), len(rw), _MAX_STITCH_WORDS), 0, -1):
+        if lw[-n:] == rw[:n]:
+            return " ".join(lw + rw[n:])
+    return " ".join(lw + rw)
+
+
+def _merge_adjacent(docs: List[Document]) -> List[Document]:
+    """Merge runs of consecutive chunks; docs without `chunk_index` are kept as-is in rank order"""
+    indexed = sorted(
+        (d for d in docs if d.metadata.get("chunk_index") is not None),
+        key=lambda d: (d.metadata.get("video_id") or "", d.metadata["chunk_index"]),
+    )
+    others = [d for d in docs if d.metadata.get("chunk_index") is None]
+
+    blocks: List[Document] = []
+    last_key: Optional[tuple] = None
+    for doc in indexed:
+        video_id, idx = doc.metadata.get("video_id"), doc.metadata["chunk_index"]
+        if blocks and last_key == (video_id, idx - 1):
+            prev = blocks[-1]
+            blocks[-1] = Document(
+                page_content=_stitch(prev.page_content, doc.page_content),
+                metadata={**prev.metadata, "end": doc.metadata.get("end", prev.metadata.get("end"))},
+            )
+        else:
+            blocks.append(Document(page_content=doc.page_content, metadata=dict(doc.metadata)))
+        last_key = (video_id, idx)
+    return blocks + others
+
+
+def render_plain(docs: List[Document]) -> str:
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+class ContextAssembler:
+    def __init__(
+        self,
+        counter: TokenCounter,
+        token_budget: int,
+        dedup_threshold: float = 0.8,
+        render: Callable[[List[Document]], str] = render_plain,
+    ):
+        self._counter = counter
+        self.token_budget = int(token_budget)
+        self.dedup_threshold = float(dedup_threshold)
+        # Turns blocks into prompt text; the budget is measured on the rendered text (labels included).
+        self._render = render
+
+    def assemble(self, ranked: List[Document], baseline_k: int) -> AssembledContext:
+        """
+        `ranked` is the candidate list, best first. `baseline_k` is the fixed top-k the
+        plain concatenation would have sent, used for the before/after token comparison.
+        """
+        baseline_tokens = self._counter.count(self._render(ranked[:baseline_k]))
+
+        chosen: List[Document] = []
+        chosen_shingles: List[Set[str]] = []
+        duplicates = 0
+        blocks: List[Document] = []
+        tokens = 0
+
+        for doc in ranked:
+            sh = _shingles(doc.page_content)
+            if any(_jaccard(sh, other) >= self.dedup_threshold for other in chosen_shingles):
+                duplicates += 1
+                continue
+            trial_blocks = _merge_adjacent(chosen + [doc])
+            trial_tokens = self._counter.count(self._render(trial_blocks))
+            # Always keep the best hit, even if it alone exceeds the budget.
+            if chosen and trial_tokens > self.token_budget:
+                continue
+            chosen.append(doc)
+            chosen_shingles.append(sh)
+            blocks, tokens = trial_blocks, trial_tokens
+
+        return AssembledContext(
+            text=self._render(blocks),
+            docs=blocks,
+            baseline_tokens=baseline_tokens,
+            context_tokens=tokens,
+            candidates=len(ranked),
+            selected=len(chosen),
+            duplicates_dropped=duplicates,
+        )
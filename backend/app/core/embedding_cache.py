@@ -0,0 +1,176 @@
+"""
+Content-addressed embedding cache so identical chunks are never re-embedded.
+
+- Key: (embedding model, sha256(chunk text)).
+- Storage: SQLite with float32 vector blobs (persists next to the vector stores).
+- Lookups and writes are batched; only cache misses reach the underlying embeddings.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# SQLite's default max host parameters is 999; stay well below it per query.
+_SQL_BATCH = 500
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCacheStore:
+    def __init__(self, db_path: str):
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        # One connection for the store's lifetime, shared by all threads under `_lock`.
+        self._conn = self._connect()
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self._db_path), exist_ok=True)
+        return sqlite3.connect(self._db_path, check_same_thread=False, timeout=30)
+
+    def _init_db(self) -> None:
+        with self._lock:
+            conn = self._conn
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                  model TEXT NOT NULL,
+                  text_hash TEXT NOT NULL,
+                  dim INTEGER NOT NULL,
+                  vector BLOB NOT NULL,
+                  created_at INTEGER NOT NULL,
+                  PRIMARY KEY (model, text_hash)
+                )
+                """
+            )
+            conn.commit()
+
+    def get_many(self, model: str, hashes: Sequence[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        if not hashes:
+            return found
+        with self._lock:
+            conn = self._conn
+            for offset in range(0, len(hashes), _SQL_BATCH):
+                batch = list(hashes[offset:offset + _SQL_BATCH])
+                placeholders = ",".join("?" for _ in batch)
+                cur = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    (model, *batch),
+                )
+                for h, blob in cur.fetchall():
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, model: str, items: Iterable[Tuple[str, List[float]]]) -> None:
+        now = int(time.time())
+        rows = [
+            (model, h, len(vec), np.asarray(vec, dtype=np.float32).tobytes(), now)
+            for h, vec in items
+        ]
+        if not rows:
+            return
+        with self._lock:
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an `Embeddings` instance; document embeddings go through the cache, queries pass through"""
+
+    def __init__(self, underlying: Embeddings, store: EmbeddingCacheStore, model_name: str):
+        self.underlying = underlying
+        self.store = store
+        self.model_name = model_name
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _plan(self, texts: List[str]) -> Tuple[List[str], List[str]]:
+        """Return (hash per text, unique hashes)"""
+        hashes = [text_hash(t) for t in texts]
+        return hashes, list(dict.fromkeys(hashes))
+
+    def _record(self, hits: int, misses: int) -> None:
+        with self._stats_lock:
+            self.hits += hits
+            self.misses += misses
+
+    def _assemble(
+        self,
+        texts: List[str],
+        hashes: List[str],
+        cached: Dict[str, List[float]],
+    ) -> Tuple[List[str], List[str]]:
+        """Unique texts (and their hashes) that still need embedding"""
+        miss_hashes: List[str] = []
+        miss_texts: List[str] = []
+        seen = set()
+        for text, h in zip(texts, hashes):
+            if h in cached or h in seen:
+                continue
+            seen.add(h)
+            miss_hashes.append(h)
+            miss_texts.append(text)
+        return miss_hashes, miss_texts
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, unique = self._plan(texts)
+        cached = self.store.get_many(self.model_name, unique)
+        miss_hashes, miss_texts = self._assemble(texts, hashes, cached)
+        if miss_texts:
+            fresh = self.underlying.embed_documents(miss_texts)
+            self.store.put_many(self.model_name, zip(miss_hashes, fresh))
+            cached.update(zip(miss_hashes, fresh))
+        self._record(hits=len(texts) - len(miss_texts), misses=len(miss_texts))
+        return [cached[h] for h in hashes]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, unique = self._plan(texts)
+        cached = await asyncio.to_thread(self.store.get_many, self.model_name, unique)
+        miss_hashes, miss_texts = self._assemble(texts, hashes, cached)
+        if miss_texts:
+            fresh = await self.underlying.aembed_documents(miss_texts)
+            await asyncio.to_thread(self.store.put_many, self.model_name, list(zip(miss_hashes, fresh)))
+            cached.update(zip(miss_hashes, fresh))
+        self._record(hits=len(texts) - len(miss_texts), misses=len(miss_texts))
+        return [cached[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.underlying.aembed_query(text)
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
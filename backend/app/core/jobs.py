@@ -0,0 +1,302 @@
+"""
+Background ingestion jobs for video processing.
+
+- Queue: persistent SQLite table shared by every worker process on VECTOR_STORE_DIR.
+- Workers: a bounded pool of asyncio tasks claiming jobs oldest-first. A claimed job carries its
+  owner (`locked_by`) and a lease (`lease_expires_at`) the owner renews while it runs; jobs whose
+  lease ran out (the owner crashed or was stopped) are re-queued, on boot and while idle. Jobs
+  other live processes are running are left alone.
+- Status: stage (queued/loading/fetching/chunking/embedding/saving/done), progress 0..1, error.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, asdict
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+
+@dataclass(frozen=True)
+class Job:
+    job_id: str
+    video_id: str
+    status: str
+    stage: str
+    progress: float
+    error: Optional[str]
+    created_at: int
+    updated_at: int
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class JobStore:
+    _COLUMNS = "job_id, video_id, status, stage, progress, error, created_at, updated_at"
+
+    def __init__(self, db_path: str, lease_seconds: float = 60.0):
+        self._db_path = db_path
+        self.lease_seconds = float(lease_seconds)
+        self._lock = threading.Lock()
+        # One connection for the store's lifetime, shared by all threads under `_lock`; using it as
+        # a context manager still commits or rolls back each block.
+        self._conn = self._connect()
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self._db_path), exist_ok=True)
+        return sqlite3.connect(self._db_path, check_same_thread=False, timeout=30)
+
+    def _init_db(self) -> None:
+        with self._lock, self._conn as conn:
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ingest_jobs (
+                  job_id TEXT PRIMARY KEY,
+                  video_id TEXT NOT NULL,
+                  status TEXT NOT NULL,
+                  stage TEXT NOT NULL,
+                  progress REAL NOT NULL DEFAULT 0,
+                  error TEXT,
+                  created_at INTEGER NOT NULL,
+                  updated_at INTEGER NOT NULL
+                )
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(ingest_jobs)")}
+            # Databases created before leases existed.
+            if "locked_by" not in columns:
+                conn.execute("ALTER TABLE ingest_jobs ADD COLUMN locked_by TEXT")
+            if "lease_expires_at" not in columns:
+                conn.execute("ALTER TABLE ingest_jobs ADD COLUMN lease_expires_at REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS ingest_jobs_status ON ingest_jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ingest_jobs_video ON ingest_jobs (video_id, created_at)")
+            conn.commit()
+
+    @staticmethod
+    def _row_to_job(row) -> Optional[Job]:
+        if not row:
+            return None
+        return Job(
+            job_id=row[0],
+            video_id=row[1],
+            status=row[2],
+            stage=row[3],
+            progress=float(row[4]),
+            error=row[5],
+            created_at=int(row[6]),
+            updated_at=int(row[7]),
+        )
+
+    def create(self, video_id: str) -> Job:
+        """Create a queued job, or return the video's already-active job"""
+        now = int(time.time())
+        with self._lock, self._conn as conn:
+            cur = conn.execute(
+                f"SELECT {self._COLUMNS} FROM ingest_jobs WHERE video_id = ? AND status IN (?, ?) "
+                "ORDER BY created_at LIMIT 1",
+                (video_id, *ACTIVE_STATUSES),
+            )
+            existing = self._row_to_job(cur.fetchone())
+            if existing:
+                return existing
+            job = Job(
+                job_id=uuid.uuid4().hex,
+                video_id=video_id,
+                status=STATUS_QUEUED,
+                stage=STATUS_QUEUED,
+                progress=0.0,
+                error=None,
+                created_at=now,
+                updated_at=now,
+            )
+            conn.execute(
+                f"INSERT INTO ingest_jobs ({self._COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.job_id, job.video_id, job.status, job.stage, job.progress, job.error, job.created_at, job.updated_at),
+            )
+            conn.commit()
+            return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock, self._conn as conn:
+            cur = conn.execute(f"SELECT {self._COLUMNS} FROM ingest_jobs WHERE job_id = ?", (job_id,))
+            return self._row_to_job(cur.fetchone())
+
+    def latest_for_video(self, video_id: str) -> Optional[Job]:
+        with self._lock, self._conn as conn:
+            cur = conn.execute(
+                f"SELECT {self._COLUMNS} FROM ingest_jobs WHERE video_id = ? ORDER BY created_at DESC LIMIT 1",
+                (video_id,),
+            )
+            return self._row_to_job(cur.fetchone())
+
+    def claim_next(self, owner: str) -> Optional[Job]:
+        """Atomically move the oldest queued job to running, leased to `owner`"""
+        now = int(time.time())
+        with self._lock, self._conn as conn:
+            cur = conn.execute(
+                f"SELECT {self._COLUMNS} FROM ingest_jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (STATUS_QUEUED,),
+            )
+            job = self._row_to_job(cur.fetchone())
+            if job is None:
+                return None
+            cur = conn.execute(
+                "UPDATE ingest_jobs SET status = ?, updated_at = ?, locked_by = ?, lease_expires_at = ? "
+                "WHERE job_id = ? AND status = ?",
+                (STATUS_RUNNING, now, owner, time.time() + self.lease_seconds, job.job_id, STATUS_QUEUED),
+            )
+            conn.commit()
+            if cur.rowcount != 1:
+                # Claimed by another worker process between the SELECT and the UPDATE.
+                return None
+            return Job(**{**job.to_dict(), "status": STATUS_RUNNING, "updated_at": now})
+
+    def update(
+        self,
+        job_id: str,
+        status: Optional[str] = None,
+        stage: Optional[str] = None,
+        progress: Optional[float] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        fields: List[str] = ["updated_at = ?"]
+        values: list = [int(time.time())]
+        for name, value in (("status", status), ("stage", stage), ("progress", progress), ("error", error)):
+            if value is not None:
+                fields.append(f"{name} = ?")
+                values.append(value)
+        with self._lock, self._conn as conn:
+            conn.execute(f"UPDATE ingest_jobs SET {', '.join(fields)} WHERE job_id = ?", (*values, job_id))
+            conn.commit()
+
+    def renew_lease(self, job_id: str, owner: str) -> bool:
+        """Extend `owner`'s lease on a running job; False if the job is no longer theirs"""
+        with self._lock, self._conn as conn:
+            cur = conn.execute(
+                "UPDATE ingest_jobs SET lease_expires_at = ? WHERE job_id = ? AND status = ? AND locked_by = ?",
+                (time.time() + self.lease_seconds, job_id, STATUS_RUNNING, owner),
+            )
+            conn.commit()
+            return cur.rowcount == 1
+
+    def requeue_expired(self) -> int:
+        """Running jobs whose owner stopped renewing the lease are queued again"""
+        with self._lock, self._conn as conn:
+            cur = conn.execute(
+                "UPDATE ingest_jobs SET status = ?, stage = ?, progress = 0, updated_at = ?, locked_by = NULL, "
+                "lease_expires_at = NULL WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (STATUS_QUEUED, STATUS_QUEUED, int(time.time()), STATUS_RUNNING, time.time()),
+            )
+            conn.commit()
+            return cur.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+ProgressCallback = Callable[[str, float], Awaitable[None]]
+JobRunner = Callable[[str, ProgressCallback], Awaitable[object]]
+
+
+class JobQueue:
+    """Bounded pool of asyncio workers draining a `JobStore`"""
+
+    def __init__(self, store: JobStore, runner: JobRunner, workers: int = 2, poll_interval: float = 1.0):
+        self.store = store
+        self._runner = runner
+        self._workers = max(1, int(workers))
+        self._poll_interval = poll_interval
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        # Lease owner for the jobs this queue claims: unique per process (and per queue).
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._next_sweep = 0.0
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        await self._requeue_expired()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self._workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, video_id: str) -> Job:
+        job = await asyncio.to_thread(self.store.create, video_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def _wait_for_work(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _requeue_expired(self) -> None:
+        self._next_sweep = time.monotonic() + self.store.lease_seconds
+        requeued = await asyncio.to_thread(self.store.requeue_expired)
+        if requeued:
+            logger.info("Re-queued %d ingestion job(s) whose worker stopped renewing its lease", requeued)
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await asyncio.to_thread(self.store.claim_next, self.owner)
+            if job is None:
+                # Idle: pick up jobs of workers that died without a restart of this process.
+                if time.monotonic() >= self._next_sweep:
+                    await self._requeue_expired()
+                await self._wait_for_work()
+                continue
+            await self._run(job)
+
+    async def _heartbeat(self, job: Job) -> None:
+        """Renew the job's lease well before it runs out"""
+        while True:
+            await asyncio.sleep(self.store.lease_seconds / 3)
+            if not await asyncio.to_thread(self.store.renew_lease, job.job_id, self.owner):
+                logger.warning("Lost the lease on ingestion job %s for %s", job.job_id, job.video_id)
+                return
+
+    async def _run(self, job: Job) -> None:
+        async def progress(stage: str, fraction: float) -> None:
+            await asyncio.to_thread(self.store.update, job.job_id, stage=stage, progress=round(fraction, 4))
+
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            await self._runner(job.video_id, progress)
+        except asyncio.CancelledError:
+            # Shutdown mid-job: leave it running; once the lease runs out it is re-queued.
+            raise
+        except Exception as e:
+            logger.warning("Ingestion job %s for %s failed: %s", job.job_id, job.video_id, e)
+            await asyncio.to_thread(self.store.update, job.job_id, status=STATUS_FAILED, stage="failed", error=str(e))
+        else:
+            await asyncio.to_thread(
+                self.store.update, job.job_id, status=STATUS_SUCCEEDED, stage="done", progress=1.0
+            )
+        finally:
+            heartbeat.cancel()
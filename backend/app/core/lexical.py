@@ -0,0 +1,118 @@
+"""
+Per-video lexical (BM25) index and rank fusion for hybrid retrieval.
+
+Vector search handles paraphrases, but misses exact names, numbers, jargon and quoted
+phrases that transcripts are full of. BM25 over the same chunks catches those; the two
+rankings are merged with weighted reciprocal rank fusion (RRF):
+
+    score(chunk) = sum over rankings r of  weight_r / (rrf_k + rank_r(chunk))
+
+Chunk ids are positions in the video's index, so both rankings refer to the same chunks.
+The index is built at ingestion time and stored next to the vectors as gzip JSON.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import math
+import os
+import re
+import tempfile
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LEXICAL_FILE = "bm25.json.gz"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# Function words only; numbers and short tokens like "ai" / "3d" are kept on purpose.
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i if in into is it its me my "
+    "of on or our she so that the their them then there these they this to was we were what "
+    "when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, postings: Dict[str, List[Tuple[int, int]]], doc_lengths: List[int], k1: float = 1.5, b: float = 0.75):
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.k1 = float(k1)
+        self.b = float(b)
+        self.avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    @classmethod
+    def build(cls, texts: Sequence[str], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        doc_lengths: List[int] = []
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append((doc_id, tf))
+        return cls(dict(postings), doc_lengths, k1=k1, b=b)
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        n = len(self.doc_lengths)
+        return math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Top-k (chunk id, BM25 score), best first; chunks sharing no query term are omitted"""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for doc_id, tf in postings:
+                norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[doc_id] / (self.avg_length or 1.0))
+                scores[doc_id] += idf * tf * (self.k1 + 1.0) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:k]
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path) or "."
+        fd, tmp_path = tempfile.mkstemp(prefix=".bm25.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+                payload = {"k1": self.k1, "b": self.b, "doc_lengths": self.doc_lengths, "postings": self.postings}
+                gz.write(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        """None if missing or unreadable (the caller rebuilds from chunk text)"""
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        postings = {term: [(int(d), int(tf)) for d, tf in entries] for term, entries in data["postings"].items()}
+        return cls(postings, [int(n) for n in data["doc_lengths"]], k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]],
+    weights: Sequence[float],
+    rrf_k: int = 60,
+) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists (best first) into one (id, score) list, best first"""
+    fused: Dict[int, float] = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        if weight <= 0:
+            continue
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] += weight / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda item: (-item[1], item[0]))
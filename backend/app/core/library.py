@@ -0,0 +1,426 @@
+"""
+Global library index: one vector index across every processed video.
+
+- Vectors: append-only raw float32 file in `library/` (`vectors.f32`, `vectors-{n}.f32` after
+  compactions); each chunk records its row in the file.
+- Metadata: SQLite `library/library.sqlite3` (video_id, chunk_index, start, end, text, row per
+  chunk). SQLite is the source of truth: rows without a live metadata entry are ignored.
+- Search: in-memory FAISS `IndexIDMap2` loaded on first use; queries can be restricted to a
+  subset of videos with an `IDSelectorBatch` over those videos' ids.
+- Updates: when a video is (re)built its new rows are appended and its old rows tombstoned
+  (a video evicted from disk only has its rows tombstoned).
+  Every change bumps a sequence number; workers poll it and apply only the delta (new rows
+  and newly removed ids), so other workers' additions show up without a reload.
+- Compaction: once tombstoned rows make up `compact_threshold` of the vectors file (and after
+  storage GC evicts videos), the live rows are copied to a new file, tombstoned chunks are
+  deleted and the surviving chunks point at their new rows. Chunk ids never change, so other
+  workers' in-memory indexes stay valid until they reload at their next refresh.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+from app.core.manifest import IndexLocks
+
+logger = logging.getLogger(__name__)
+
+_LOCK_KEY = "library"
+_VECTORS_FILE = "vectors.f32"
+# Rows copied per read / write while compacting.
+_COMPACT_BATCH = 65536
+
+
+class LibraryIndex:
+    def __init__(
+        self,
+        base_dir: str,
+        locks: IndexLocks,
+        refresh_interval: float = 5.0,
+        compact_threshold: float = 0.25,
+    ):
+        self._dir = Path(base_dir) / "library"
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._locks = locks
+        self._refresh_interval = refresh_interval
+        self.compact_threshold = float(compact_threshold)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self._dir / "library.sqlite3"), check_same_thread=False, timeout=30, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._init_db()
+
+        self._index: Optional[faiss.IndexIDMap2] = None
+        self._dim: Optional[int] = None
+        self._max_id = -1
+        self._seq = 0
+        self._epoch = 0
+        self._refreshed_at = 0.0
+        self.compactions = 0
+        # Live row ids per video, for filtered search.
+        self._video_rows: Dict[str, np.ndarray] = {}
+
+    def _init_db(self) -> None:
+        with self._lock:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS library_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS library_chunks (
+                  id INTEGER PRIMARY KEY,
+                  video_id TEXT NOT NULL,
+                  chunk_index INTEGER,
+                  start REAL,
+                  end REAL,
+                  text TEXT NOT NULL,
+                  removed_seq INTEGER
+                )
+                """
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(library_chunks)")}
+            # Libraries created before compaction: NULL means the row equals the id.
+            if "row" not in columns:
+                self._conn.execute("ALTER TABLE library_chunks ADD COLUMN row INTEGER")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS library_chunks_video ON library_chunks (video_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS library_chunks_removed ON library_chunks (removed_seq)")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS library_videos (
+                  video_id TEXT PRIMARY KEY,
+                  version INTEGER,
+                  chunks INTEGER NOT NULL,
+                  updated_at INTEGER NOT NULL
+                )
+                """
+            )
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM library_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value) -> None:
+        self._conn.execute(
+            "INSERT INTO library_meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value)),
+        )
+
+    def _vectors_path(self) -> Path:
+        """The current vectors file (callers hold `self._lock`)"""
+        return self._dir / (self._meta("vectors_file") or _VECTORS_FILE)
+
+    def _next_id(self) -> int:
+        """First unused chunk id; ids are never reused, even after compaction deleted the highest"""
+        top = self._conn.execute("SELECT COALESCE(MAX(id), -1) + 1 FROM library_chunks").fetchone()[0]
+        return max(int(self._meta("next_id") or 0), int(top))
+
+    # -- writes -------------------------------------------------------------------
+
+    def add_video(
+        self,
+        video_id: str,
+        texts: Sequence[str],
+        vectors,
+        metadatas: Sequence[Dict],
+        version: Optional[int] = None,
+    ) -> int:
+        """Replace a video's rows with a new set; returns the number of rows added"""
+        matrix = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32))
+        if matrix.ndim != 2 or len(matrix) != len(texts):
+            raise ValueError("vectors must be a (len(texts), dim) matrix")
+        with self._locks.io(_LOCK_KEY, exclusive=True), self._lock:
+            dim = self._meta("dim")
+            if dim is None:
+                self._set_meta("dim", matrix.shape[1])
+            elif int(dim) != matrix.shape[1]:
+                raise ValueError(
+                    f"Library index holds {dim}-dim vectors but {video_id} has {matrix.shape[1]}; "
+                    "rebuild the library after changing EMBEDDING_MODEL"
+                )
+            row_bytes = matrix.shape[1] * 4
+            path = self._vectors_path()
+            size = path.stat().st_size if path.exists() else 0
+            # Skip any partial row left by an interrupted append.
+            first_row = -(-size // row_bytes)
+            first_id = self._next_id()
+            with open(path, "ab") as f:
+                if first_row * row_bytes != size:
+                    f.write(b"\0" * (first_row * row_bytes - size))
+                f.write(matrix.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                seq = int(self._meta("seq") or 0) + 1
+                self._conn.execute(
+                    "UPDATE library_chunks SET removed_seq = ? WHERE video_id = ? AND removed_seq IS NULL",
+                    (seq, video_id),
+                )
+                self._conn.executemany(
+                    "INSERT INTO library_chunks (id, video_id, chunk_index, start, end, text, row) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            first_id + i, video_id, meta.get("chunk_index", i), meta.get("start"), meta.get("end"),
+                            text, first_row + i,
+                        )
+                        for i, (text, meta) in enumerate(zip(texts, metadatas))
+                    ],
+                )
+                self._set_meta("next_id", first_id + len(texts))
+                self._conn.execute(
+                    """
+                    INSERT INTO library_videos (video_id, version, chunks, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(video_id) DO UPDATE SET
+                      version = excluded.version, chunks = excluded.chunks, updated_at = excluded.updated_at
+                    """,
+                    (video_id, version, len(texts), int(time.time())),
+                )
+                self._set_meta("seq", seq)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        # Workers that have not searched yet load everything on first search instead.
+        if self._index is not None:
+            self.refresh(force=True)
+        self.compact(self.compact_threshold)
+        return len(texts)
+
+    def remove_video(self, video_id: str) -> int:
+        """Tombstone a video's rows (e.g. evicted from disk); returns the number of rows removed"""
+        with self._locks.io(_LOCK_KEY, exclusive=True), self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                seq = int(self._meta("seq") or 0) + 1
+                removed = self._conn.execute(
+                    "UPDATE library_chunks SET removed_seq = ? WHERE video_id = ? AND removed_seq IS NULL",
+                    (seq, video_id),
+                ).rowcount
+                self._conn.execute("DELETE FROM library_videos WHERE video_id = ?", (video_id,))
+                if removed:
+                    self._set_meta("seq", seq)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if removed and self._index is not None:
+            self.refresh(force=True)
+        if removed:
+            self.compact(self.compact_threshold)
+        return removed
+
+    def reset(self) -> None:
+        """Drop everything (e.g. before a backfill with a new embedding model)"""
+        with self._locks.io(_LOCK_KEY, exclusive=True), self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM library_chunks")
+                self._conn.execute("DELETE FROM library_videos")
+                self._conn.execute("DELETE FROM library_meta")
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            for path in self._dir.glob("vectors*.f32"):
+                path.unlink(missing_ok=True)
+            self._index, self._dim, self._max_id, self._seq, self._epoch = None, None, -1, 0, 0
+            self._video_rows = {}
+
+    def dead_fraction(self) -> float:
+        """Share of the vectors file taken by rows no live chunk points at"""
+        with self._lock:
+            return self._dead_rows()[1]
+
+    def _dead_rows(self) -> Tuple[int, float]:
+        dim = self._meta("dim")
+        path = self._vectors_path()
+        if dim is None or not path.exists():
+            return 0, 0.0
+        file_rows = path.stat().st_size // (int(dim) * 4)
+        live = self._conn.execute("SELECT COUNT(*) FROM library_chunks WHERE removed_seq IS NULL").fetchone()[0]
+        dead = max(0, file_rows - int(live))
+        return dead, dead / file_rows if file_rows else 0.0
+
+    def compact(self, min_dead_fraction: float = 0.0) -> int:
+        """
+        Rewrite the vectors file with live rows only and delete tombstoned chunks, if at least
+        `min_dead_fraction` of the file is dead; returns the number of rows dropped
+        """
+        with self._locks.io(_LOCK_KEY, exclusive=True), self._lock:
+            dead, fraction = self._dead_rows()
+            if not dead or fraction < min_dead_fraction:
+                return 0
+            dim = int(self._meta("dim"))
+            old_path = self._vectors_path()
+            epoch = int(self._meta("epoch") or 0) + 1
+            new_path = self._dir / f"vectors-{epoch}.f32"
+            live = self._conn.execute(
+                "SELECT id, COALESCE(row, id) FROM library_chunks WHERE removed_seq IS NULL ORDER BY id"
+            ).fetchall()
+            file_rows = old_path.stat().st_size // (dim * 4)
+            source = np.memmap(old_path, dtype=np.float32, mode="r", shape=(file_rows, dim)) if file_rows else None
+            try:
+                with open(new_path, "wb") as f:
+                    for offset in range(0, len(live), _COMPACT_BATCH):
+                        rows = np.array([r[1] for r in live[offset:offset + _COMPACT_BATCH]], dtype=np.int64)
+                        f.write(np.ascontiguousarray(source[rows]).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                del source
+
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.execute("DELETE FROM library_chunks WHERE removed_seq IS NOT NULL")
+                    self._conn.executemany(
+                        "UPDATE library_chunks SET row = ? WHERE id = ?",
+                        [(new_row, r[0]) for new_row, r in enumerate(live)],
+                    )
+                    self._set_meta("next_id", self._next_id())
+                    self._set_meta("vectors_file", new_path.name)
+                    self._set_meta("epoch", epoch)
+                    self._set_meta("seq", int(self._meta("seq") or 0) + 1)
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            except BaseException:
+                new_path.unlink(missing_ok=True)
+                raise
+            # Earlier files, including any left by a compaction that failed before its commit.
+            for path in self._dir.glob("vectors*.f32"):
+                if path != new_path:
+                    path.unlink(missing_ok=True)
+            # Give the deleted chunks' pages back to the filesystem, and empty the WAL they went through.
+            self._conn.execute("VACUUM")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.compactions += 1
+        logger.info("Compacted the library index: %d dead rows dropped, %d live", dead, len(live))
+        if self._index is not None:
+            self.refresh(force=True)
+        return dead
+
+    # -- reads --------------------------------------------------------------------
+
+    def refresh(self, force: bool = False) -> None:
+        """Apply rows added / removed (by any worker) since the last refresh"""
+        now = time.monotonic()
+        if not force and now - self._refreshed_at < self._refresh_interval:
+            return
+        with self._locks.io(_LOCK_KEY), self._lock:
+            self._refreshed_at = now
+            seq = int(self._meta("seq") or 0)
+            if seq == self._seq and self._index is not None:
+                return
+            dim = self._meta("dim")
+            if dim is None:
+                return
+            epoch = int(self._meta("epoch") or 0)
+            # A compaction deleted tombstoned chunks, so the removals since `self._seq` cannot be
+            # replayed: reload everything.
+            if self._index is None or self._dim != int(dim) or self._epoch != epoch:
+                self._dim = int(dim)
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatL2(self._dim))
+                self._max_id, self._seq, self._epoch, self._video_rows = -1, 0, epoch, {}
+
+            removed = self._conn.execute(
+                "SELECT id, video_id FROM library_chunks WHERE removed_seq > ? AND id <= ?",
+                (self._seq, self._max_id),
+            ).fetchall()
+            if removed:
+                ids = np.array([r[0] for r in removed], dtype=np.int64)
+                self._index.remove_ids(ids)
+                gone = set(ids.tolist())
+                for video_id in {r[1] for r in removed}:
+                    rows = self._video_rows.get(video_id)
+                    if rows is not None:
+                        kept = np.array([i for i in rows.tolist() if i not in gone], dtype=np.int64)
+                        if len(kept):
+                            self._video_rows[video_id] = kept
+                        else:
+                            self._video_rows.pop(video_id, None)
+
+            added = self._conn.execute(
+                "SELECT id, video_id, COALESCE(row, id) FROM library_chunks WHERE id > ? AND removed_seq IS NULL "
+                "ORDER BY id",
+                (self._max_id,),
+            ).fetchall()
+            if added:
+                ids = np.array([r[0] for r in added], dtype=np.int64)
+                file_rows = np.array([r[2] for r in added], dtype=np.int64)
+                vectors = np.memmap(
+                    self._vectors_path(), dtype=np.float32, mode="r", shape=(int(file_rows.max()) + 1, self._dim)
+                )
+                self._index.add_with_ids(np.ascontiguousarray(vectors[file_rows]), ids)
+                del vectors
+                by_video: Dict[str, List[int]] = {}
+                for row_id, video_id, _ in added:
+                    by_video.setdefault(video_id, []).append(row_id)
+                for video_id, video_ids in by_video.items():
+                    existing = self._video_rows.get(video_id)
+                    new = np.array(video_ids, dtype=np.int64)
+                    self._video_rows[video_id] = new if existing is None else np.concatenate([existing, new])
+                self._max_id = int(ids.max())
+            self._seq = seq
+
+    def video_ids(self) -> List[str]:
+        self.refresh()
+        with self._lock:
+            return sorted(self._video_rows)
+
+    def search(self, vector: Sequence[float], k: int, video_ids: Optional[Sequence[str]] = None) -> List[Tuple[int, float]]:
+        """Top-k (row id, squared L2 distance), optionally restricted to `video_ids`"""
+        self.refresh()
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0:
+                return []
+            query = np.asarray([vector], dtype=np.float32)
+            if query.shape[1] != self._dim:
+                raise ValueError(f"Query dimension {query.shape[1]} does not match library dimension {self._dim}")
+            params = None
+            if video_ids is not None:
+                rows = [self._video_rows[v] for v in video_ids if v in self._video_rows]
+                if not rows:
+                    return []
+                selector = faiss.IDSelectorBatch(np.concatenate(rows))
+                params = faiss.SearchParameters(sel=selector)
+            distances, ids = self._index.search(query, int(k), params=params)
+        return [(int(i), float(d)) for i, d in zip(ids[0], distances[0]) if i >= 0]
+
+    def documents(self, ids: Sequence[int]) -> List[Document]:
+        """Chunk text + metadata for row ids, in the given order"""
+        if not ids:
+            return []
+        placeholders = ",".join("?" for _ in ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, video_id, chunk_index, start, end, text FROM library_chunks WHERE id IN ({placeholders})",
+                [int(i) for i in ids],
+            ).fetchall()
+        by_id = {
+            r[0]: Document(
+                page_content=r[5],
+                metadata={"video_id": r[1], "chunk_index": r[2], "start": r[3], "end": r[4]},
+            )
+            for r in rows
+        }
+        return [by_id[i] for i in ids if i in by_id]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "videos": len(self._video_rows),
+                "vectors": int(self._index.ntotal) if self._index is not None else 0,
+                "dim": self._dim or 0,
+                "compactions": self.compactions,
+            }
@@ -0,0 +1,307 @@
+"""
+Cross-worker coordination for the indexes in a shared VECTOR_STORE_DIR.
+
+- Manifest: SQLite table with a version per video, bumped every time an index is saved.
+  Workers remember the version they loaded and reload when the manifest moves on, so an
+  index rebuilt by one uvicorn worker / pod is picked up by all of them. Each row also records
+  the index and transcript size on disk, the last access and the build parameters, which the
+  storage manager (`app.core.storage`) uses for usage reports and eviction.
+- Locks: per-video `flock` files under `locks/{shard}/`.
+  - build lock (exclusive): one worker fetches + embeds a video; the others wait, then load.
+  - io lock (shared for reads, exclusive for writes): a reader never pairs a new `.pkl`
+    with an old `.faiss` while the pair is being replaced.
+
+`fcntl` is POSIX-only; on other platforms the locks are no-ops (single-process dev setups).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from app.core.storage import shard
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Columns added after the first release; created on open when missing.
+_EXTRA_COLUMNS = (
+    ("index_bytes", "INTEGER"),
+    ("transcript_bytes", "INTEGER"),
+    ("last_access", "INTEGER"),
+    ("params", "TEXT"),
+)
+
+
+@dataclass
+class ManifestEntry:
+    video_id: str
+    version: int
+    updated_at: int
+    # Unix time of the last query / load (None until the first recorded access).
+    last_access: Optional[int] = None
+    index_bytes: Optional[int] = None
+    transcript_bytes: Optional[int] = None
+    # Build parameters: format, embedding model, chunking, dtype, index type, chunks, dim.
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def bytes(self) -> int:
+        return (self.index_bytes or 0) + (self.transcript_bytes or 0)
+
+    @property
+    def accessed_at(self) -> int:
+        return self.last_access or self.updated_at
+
+
+class IndexManifest:
+    def __init__(self, db_path: str):
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self._db_path), exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE.
+        self._conn = sqlite3.connect(self._db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        with self._lock:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS index_manifest (
+                  video_id TEXT PRIMARY KEY,
+                  version INTEGER NOT NULL,
+                  updated_at INTEGER NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS manifest_meta (key TEXT PRIMARY KEY, value TEXT)")
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(index_manifest)")}
+            for name, kind in _EXTRA_COLUMNS:
+                if name not in columns:
+                    try:
+                        self._conn.execute(f"ALTER TABLE index_manifest ADD COLUMN {name} {kind}")
+                    except sqlite3.OperationalError:
+                        # Another worker added it first.
+                        pass
+
+    def version(self, video_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM index_manifest WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        return int(row[0]) if row else None
+
+    def bump(
+        self,
+        video_id: str,
+        index_bytes: Optional[int] = None,
+        transcript_bytes: Optional[int] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """Record a newly saved index (and its size / build parameters); returns its version"""
+        now = int(time.time())
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    """
+                    INSERT INTO index_manifest
+                      (video_id, version, updated_at, last_access, index_bytes, transcript_bytes, params)
+                    VALUES (?, 1, ?, ?, ?, ?, ?)
+                    ON CONFLICT(video_id) DO UPDATE SET
+                      version = version + 1, updated_at = excluded.updated_at, last_access = excluded.last_access,
+                      index_bytes = excluded.index_bytes, transcript_bytes = excluded.transcript_bytes,
+                      params = excluded.params
+                    """,
+                    (video_id, now, now, index_bytes, transcript_bytes, _dump(params)),
+                )
+                row = self._conn.execute(
+                    "SELECT version FROM index_manifest WHERE video_id = ?", (video_id,)
+                ).fetchone()
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return int(row[0])
+
+    def describe(
+        self,
+        video_id: str,
+        index_bytes: Optional[int],
+        transcript_bytes: Optional[int],
+        params: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Update sizes / build parameters without a new version (format migration, backfill).
+        Indexes saved before the manifest existed get a row at version 0.
+        """
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO index_manifest
+                  (video_id, version, updated_at, index_bytes, transcript_bytes, params)
+                VALUES (?, 0, ?, ?, ?, ?)
+                ON CONFLICT(video_id) DO UPDATE SET
+                  index_bytes = excluded.index_bytes, transcript_bytes = excluded.transcript_bytes,
+                  params = COALESCE(excluded.params, params)
+                """,
+                (video_id, int(time.time()), index_bytes, transcript_bytes, _dump(params)),
+            )
+
+    def touch_many(self, accessed: Dict[str, int]) -> None:
+        """Record last-access times {video_id: unix time} (buffered by the caller)"""
+        if not accessed:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE index_manifest SET last_access = MAX(COALESCE(last_access, 0), ?) WHERE video_id = ?",
+                [(ts, video_id) for video_id, ts in accessed.items()],
+            )
+
+    def entry(self, video_id: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_ENTRY_COLUMNS} FROM index_manifest WHERE video_id = ?", (video_id,)).fetchone()
+        return _entry(row) if row else None
+
+    def entries(self) -> List[ManifestEntry]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {_ENTRY_COLUMNS} FROM index_manifest ORDER BY video_id").fetchall()
+        return [_entry(row) for row in rows]
+
+    def video_ids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT video_id FROM index_manifest ORDER BY video_id")]
+
+    def totals(self) -> Tuple[int, int, int]:
+        """(videos, index bytes, transcript bytes)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(index_bytes), 0), COALESCE(SUM(transcript_bytes), 0) FROM index_manifest"
+            ).fetchone()
+        return int(row[0]), int(row[1]), int(row[2])
+
+    def delete(self, video_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM index_manifest WHERE video_id = ?", (video_id,))
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM manifest_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO manifest_meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_ENTRY_COLUMNS = "video_id, version, updated_at, last_access, index_bytes, transcript_bytes, params"
+
+
+def _dump(params: Optional[Dict[str, Any]]) -> Optional[str]:
+    return json.dumps(params, sort_keys=True) if params is not None else None
+
+
+def _entry(row) -> ManifestEntry:
+    try:
+        params = json.loads(row[6]) if row[6] else {}
+    except ValueError:
+        params = {}
+    return ManifestEntry(
+        video_id=row[0],
+        version=int(row[1]),
+        updated_at=int(row[2]),
+        last_access=row[3],
+        index_bytes=row[4],
+        transcript_bytes=row[5],
+        params=params,
+    )
+
+
+class IndexLocks:
+    def __init__(self, base_dir: str, poll_interval: float = 0.2):
+        self._dir = Path(base_dir) / "locks"
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._poll_interval = poll_interval
+        self._shards = set()
+
+    def _path(self, video_id: str, kind: str) -> str:
+        shard_dir = self._dir / shard(video_id)
+        if shard_dir not in self._shards:
+            shard_dir.mkdir(exist_ok=True)
+            self._shards.add(shard_dir)
+        return str(shard_dir / f"{video_id}.{kind}.lock")
+
+    @contextmanager
+    def io(self, video_id: str, exclusive: bool = False) -> Iterator[None]:
+        """Blocking lock around reading / replacing a video's index files (short critical sections)"""
+        if fcntl is None:
+            yield
+            return
+        with open(self._path(video_id, "io"), "a+") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def try_lock(self, video_id: str, kind: str) -> Iterator[bool]:
+        """Exclusive lock if it is free right now; yields whether it was acquired"""
+        if fcntl is None:
+            yield True
+            return
+        with open(self._path(video_id, kind), "a+") as f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def build_sync(self, video_id: str) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with open(self._path(video_id, "build"), "a+") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    @asynccontextmanager
+    async def build(self, video_id: str) -> AsyncIterator[None]:
+        """Exclusive build lock, polled without blocking the event loop (builds can take minutes)"""
+        if fcntl is None:
+            yield
+            return
+        with open(self._path(video_id, "build"), "a+") as f:
+            while True:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(self._poll_interval)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,304 @@
+"""
+In-process metrics exported in the Prometheus text format (GET /metrics).
+
+- Stage timers: `with metrics.stage("retrieval"):` observes the block's duration in the
+  `rag_stage_seconds{stage=...}` histogram (and `rag_stage_errors_total` if it raised).
+  `metrics.record(stage, seconds)` records a duration measured by hand (e.g. time to first token),
+  `metrics.observe_size(name, n)` a size such as an embedding batch.
+- Gauges: collectors registered with `register_collector` are evaluated at scrape time
+  (cache, residency and fetcher counters come from the existing `stats()` methods).
+- HTTP: `MetricsMiddleware` observes `rag_http_request_seconds{method, route, status}`.
+- Traces (METRICS_TRACE_ENABLED): each request collects the stages it ran as spans, returned
+  in a `Server-Timing` header and logged when the response completes.
+
+With METRICS_ENABLED=false `stage()` returns a shared no-op context manager and the middleware
+passes requests straight through, so the remaining cost is one attribute check per call.
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+# (labels, value) samples per metric name
+Samples = Dict[str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def totals(self, *labelvalues: str) -> Tuple[float, int]:
+        """(sum, count) of one series"""
+        with self._lock:
+            series = self._series.get(labelvalues)
+            return (float(series[-2]), int(series[-1])) if series else (0.0, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for labelvalues, series in items:
+            labels = dict(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {int(series[-1])}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {int(series[-1])}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str]):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, labelvalues)))} {_format_value(value)}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("rag_stage_seconds", "Duration of RAG pipeline stages", ["stage"])
+STAGE_ERRORS = Counter("rag_stage_errors_total", "RAG pipeline stages that raised", ["stage"])
+SIZES = Histogram("rag_batch_size", "Items per batch (e.g. texts per embedding request)", ["name"], SIZE_BUCKETS)
+HTTP_SECONDS = Histogram("rag_http_request_seconds", "HTTP request duration", ["method", "route", "status"])
+_METRICS = (STAGE_SECONDS, STAGE_ERRORS, SIZES, HTTP_SECONDS)
+
+_collectors: List[Callable[[], Samples]] = []
+
+
+class _State:
+    enabled = bool(settings.METRICS_ENABLED)
+    trace = bool(settings.METRICS_ENABLED and settings.METRICS_TRACE_ENABLED)
+
+
+_state = _State()
+# Spans of the current request when tracing: (stage, start perf_counter, seconds)
+_trace: contextvars.ContextVar[Optional[List[Tuple[str, float, float]]]] = contextvars.ContextVar(
+    "rag_trace", default=None
+)
+
+
+def configure(enabled: bool, trace: bool = False) -> None:
+    """Switch recording on/off at runtime (benchmarks, tests)"""
+    _state.enabled = bool(enabled)
+    _state.trace = bool(enabled and trace)
+
+
+def enabled() -> bool:
+    return _state.enabled
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, time.perf_counter() - self.start, start=self.start)
+        # Cancellation / generator close (client went away) is not a stage error.
+        if exc_type is not None and issubclass(exc_type, Exception):
+            STAGE_ERRORS.inc(self.name)
+        return False
+
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopStage()
+
+
+def stage(name: str):
+    """Context manager timing one stage (usable in sync and async code)"""
+    return _Stage(name) if _state.enabled else _NOOP
+
+
+def record(name: str, seconds: float, start: Optional[float] = None) -> None:
+    if not _state.enabled:
+        return
+    STAGE_SECONDS.observe(seconds, name)
+    spans = _trace.get()
+    if spans is not None:
+        spans.append((name, start if start is not None else time.perf_counter() - seconds, seconds))
+
+
+def observe_size(name: str, size: int) -> None:
+    if _state.enabled:
+        SIZES.observe(size, name)
+
+
+def register_collector(collector: Callable[[], Samples]) -> None:
+    """`collector()` returns gauge samples ({metric name: [(labels, value)]}) at scrape time"""
+    _collectors.append(collector)
+
+
+def stats_samples(prefix: str, stats, labels: Optional[Dict[str, str]] = None) -> Samples:
+    """
+    Gauges from a (nested) `stats()` dict: numeric leaves become `{prefix}_{key path}`; lists of
+    dicts with a "name" become one labelled series per item. Strings and None are skipped.
+    """
+    out: Samples = {}
+
+    def walk(name: str, value, labels: Dict[str, str]) -> None:
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, (int, float)):
+            out.setdefault(name, []).append((labels, float(value)))
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                walk(f"{name}_{key}", item, labels)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict) and "name" in item:
+                    walk(name, {k: v for k, v in item.items() if k != "name"}, {**labels, "name": str(item["name"])})
+
+    walk(prefix, stats, dict(labels or {}))
+    return out
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            samples = collector()
+        except Exception:
+            logger.exception("Metrics collector failed")
+            continue
+        for name, series in samples.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in series)
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(spans: Iterable[Tuple[str, float, float]]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, _, seconds in spans)
+
+
+def _route_label(scope) -> str:
+    """Path template of the matched route, including the prefix of the router it was included with"""
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    path = scope.get("path", "")
+    regex = getattr(route, "path_regex", None)
+    if regex is not None and not regex.match(path):
+        # Routes of included routers carry their path relative to the router's prefix.
+        for i, char in enumerate(path):
+            if char == "/" and regex.match(path[i:]):
+                return path[:i] + template
+    return template
+
+
+class MetricsMiddleware:
+    """ASGI middleware: request durations by route, and request-scoped trace spans"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _state.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+        spans = [] if _state.trace else None
+        token = _trace.set(spans) if spans is not None else None
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if spans:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(spans).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_SECONDS.observe(elapsed, scope.get("method", ""), _route_label(scope), str(status[0]))
+            if token is not None:
+                _trace.reset(token)
+                logger.info(
+                    "trace %s %s %d %.1fms: %s",
+                    scope.get("method", ""), scope.get("path", ""), status[0], elapsed * 1000,
+                    ", ".join(f"{name}@{(s - start) * 1000:.1f}+{d * 1000:.1f}ms" for name, s, d in spans) or "-",
+                )
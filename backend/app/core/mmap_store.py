@@ -0,0 +1,281 @@
+"""
+Memory-mapped on-disk format for per-video indexes.
+
+Layout of `{VECTOR_STORE_DIR}/indexes/{shard}/{video_id}/` (see `app.core.storage`):
+
+    meta.json      {"format", "count", "dim", "dtype"}
+    vectors.npy    (count, dim) float32 or float16, opened with numpy mmap (never read into heap)
+    norms.npy      (count,) float32 squared L2 norms, for exact Euclidean distances
+    chunks.jsonl   one {"text", "metadata"} object per line
+    offsets.npy    (count + 1,) int64 byte offsets of each line in chunks.jsonl
+    ann.faiss      optional approximate index (HNSW / IVF,PQ / SQ) over the same rows, see `ann`
+
+Opening an index reads only `meta.json`; search scans the mapped vectors (exact, same
+Euclidean ranking as the FAISS flat index it replaces) and reads chunk text for the top-k
+hits only; large indexes with an `ann.faiss` are searched through it instead (loaded on
+first search). Pages are shared through the OS page cache, so N workers serving the same video
+do not hold N heap copies.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables.config import run_in_executor
+from langchain_core.vectorstores import VectorStore
+
+from app.core import ann
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+VECTOR_DTYPES = ("float32", "float16")
+# Rows scanned per step; bounds the float32 temporaries created for float16 vectors.
+_SCAN_BLOCK = 8192
+
+
+def write_mmap_index(
+    directory: str,
+    texts: Sequence[str],
+    vectors: Sequence[Sequence[float]],
+    metadatas: Optional[Sequence[Dict]] = None,
+    dtype: str = "float32",
+    ann_factory: Optional[str] = None,
+) -> None:
+    """
+    Write an index into `directory` (created if missing). `meta.json` is written last.
+    `ann_factory` (a faiss index-factory string other than "Flat") adds an approximate index.
+    """
+    if dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unsupported vector dtype {dtype!r}; expected one of {VECTOR_DTYPES}")
+    if len(texts) != len(vectors):
+        raise ValueError("texts and vectors must have the same length")
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(len(texts), -1)
+    stored = matrix.astype(dtype, copy=False)
+    # Norms of the stored (possibly rounded) vectors, so distances stay consistent.
+    norms = np.einsum("ij,ij->i", stored.astype(np.float32), stored.astype(np.float32))
+    np.save(path / "vectors.npy", stored)
+    np.save(path / "norms.npy", norms.astype(np.float32))
+
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    metadatas = metadatas or [{} for _ in texts]
+    with open(path / "chunks.jsonl", "wb") as f:
+        for i, (text, metadata) in enumerate(zip(texts, metadatas)):
+            line = json.dumps({"text": text, "metadata": metadata or {}}, ensure_ascii=False)
+            f.write(line.encode("utf-8") + b"\n")
+            offsets[i + 1] = f.tell()
+    np.save(path / "offsets.npy", offsets)
+
+    meta = {"format": FORMAT_VERSION, "count": int(matrix.shape[0]), "dim": int(matrix.shape[1]), "dtype": dtype}
+    if ann_factory and ann_factory != "Flat" and len(matrix):
+        ann.write_index(ann.build_index(matrix, ann_factory), str(path / ann.ANN_FILE))
+        meta["ann"] = ann_factory
+    with open(path / META_FILE, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def export_faiss_store(vector_store: Any) -> Tuple[List[str], np.ndarray, List[Dict]]:
+    """
+    (texts, vectors, metadatas) in index order from a langchain FAISS store. Compressed indexes
+    (SQ / PQ codes) give back their decoded, approximate vectors.
+    """
+    index = vector_store.index
+    vectors = ann.reconstruct_all(index)
+    texts: List[str] = []
+    metadatas: List[Dict] = []
+    for i in range(index.ntotal):
+        doc = vector_store.docstore.search(vector_store.index_to_docstore_id[i])
+        texts.append(doc.page_content)
+        metadatas.append(dict(doc.metadata))
+    return texts, np.asarray(vectors, dtype=np.float32), metadatas
+
+
+class MmapVectorStore(VectorStore):
+    """Read-only vector store over a directory written by `write_mmap_index`"""
+
+    def __init__(
+        self,
+        directory: str,
+        embedding: Optional[Embeddings],
+        nprobe: int = 16,
+        ef_search: int = 64,
+        rerank: int = 4,
+    ):
+        path = Path(directory)
+        with open(path / META_FILE, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format {meta.get('format')!r} in {path}")
+        self.directory = str(path)
+        self.embedding = embedding
+        self.count = int(meta["count"])
+        self.dim = int(meta["dim"])
+        self.dtype = meta["dtype"]
+        self.ann_factory: Optional[str] = meta.get("ann")
+        self._ann_params = (nprobe, ef_search)
+        # ANN candidates fetched per requested hit and re-scored exactly (0 = use ANN distances as is).
+        self._rerank = int(rerank)
+        self._ann = None
+        self._ann_lock = threading.Lock()
+        self._vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        self._norms = np.load(path / "norms.npy", mmap_mode="r")
+        self._offsets = np.load(path / "offsets.npy", mmap_mode="r")
+        if self._vectors.shape != (self.count, self.dim) or len(self._offsets) != self.count + 1:
+            raise ValueError(f"Index files in {path} do not match meta.json")
+        # Kept open so the chunks stay readable even if the directory is replaced underneath us.
+        self._chunks = open(path / "chunks.jsonl", "rb")
+        self._chunks_lock = threading.Lock()
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return self.count
+
+    def heap_bytes(self) -> int:
+        """Approximate private memory; mapped vectors live in the shared page cache, an ANN index does not"""
+        if self.ann_factory is None:
+            return 4096
+        return 4096 + (Path(self.directory) / ann.ANN_FILE).stat().st_size
+
+    def mapped_bytes(self) -> int:
+        return int(self._vectors.nbytes + self._norms.nbytes + self._offsets.nbytes)
+
+    def vectors(self) -> np.ndarray:
+        """The mapped (count, dim) vector array (read-only)"""
+        return self._vectors
+
+    def close(self) -> None:
+        self._chunks.close()
+
+    def __del__(self):
+        chunks = getattr(self, "_chunks", None)
+        if chunks is not None:
+            chunks.close()
+
+    # -- reading ------------------------------------------------------------------
+
+    def get_document(self, i: int) -> Document:
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        with self._chunks_lock:
+            self._chunks.seek(start)
+            raw = self._chunks.read(end - start)
+        record = json.loads(raw)
+        return Document(page_content=record["text"], metadata=record.get("metadata") or {})
+
+    def documents(self) -> Iterable[Document]:
+        for i in range(self.count):
+            yield self.get_document(i)
+
+    def _get_ann(self):
+        if self._ann is None:
+            with self._ann_lock:
+                if self._ann is None:
+                    self._ann = ann.read_index(str(Path(self.directory) / ann.ANN_FILE), *self._ann_params)
+        return self._ann
+
+    def search_ids(self, vector: Sequence[float], k: int) -> List[Tuple[int, float]]:
+        if self.count == 0 or k <= 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if query.shape[0] != self.dim:
+            raise ValueError(f"Query dimension {query.shape[0]} does not match index dimension {self.dim}")
+        if self.ann_factory is not None:
+            return self._search_ann(query, int(k))
+        distances = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, _SCAN_BLOCK):
+            block = np.asarray(self._vectors[start:start + _SCAN_BLOCK], dtype=np.float32)
+            distances[start:start + len(block)] = block @ query
+        # ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2
+        distances = self._norms - 2.0 * distances + float(query @ query)
+        k = min(int(k), self.count)
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return [(int(i), float(max(0.0, distances[i]))) for i in top]
+
+    def _search_ann(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        fetch = min(self.count, k * max(1, self._rerank))
+        distances, ids = self._get_ann().search(query.reshape(1, -1), fetch)
+        hits = [(int(i), float(d)) for i, d in zip(ids[0], distances[0]) if i >= 0]
+        if self._rerank <= 0 or not hits:
+            return hits[:k]
+        rows = np.array(sorted(i for i, _ in hits), dtype=np.int64)
+        exact = np.asarray(self._vectors[rows], dtype=np.float32) @ query
+        exact = self._norms[rows] - 2.0 * exact + float(query @ query)
+        order = np.argsort(exact, kind="stable")[:k]
+        return [(int(rows[j]), float(max(0.0, exact[j]))) for j in order]
+
+    # -- VectorStore interface ----------------------------------------------------
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return [(self.get_document(i), score) for i, score in self.search_ids(embedding, k)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self._embed_query(query), k)
+
+    async def asimilarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return await run_in_executor(None, self.similarity_search_by_vector, embedding, k)
+
+    async def asimilarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        vector = await self._aembed_query(query)
+        return await run_in_executor(None, self.similarity_search_with_score_by_vector, vector, k)
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        vector = await self._aembed_query(query)
+        return await self.asimilarity_search_by_vector(vector, k)
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return self._euclidean_relevance_score_fn
+
+    def _embed_query(self, query: str) -> List[float]:
+        if self.embedding is None:
+            raise ValueError("MmapVectorStore has no embeddings configured for text queries")
+        return self.embedding.embed_query(query)
+
+    async def _aembed_query(self, query: str) -> List[float]:
+        if self.embedding is None:
+            raise ValueError("MmapVectorStore has no embeddings configured for text queries")
+        return await self.embedding.aembed_query(query)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("MmapVectorStore is read-only; write a new index with write_mmap_index")
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        *,
+        directory: Optional[str] = None,
+        dtype: str = "float32",
+        ann_factory: Optional[str] = None,
+        **kwargs: Any,
+    ) -> "MmapVectorStore":
+        if directory is None:
+            raise ValueError("MmapVectorStore.from_texts requires directory=")
+        write_mmap_index(
+            directory, texts, embedding.embed_documents(list(texts)), metadatas, dtype=dtype, ann_factory=ann_factory
+        )
+        return cls(directory, embedding)
@@ -0,0 +1,203 @@
+"""
+Caption cleanup before chunking, and near-duplicate chunk removal before embedding.
+
+Auto-generated captions carry text that costs embedding calls, index space and prompt tokens
+without adding meaning. `normalize_segments` removes, per segment:
+- non-speech tags: `[Music]`, `[Applause]`, `(laughter)`, `♪`, `>>` speaker-change markers,
+  `[ __ ]` (masked words), HTML entities are unescaped;
+- filler words ("um", "uh", "erm", "hmm"), when `remove_fillers` is set;
+- rolling-caption repeats: a caption that starts with the words the previous one ended with
+  keeps only its new words, and a caption identical to the previous one is dropped.
+What remains keeps its timing; a dropped segment's time is added to the previous one. The
+stored raw transcript is not modified, so indexes can be rebuilt when the rules change.
+
+`dedup_chunks` then drops chunks that are near-duplicates of an earlier chunk (repeated
+intros / outros, sponsor reads, a chorus): 64-bit SimHash over word 3-shingles. Candidates
+come from band buckets (two hashes within k bits agree exactly on at least one of k + 1
+bands) and are confirmed by Hamming distance. Kept chunks keep their `chunk_index`, so
+context assembly still merges only true neighbours.
+
+`NormalizationReport` adds up what both steps saved for one video: characters, chunks and
+embedding tokens.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import html
+import re
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+_SHINGLE = 3
+# Chunks shorter than this (in words) are only dropped as exact duplicates.
+_MIN_SIMHASH_WORDS = 8
+# Rolling-caption overlaps shorter than this are treated as coincidence.
+_MIN_OVERLAP_WORDS = 2
+
+_BRACKET_TAG = re.compile(r"\[[^\]]{0,40}\]")
+_PAREN_TAG = re.compile(
+    r"\((?:[^()]{0,20}\s)?(?:music|applause|laugh\w*|cheer\w*|clap\w*|inaudible|silence|crosstalk|"
+    r"foreign|sigh\w*|cough\w*|beep\w*|bleep\w*|static|no audio)(?:\s[^()]{0,20})?\)",
+    re.IGNORECASE,
+)
+_MUSIC = re.compile(r"[♪♫♬♩]+")
+_SPEAKER = re.compile(r">>+")
+_FILLER = re.compile(r"(?<![\w'-])(?:u+h*m+|u+h+|e+r+m+|h+m+)(?![\w'-])[,.]?", re.IGNORECASE)
+_WORD = re.compile(r"[\w']+")
+
+
+@dataclass
+class NormalizationReport:
+    chars_before: int = 0
+    chars_after: int = 0
+    segments_before: int = 0
+    segments_after: int = 0
+    tags_removed: int = 0
+    fillers_removed: int = 0
+    repeated_words_removed: int = 0
+    chunks_before: int = 0
+    chunks_after: int = 0
+    duplicate_chunks: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        out = asdict(self)
+        out["saved_chars"] = max(0, self.chars_before - self.chars_after)
+        out["saved_chunks"] = max(0, self.chunks_before - self.chunks_after)
+        out["saved_tokens"] = max(0, self.tokens_before - self.tokens_after)
+        return out
+
+
+def _clean_text(text: str, remove_fillers: bool, report: NormalizationReport) -> str:
+    text = html.unescape(text or "")
+    for pattern in (_BRACKET_TAG, _PAREN_TAG, _MUSIC, _SPEAKER):
+        text, n = pattern.subn(" ", text)
+        report.tags_removed += n
+    if remove_fillers:
+        text, n = _FILLER.subn(" ", text)
+        report.fillers_removed += n
+    return " ".join(text.split())
+
+
+def _key(word: str) -> str:
+    """Word identity for overlap matching: case and surrounding punctuation ignored"""
+    return word.strip(".,!?;:\"'()-").lower()
+
+
+def _overlap(previous: List[str], current: List[str]) -> int:
+    """Longest n with the last n words of `previous` == the first n words of `current`"""
+    prev = [_key(w) for w in previous]
+    cur = [_key(w) for w in current]
+    for n in range(min(len(prev), len(cur)), 0, -1):
+        if prev[-n:] == cur[:n]:
+            return n
+    return 0
+
+
+def normalize_segments(
+    segments: List[Dict],
+    remove_fillers: bool = True,
+    report: Optional[NormalizationReport] = None,
+) -> Tuple[List[Dict], NormalizationReport]:
+    """Cleaned copy of timed segments (`{"text", "start", "duration"}`) and what was removed"""
+    report = report if report is not None else NormalizationReport()
+    out: List[Dict] = []
+    previous: List[str] = []
+    for seg in segments:
+        raw = seg.get("text") or ""
+        report.segments_before += 1
+        report.chars_before += len(raw)
+        start = float(seg.get("start", 0.0))
+        end = start + float(seg.get("duration", 0.0))
+
+        words = _clean_text(raw, remove_fillers, report).split()
+        n = _overlap(previous, words) if previous else 0
+        if n >= _MIN_OVERLAP_WORDS or (n and n == len(words)):
+            report.repeated_words_removed += n
+            words = words[n:]
+        if not words:
+            # Nothing new: the previous segment covers this one's time.
+            if out:
+                out[-1]["duration"] = round(max(end, out[-1]["start"] + out[-1]["duration"]) - out[-1]["start"], 3)
+            continue
+        text = " ".join(words)
+        out.append({"text": text, "start": start, "duration": float(seg.get("duration", 0.0))})
+        report.chars_after += len(text)
+        # Rolling captions repeat the previous caption's tail; compare against the full caption.
+        previous = _clean_text(raw, remove_fillers, NormalizationReport()).split()
+    report.segments_after = len(out)
+    return out, report
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash of the text's word 3-shingles; None for texts too short to compare this way"""
+    words = [w.lower() for w in _WORD.findall(text)]
+    if len(words) < _MIN_SIMHASH_WORDS:
+        return None
+    shingles = {" ".join(words[i:i + _SHINGLE]) for i in range(len(words) - _SHINGLE + 1)}
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles],
+        dtype=np.uint64,
+    )
+    # (shingles, 64) bit matrix; each bit of the result is the majority vote of that bit.
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(hashes)
+    return int(sum(1 << i for i in np.flatnonzero(votes > 0).tolist()))
+
+
+def dedup_chunks(docs: List[Document], max_distance: int = 6) -> Tuple[List[Document], int]:
+    """Drop chunks within `max_distance` SimHash bits of an earlier kept chunk; returns (kept, dropped)"""
+    max_distance = max(0, min(int(max_distance), 15))
+    bands = max_distance + 1
+    width = 64 // bands
+    mask = (1 << width) - 1
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    exact = set()
+    kept: List[Document] = []
+    kept_hashes: List[int] = []
+    for doc in docs:
+        h = simhash(doc.page_content)
+        if h is None:
+            key = " ".join(_key(w) for w in doc.page_content.split())
+            if key in exact:
+                continue
+            exact.add(key)
+            kept.append(doc)
+            continue
+        keys = [(b, (h >> (b * width)) & mask) for b in range(bands)]
+        if any(
+            (kept_hashes[i] ^ h).bit_count() <= max_distance
+            for k in keys
+            for i in buckets.get(k, ())
+        ):
+            continue
+        for k in keys:
+            buckets.setdefault(k, []).append(len(kept_hashes))
+        kept_hashes.append(h)
+        kept.append(doc)
+    return kept, len(docs) - len(kept)
+
+
+class NormalizationStats:
+    """Savings summed over every video normalized by this process (for /admin/stats)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = NormalizationReport()
+        self.videos = 0
+
+    def add(self, report: NormalizationReport) -> None:
+        with self._lock:
+            self.videos += 1
+            for name, value in asdict(report).items():
+                setattr(self._totals, name, getattr(self._totals, name) + value)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"videos": self.videos, **self._totals.to_dict()}
@@ -2,21 +2,27 @@
 Simple per-user token quota for chat requests.
 
 - User identity: X-User-Id header (preferred) or client IP fallback.
-- Storage: SQLite (persists across process restarts if disk persists).
+- Storage: in-memory per-(user, day) counters, flushed to SQLite in periodic batches
+  (write-behind) over one pooled connection; persists across restarts if disk persists.
+- Concurrency: atomic check-and-reserve before a request, reconciled with actual usage after.
 - Counting: estimated tokens using tiktoken on (question + answer).
 """
 
 from __future__ import annotations
 
 import json
+import logging
 import os
 import sqlite3
 import threading
 import time
+import uuid
 from dataclasses import dataclass
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 
-import tiktoken
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
 
 
 def _utc_day_key(ts: Optional[float] = None) -> str:
@@ -32,21 +38,47 @@ class QuotaDecision:
     remaining: int
 
 
+@dataclass(frozen=True)
+class Reservation:
+    user_key: str
+    day_key: str
+    tokens: int
+    # Row id in `token_reservations` (shared store only).
+    reservation_id: Optional[str] = None
+
+
 class TokenQuotaStore:
-    def __init__(self, db_path: str):
+    """Per-process write-behind counters; one worker, or workers with independent budgets"""
+
+    def __init__(self, db_path: str, flush_interval: float = 2.0):
         self._db_path = db_path
         self._lock = threading.Lock()
+        # Committed usage per (user, day): persisted value + unflushed deltas.
+        self._used: Dict[Tuple[str, str], int] = {}
+        # Deltas not yet written to SQLite.
+        self._dirty: Dict[Tuple[str, str], int] = {}
+        # Tokens held by in-flight requests.
+        self._reserved: Dict[Tuple[str, str], int] = {}
+        self._conn = self._connect()
         self._init_db()
 
+        self._flush_interval = flush_interval
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="quota-flush", daemon=True)
+            self._flusher.start()
+
     def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self._db_path, check_same_thread=False)
+        os.makedirs(os.path.dirname(self._db_path), exist_ok=True)
+        conn = sqlite3.connect(self._db_path, check_same_thread=False, timeout=30)
         conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
         return conn
 
     def _init_db(self) -> None:
-        os.makedirs(os.path.dirname(self._db_path), exist_ok=True)
-        with self._connect() as conn:
-            conn.execute(
+        with self._lock:
+            self._conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS token_usage (
                   user_key TEXT NOT NULL,
@@ -57,35 +89,254 @@ class TokenQuotaStore:
                 )
                 """
             )
-            conn.commit()
+            self._conn.commit()
 
-    def get_used(self, user_key: str, day_key: str) -> int:
-        with self._lock, self._connect() as conn:
-            cur = conn.execute(
+    def _used_locked(self, key: Tuple[str, str]) -> int:
+        """Committed usage for a key, loading it from SQLite on first access (caller holds the lock)"""
+        used = self._used.get(key)
+        if used is None:
+            row = self._conn.execute(
                 "SELECT tokens_used FROM token_usage WHERE user_key = ? AND day_key = ?",
-                (user_key, day_key),
-            )
-            row = cur.fetchone()
-            return int(row[0]) if row else 0
+                key,
+            ).fetchone()
+            used = int(row[0]) if row else 0
+            self._used[key] = used
+        return used
+
+    def _add_locked(self, key: Tuple[str, str], tokens: int) -> int:
+        used = self._used_locked(key) + int(tokens)
+        self._used[key] = used
+        self._dirty[key] = self._dirty.get(key, 0) + int(tokens)
+        return used
+
+    def get_used(self, user_key: str, day_key: str) -> int:
+        with self._lock:
+            return self._used_locked((user_key, day_key))
+
+    def get_pending(self, user_key: str, day_key: str) -> Tuple[int, int]:
+        """(committed usage, tokens currently reserved by in-flight requests)"""
+        key = (user_key, day_key)
+        with self._lock:
+            return self._used_locked(key), self._reserved.get(key, 0)
 
     def add_tokens(self, user_key: str, day_key: str, tokens: int) -> int:
-        now = int(time.time())
-        with self._lock, self._connect() as conn:
-            conn.execute(
+        with self._lock:
+            return self._add_locked((user_key, day_key), tokens)
+
+    def reserve(self, user_key: str, day_key: str, tokens: int, limit: int) -> Tuple[QuotaDecision, Optional[Reservation]]:
+        """
+        Atomically check the limit and hold tokens for an in-flight request.
+        Allowed while committed + reserved usage is below the limit; the hold is capped at
+        what remains, so concurrent requests cannot start once the budget is spoken for.
+        """
+        key = (user_key, day_key)
+        with self._lock:
+            used = self._used_locked(key)
+            reserved = self._reserved.get(key, 0)
+            remaining = max(0, int(limit) - used - reserved)
+            if remaining <= 0:
+                return QuotaDecision(allowed=False, limit=int(limit), used=used, remaining=0), None
+            hold = max(1, min(int(tokens), remaining))
+            self._reserved[key] = reserved + hold
+            decision = QuotaDecision(allowed=True, limit=int(limit), used=used, remaining=remaining)
+            return decision, Reservation(user_key=user_key, day_key=day_key, tokens=hold)
+
+    def _release_locked(self, reservation: Reservation) -> None:
+        key = (reservation.user_key, reservation.day_key)
+        left = self._reserved.get(key, 0) - reservation.tokens
+        if left > 0:
+            self._reserved[key] = left
+        else:
+            self._reserved.pop(key, None)
+
+    def commit(self, reservation: Reservation, actual_tokens: int) -> int:
+        """Replace a reservation with the actual usage; returns committed usage"""
+        with self._lock:
+            self._release_locked(reservation)
+            return self._add_locked((reservation.user_key, reservation.day_key), actual_tokens)
+
+    def release(self, reservation: Reservation) -> None:
+        """Drop a reservation without charging (request failed before producing output)"""
+        with self._lock:
+            self._release_locked(reservation)
+
+    def flush(self) -> int:
+        """Write pending deltas to SQLite in one transaction; returns rows written"""
+        with metrics.stage("quota_flush"), self._lock:
+            if not self._dirty:
+                self._prune_locked()
+                return 0
+            pending, self._dirty = self._dirty, {}
+            now = int(time.time())
+            try:
+                self._conn.executemany(
+                    """
+                    INSERT INTO token_usage (user_key, day_key, tokens_used, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(user_key, day_key)
+                    DO UPDATE SET tokens_used = tokens_used + excluded.tokens_used, updated_at = excluded.updated_at
+                    """,
+                    [(u, d, delta, now) for (u, d), delta in pending.items()],
+                )
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                # Keep the deltas for the next attempt.
+                for key, delta in pending.items():
+                    self._dirty[key] = self._dirty.get(key, 0) + delta
+                raise
+            self._prune_locked()
+            return len(pending)
+
+    def _prune_locked(self) -> None:
+        """Forget clean counters from previous days"""
+        today = _utc_day_key()
+        for key in [k for k in self._used if k[1] != today and k not in self._dirty and k not in self._reserved]:
+            del self._used[key]
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self._flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Quota flush failed; will retry")
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+class SharedTokenQuotaStore(TokenQuotaStore):
+    """
+    Usage and in-flight reservations live in SQLite, so every process sharing the database
+    enforces one limit. Each reserve/commit is a short BEGIN IMMEDIATE transaction on the
+    pooled connection; reservations left behind by a crashed worker expire after RESERVATION_TTL.
+    """
+
+    RESERVATION_TTL = 600  # seconds
+
+    def __init__(self, db_path: str):
+        super().__init__(db_path, flush_interval=0)
+        self._conn.isolation_level = None
+        with self._lock:
+            self._conn.execute(
                 """
-                INSERT INTO token_usage (user_key, day_key, tokens_used, updated_at)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(user_key, day_key)
-                DO UPDATE SET tokens_used = tokens_used + excluded.tokens_used, updated_at = excluded.updated_at
-                """,
-                (user_key, day_key, int(tokens), now),
+                CREATE TABLE IF NOT EXISTS token_reservations (
+                  reservation_id TEXT PRIMARY KEY,
+                  user_key TEXT NOT NULL,
+                  day_key TEXT NOT NULL,
+                  tokens INTEGER NOT NULL,
+                  expires_at INTEGER NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS token_reservations_user ON token_reservations (user_key, day_key)"
+            )
+
+    def _transaction(self, fn):
+        """Run fn() inside one write transaction on the pooled connection (caller holds no lock)"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn()
+                self._conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _db_used(self, key: Tuple[str, str]) -> int:
+        row = self._conn.execute(
+            "SELECT tokens_used FROM token_usage WHERE user_key = ? AND day_key = ?", key
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    def _db_reserved(self, key: Tuple[str, str]) -> int:
+        row = self._conn.execute(
+            "SELECT COALESCE(SUM(tokens), 0) FROM token_reservations WHERE user_key = ? AND day_key = ? AND expires_at > ?",
+            (*key, int(time.time())),
+        ).fetchone()
+        return int(row[0])
+
+    def _db_add(self, key: Tuple[str, str], tokens: int) -> int:
+        self._conn.execute(
+            """
+            INSERT INTO token_usage (user_key, day_key, tokens_used, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_key, day_key)
+            DO UPDATE SET tokens_used = tokens_used + excluded.tokens_used, updated_at = excluded.updated_at
+            """,
+            (*key, int(tokens), int(time.time())),
+        )
+        return self._db_used(key)
+
+    def get_used(self, user_key: str, day_key: str) -> int:
+        with self._lock:
+            return self._db_used((user_key, day_key))
+
+    def get_pending(self, user_key: str, day_key: str) -> Tuple[int, int]:
+        key = (user_key, day_key)
+        with self._lock:
+            return self._db_used(key), self._db_reserved(key)
+
+    def add_tokens(self, user_key: str, day_key: str, tokens: int) -> int:
+        return self._transaction(lambda: self._db_add((user_key, day_key), tokens))
+
+    def reserve(self, user_key: str, day_key: str, tokens: int, limit: int) -> Tuple[QuotaDecision, Optional[Reservation]]:
+        key = (user_key, day_key)
+
+        def txn():
+            used = self._db_used(key)
+            remaining = max(0, int(limit) - used - self._db_reserved(key))
+            if remaining <= 0:
+                return QuotaDecision(allowed=False, limit=int(limit), used=used, remaining=0), None
+            reservation = Reservation(
+                user_key=user_key,
+                day_key=day_key,
+                tokens=max(1, min(int(tokens), remaining)),
+                reservation_id=uuid.uuid4().hex,
             )
-            conn.commit()
-            return self.get_used(user_key, day_key)
+            self._conn.execute(
+                "INSERT INTO token_reservations (reservation_id, user_key, day_key, tokens, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (reservation.reservation_id, user_key, day_key, reservation.tokens, int(time.time()) + self.RESERVATION_TTL),
+            )
+            return QuotaDecision(allowed=True, limit=int(limit), used=used, remaining=remaining), reservation
+
+        return self._transaction(txn)
+
+    def commit(self, reservation: Reservation, actual_tokens: int) -> int:
+        def txn():
+            self._conn.execute("DELETE FROM token_reservations WHERE reservation_id = ?", (reservation.reservation_id,))
+            return self._db_add((reservation.user_key, reservation.day_key), actual_tokens)
+
+        return self._transaction(txn)
+
+    def release(self, reservation: Reservation) -> None:
+        self._transaction(
+            lambda: self._conn.execute(
+                "DELETE FROM token_reservations WHERE reservation_id = ?", (reservation.reservation_id,)
+            )
+        )
+
+    def flush(self) -> int:
+        """Nothing is buffered; drop expired reservations"""
+        with metrics.stage("quota_flush"):
+            self._transaction(
+                lambda: self._conn.execute("DELETE FROM token_reservations WHERE expires_at <= ?", (int(time.time()),))
+            )
+        return 0
 
 
 class TokenCounter:
     def __init__(self, model_name: str):
+        # Imported here: loading tiktoken and its encoder is slow and only needed once serving.
+        import tiktoken
+
         # tiktoken supports many OpenAI models; fall back to cl100k_base
         try:
             self._enc = tiktoken.encoding_for_model(model_name)
@@ -131,7 +382,17 @@ def check_quota(
     day_key: Optional[str] = None,
 ) -> QuotaDecision:
     dk = day_key or _utc_day_key()
-    used = store.get_used(user_key, dk)
-    remaining = max(0, int(limit) - int(used))
-    return QuotaDecision(allowed=used < limit, limit=int(limit), used=int(used), remaining=int(remaining))
+    used, reserved = store.get_pending(user_key, dk)
+    remaining = max(0, int(limit) - int(used) - int(reserved))
+    return QuotaDecision(allowed=remaining > 0, limit=int(limit), used=int(used), remaining=int(remaining))
+
+
+def reserve_quota(
+    store: TokenQuotaStore,
+    user_key: str,
+    limit: int,
+    estimated_tokens: int,
+    day_key: Optional[str] = None,
+) -> Tuple[QuotaDecision, Optional[Reservation]]:
+    return store.reserve(user_key, day_key or _utc_day_key(), estimated_tokens, limit)
 
@@ -0,0 +1,122 @@
+"""
+Bounded in-memory residency for per-video RAG objects (vector index, BM25 index).
+
+- Budget: max entry count and/or max estimated bytes (0 disables a limit).
+- Eviction: LRU (least recently used) or LFU (least frequently used, oldest first on ties).
+- Counters: hits, misses, loads, evictions.
+
+The manager only tracks residency; callers reload evicted entries from disk on a miss.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size_bytes: int
+    hits: int = 0
+    last_access: float = field(default_factory=time.monotonic)
+
+
+class ResidencyManager:
+    def __init__(self, max_entries: int = 0, max_bytes: int = 0, policy: str = "lru"):
+        policy = (policy or "lru").lower()
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self.policy = policy
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the resident value (counting a hit) or None (counting a miss)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry.hits += 1
+            entry.last_access = time.monotonic()
+            self._entries.move_to_end(key)
+            return entry.value
+
+    def put(self, key: str, value: Any, size_bytes: int = 0, loaded: bool = False) -> None:
+        """Insert or replace an entry, then evict until within budget"""
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size_bytes
+            self._entries[key] = _Entry(value=value, size_bytes=max(0, int(size_bytes)))
+            self._bytes += max(0, int(size_bytes))
+            if loaded:
+                self.loads += 1
+            self._evict_locked(keep=key)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.size_bytes
+
+    def _over_budget(self) -> bool:
+        if self.max_entries and len(self._entries) > self.max_entries:
+            return True
+        if self.max_bytes and self._bytes > self.max_bytes:
+            return True
+        return False
+
+    def _pick_victim(self, keep: str) -> Optional[str]:
+        candidates = [k for k in self._entries if k != keep]
+        if not candidates:
+            return None
+        if self.policy == "lru":
+            return candidates[0]
+        return min(candidates, key=lambda k: (self._entries[k].hits, self._entries[k].last_access))
+
+    def _evict_locked(self, keep: str) -> None:
+        # The entry just inserted is never evicted, even if it alone exceeds the budget.
+        while self._over_budget():
+            victim = self._pick_victim(keep)
+            if victim is None:
+                return
+            entry = self._entries.pop(victim)
+            self._bytes -= entry.size_bytes
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "policy": self.policy,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,212 @@
+"""
+Process-wide service objects, built on first use instead of at import time.
+
+Importing `app.main` loads FastAPI, settings and the routers only. The RAG service (and with
+it langchain, FAISS, numpy and youtube-transcript-api), the tiktoken encoder, the quota store
+and the ingestion job queue are created by the getters below, each exactly once per process.
+
+At startup the app lifespan runs `warm_up()` according to STARTUP_WARMUP:
+- "background": `/health` answers right away while everything is built in a thread, so the
+  first real request usually finds it ready.
+- "blocking": build before the app starts serving.
+- "off": build on the first request that needs it.
+
+Storage garbage collection (`app.core.storage`) runs as a background task every
+STORAGE_GC_INTERVAL_SECONDS once the RAG service exists; it never triggers the build itself.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Generic, Optional, TypeVar
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from app.core.jobs import JobQueue
+    from app.core.quota import TokenCounter, TokenQuotaStore
+    from app.core.rag_service import RAGService
+
+logger = logging.getLogger(__name__)
+
+WARMUP_MODES = ("background", "blocking", "off")
+
+T = TypeVar("T")
+
+
+class _Lazy(Generic[T]):
+    """A value built once, by whichever thread asks for it first"""
+
+    def __init__(self, build: Callable[[], T]):
+        self._build = build
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+
+    def get(self) -> T:
+        value = self._value
+        if value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._build()
+                value = self._value
+        return value
+
+    async def aget(self) -> T:
+        """Like `get`, but a first build (or waiting on one) happens off the event loop"""
+        value = self._value
+        if value is None:
+            value = await asyncio.to_thread(self.get)
+        return value
+
+    def peek(self) -> Optional[T]:
+        return self._value
+
+
+def _build_rag_service() -> "RAGService":
+    from app.core.rag_service import RAGService
+
+    return RAGService()
+
+
+def _build_token_counter() -> "TokenCounter":
+    from app.core.quota import TokenCounter
+
+    return TokenCounter(model_name=settings.LLM_MODEL)
+
+
+def _build_quota_store() -> "TokenQuotaStore":
+    from app.core.quota import SharedTokenQuotaStore, TokenQuotaStore
+
+    db_path = os.path.join(settings.VECTOR_STORE_DIR, "quota.sqlite3")
+    if settings.QUOTA_SHARED:
+        return SharedTokenQuotaStore(db_path=db_path)
+    return TokenQuotaStore(db_path=db_path, flush_interval=settings.QUOTA_FLUSH_INTERVAL_SECONDS)
+
+
+async def _run_ingest_job(video_id: str, progress):
+    service = await aget_rag_service()
+    return await service.aprocess_video(video_id=video_id, progress=progress)
+
+
+def _build_job_queue() -> "JobQueue":
+    from app.core.jobs import JobQueue, JobStore
+
+    return JobQueue(
+        store=JobStore(
+            db_path=os.path.join(settings.VECTOR_STORE_DIR, "jobs.sqlite3"),
+            lease_seconds=settings.INGEST_JOB_LEASE_SECONDS,
+        ),
+        runner=_run_ingest_job,
+        workers=settings.INGEST_WORKERS,
+    )
+
+
+_rag_service = _Lazy(_build_rag_service)
+_token_counter = _Lazy(_build_token_counter)
+_quota_store = _Lazy(_build_quota_store)
+_job_queue = _Lazy(_build_job_queue)
+
+
+def get_rag_service() -> "RAGService":
+    return _rag_service.get()
+
+
+async def aget_rag_service() -> "RAGService":
+    return await _rag_service.aget()
+
+
+def peek_rag_service() -> Optional["RAGService"]:
+    """The RAG service if it has been built (never triggers the build)"""
+    return _rag_service.peek()
+
+
+def get_token_counter() -> "TokenCounter":
+    return _token_counter.get()
+
+
+def get_quota_store() -> "TokenQuotaStore":
+    return _quota_store.get()
+
+
+def get_job_queue() -> "JobQueue":
+    return _job_queue.get()
+
+
+def warm_up() -> float:
+    """Import and build everything the first requests need; returns the seconds it took"""
+    start = time.perf_counter()
+    service = get_rag_service()
+    get_token_counter()
+    get_quota_store()
+    service._get_token_counter()
+    try:
+        service._ensure_clients()
+        service._get_chains()
+    except ValueError as e:
+        # e.g. no OPENAI_API_KEY yet: requests will report it; nothing to warm.
+        logger.info("Warm-up skipped the model clients: %s", e)
+    elapsed = time.perf_counter() - start
+    logger.info("Warm-up finished in %.2fs", elapsed)
+    return elapsed
+
+
+async def start_warm_up(mode: str) -> Optional[asyncio.Task]:
+    """Run `warm_up` per STARTUP_WARMUP; returns the task when it runs in the background"""
+    mode = (mode or "background").strip().lower()
+    if mode not in WARMUP_MODES:
+        raise ValueError(f"STARTUP_WARMUP must be one of {', '.join(WARMUP_MODES)} (got {mode!r})")
+    if mode == "blocking":
+        await asyncio.to_thread(warm_up)
+    elif mode == "background":
+        task = asyncio.create_task(asyncio.to_thread(warm_up))
+        task.add_done_callback(_log_warm_up_failure)
+        return task
+    return None
+
+
+async def run_storage_gc(interval: float) -> None:
+    """GC passes every `interval` seconds, in a thread; waits for the RAG service to be built"""
+    while True:
+        service = peek_rag_service()
+        if service is None:
+            await asyncio.sleep(min(interval, 5.0))
+            continue
+        try:
+            summary = await asyncio.to_thread(service.collect_storage)
+            if summary.get("evicted_ttl") or summary.get("evicted_budget"):
+                logger.info("Storage GC: %s", summary)
+        except Exception:
+            logger.exception("Storage GC pass failed")
+        await asyncio.sleep(interval)
+
+
+def start_storage_gc() -> Optional[asyncio.Task]:
+    """Background storage GC per STORAGE_GC_INTERVAL_SECONDS (None when disabled)"""
+    if settings.STORAGE_GC_INTERVAL_SECONDS <= 0:
+        return None
+    return asyncio.create_task(run_storage_gc(settings.STORAGE_GC_INTERVAL_SECONDS))
+
+
+def _log_warm_up_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background warm-up failed", exc_info=task.exception())
+
+
+def close() -> None:
+    """
+    Write quota usage and video access times still buffered in memory, and close the job store
+    (for whatever was built)
+    """
+    store = _quota_store.peek()
+    if store is not None:
+        store.close()
+    job_queue = _job_queue.peek()
+    if job_queue is not None:
+        job_queue.store.close()
+    service = _rag_service.peek()
+    if service is not None:
+        service.storage.flush_touches()
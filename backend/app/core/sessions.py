@@ -0,0 +1,430 @@
+"""
+Server-side chat sessions: multi-turn history with a bounded prompt footprint.
+
+- Storage: SQLite in VECTOR_STORE_DIR/sessions.sqlite3 over one pooled connection, so every
+  worker sharing the directory sees the same sessions. A session belongs to one user (the
+  quota identity) and one video. Idle sessions expire SESSION_TTL_SECONDS after their last
+  turn; expired rows are purged at most once per `purge_interval`.
+- Accounting: each turn stores its question / answer tokens, the tokens spent on rewriting
+  and summarizing (`overhead_tokens`) and what was charged to the quota.
+- History: the prompt gets the running summary plus the newest turns that fit
+  SESSION_HISTORY_TOKENS (`plan_history`). When they overflow, the older half is folded into
+  the summary: one LLM call over the previous summary and those turns only, so summarizing is
+  incremental, happens every few turns, and the prompt stays bounded however long the
+  conversation runs.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from app.core.quota import TokenCounter
+
+
+@dataclass(frozen=True)
+class Turn:
+    turn: int
+    question: str
+    # Standalone retrieval query the question was rewritten to (== question when not rewritten).
+    query: str
+    answer: str
+    question_tokens: int
+    answer_tokens: int
+    overhead_tokens: int
+    tokens_charged: int
+    created_at: int
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass(frozen=True)
+class Session:
+    session_id: str
+    user_key: str
+    video_id: str
+    summary: str
+    summary_tokens: int
+    # Turns 1..summarized_turns are folded into `summary`.
+    summarized_turns: int
+    turns: int
+    tokens_charged: int
+    created_at: int
+    updated_at: int
+    expires_at: int
+
+    def to_dict(self) -> dict:
+        out = asdict(self)
+        out.pop("user_key")
+        return out
+
+
+@dataclass
+class HistoryWindow:
+    """What of a session goes into the next prompt, and which turns must be folded first"""
+    summary: str = ""
+    recent: List[Turn] = field(default_factory=list)
+    fold: List[Turn] = field(default_factory=list)
+    recent_tokens: int = 0
+
+    def text(self) -> str:
+        parts = [f"Summary of the earlier conversation: {self.summary}"] if self.summary else []
+        if self.recent:
+            parts.append(format_turns(self.recent))
+        return "\n\n".join(parts)
+
+    def __bool__(self) -> bool:
+        return bool(self.summary or self.recent)
+
+
+@dataclass
+class TurnPlan:
+    """How one session turn is answered: the retrieval query and the history sent with it"""
+    query: str
+    history: str = ""
+    history_tokens: int = 0
+    # Tokens of the rewrite / summary LLM calls made for this turn (prompts + outputs).
+    overhead_tokens: int = 0
+    summarized: bool = False
+    # The rewrite produced `query`; otherwise a follow-up only makes sense with this session's history.
+    rewritten: bool = False
+
+    @property
+    def cacheable(self) -> bool:
+        """Whether the answer may be shared through the per-video answer cache (keyed on `query`)"""
+        return not self.history or self.rewritten
+
+    def to_dict(self) -> dict:
+        return {
+            "query": self.query,
+            "history_tokens": self.history_tokens,
+            "overhead_tokens": self.overhead_tokens,
+            "summarized": self.summarized,
+            "rewritten": self.rewritten,
+        }
+
+
+def format_turns(turns: List[Turn]) -> str:
+    return "\n".join(f"User: {t.question}\nAssistant: {t.answer}" for t in turns)
+
+
+def plan_history(session: Session, turns: List[Turn], counter: TokenCounter, budget: int) -> HistoryWindow:
+    """
+    Keep the newest unsummarized turns while they fit `budget` tokens. Once they no longer fit,
+    only the newest turns within half the budget stay and the older ones go to `fold`, so the
+    summary is updated every few turns rather than on every turn.
+    `turns` are the session's turns after `summarized_turns`, oldest first.
+    """
+    costs = [counter.count(format_turns([t])) for t in turns]
+    limit = budget if sum(costs) <= budget else budget // 2
+    window = HistoryWindow(summary=session.summary)
+    split = len(turns)
+    while split > 0 and window.recent_tokens + costs[split - 1] <= limit:
+        split -= 1
+        window.recent_tokens += costs[split]
+    window.fold, window.recent = turns[:split], turns[split:]
+    return window
+
+
+def truncate_tokens(text: str, max_tokens: int, counter: TokenCounter) -> str:
+    """Longest word prefix of `text` within `max_tokens`"""
+    if counter.count(text) <= max_tokens:
+        return text
+    words = text.split()
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if counter.count(" ".join(words[:mid])) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return " ".join(words[:lo])
+
+
+class SessionStore:
+    _SESSION_COLUMNS = (
+        "session_id, user_key, video_id, summary, summary_tokens, summarized_turns, turns, "
+        "tokens_charged, created_at, updated_at, expires_at"
+    )
+    _TURN_COLUMNS = (
+        "turn, question, query, answer, question_tokens, answer_tokens, overhead_tokens, "
+        "tokens_charged, created_at"
+    )
+
+    def __init__(self, db_path: str, ttl_seconds: int, max_stored_turns: int = 0, purge_interval: float = 60.0):
+        self._db_path = db_path
+        self.ttl_seconds = int(ttl_seconds)
+        self.max_stored_turns = int(max_stored_turns)
+        self._purge_interval = purge_interval
+        self._purged_at = 0.0
+        self._lock = threading.Lock()
+        # Process-local counters for /admin/stats.
+        self._created = 0
+        self._summaries = 0
+        self._rewrites = 0
+        self._purged = 0
+        self._conn = self._connect()
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self._db_path), exist_ok=True)
+        conn = sqlite3.connect(self._db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        return conn
+
+    def _init_db(self) -> None:
+        with self._lock:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chat_sessions (
+                  session_id TEXT PRIMARY KEY,
+                  user_key TEXT NOT NULL,
+                  video_id TEXT NOT NULL,
+                  summary TEXT NOT NULL DEFAULT '',
+                  summary_tokens INTEGER NOT NULL DEFAULT 0,
+                  summarized_turns INTEGER NOT NULL DEFAULT 0,
+                  turns INTEGER NOT NULL DEFAULT 0,
+                  tokens_charged INTEGER NOT NULL DEFAULT 0,
+                  created_at INTEGER NOT NULL,
+                  updated_at INTEGER NOT NULL,
+                  expires_at INTEGER NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chat_sessions_expiry ON chat_sessions (expires_at)")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chat_turns (
+                  session_id TEXT NOT NULL,
+                  turn INTEGER NOT NULL,
+                  question TEXT NOT NULL,
+                  query TEXT NOT NULL,
+                  answer TEXT NOT NULL,
+                  question_tokens INTEGER NOT NULL,
+                  answer_tokens INTEGER NOT NULL,
+                  overhead_tokens INTEGER NOT NULL,
+                  tokens_charged INTEGER NOT NULL,
+                  created_at INTEGER NOT NULL,
+                  PRIMARY KEY (session_id, turn)
+                )
+                """
+            )
+
+    def _transaction(self, fn):
+        """Run fn() inside one write transaction on the pooled connection"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn()
+                self._conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _row_to_session(row) -> Optional[Session]:
+        if not row:
+            return None
+        return Session(
+            session_id=row[0],
+            user_key=row[1],
+            video_id=row[2],
+            summary=row[3],
+            summary_tokens=int(row[4]),
+            summarized_turns=int(row[5]),
+            turns=int(row[6]),
+            tokens_charged=int(row[7]),
+            created_at=int(row[8]),
+            updated_at=int(row[9]),
+            expires_at=int(row[10]),
+        )
+
+    @staticmethod
+    def _row_to_turn(row) -> Turn:
+        return Turn(int(row[0]), row[1], row[2], row[3], *(int(v) for v in row[4:]))
+
+    def _expiry(self, now: int) -> int:
+        return now + self.ttl_seconds if self.ttl_seconds > 0 else 2 ** 62
+
+    def create(self, user_key: str, video_id: str) -> Session:
+        self._maybe_purge()
+        now = int(time.time())
+        session = Session(
+            session_id=uuid.uuid4().hex,
+            user_key=user_key,
+            video_id=video_id,
+            summary="",
+            summary_tokens=0,
+            summarized_turns=0,
+            turns=0,
+            tokens_charged=0,
+            created_at=now,
+            updated_at=now,
+            expires_at=self._expiry(now),
+        )
+        self._transaction(
+            lambda: self._conn.execute(
+                f"INSERT INTO chat_sessions ({self._SESSION_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                tuple(asdict(session).values()),
+            )
+        )
+        with self._lock:
+            self._created += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """The session, or None if it does not exist or has expired"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {self._SESSION_COLUMNS} FROM chat_sessions WHERE session_id = ? AND expires_at > ?",
+                (session_id, int(time.time())),
+            ).fetchone()
+        return self._row_to_session(row)
+
+    def turns(self, session_id: str, after: int = 0) -> List[Turn]:
+        """Stored turns numbered above `after`, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {self._TURN_COLUMNS} FROM chat_turns WHERE session_id = ? AND turn > ? ORDER BY turn",
+                (session_id, after),
+            ).fetchall()
+        return [self._row_to_turn(row) for row in rows]
+
+    def add_turn(
+        self,
+        session_id: str,
+        question: str,
+        query: str,
+        answer: str,
+        question_tokens: int,
+        answer_tokens: int,
+        overhead_tokens: int,
+        tokens_charged: int,
+    ) -> Optional[Turn]:
+        """Append the next turn and extend the session's expiry; None if the session is gone"""
+        now = int(time.time())
+
+        def txn():
+            row = self._conn.execute(
+                "SELECT turns FROM chat_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            turn = Turn(
+                turn=int(row[0]) + 1,
+                question=question,
+                query=query,
+                answer=answer,
+                question_tokens=int(question_tokens),
+                answer_tokens=int(answer_tokens),
+                overhead_tokens=int(overhead_tokens),
+                tokens_charged=int(tokens_charged),
+                created_at=now,
+            )
+            self._conn.execute(
+                f"INSERT INTO chat_turns (session_id, {self._TURN_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, *asdict(turn).values()),
+            )
+            self._conn.execute(
+                """
+                UPDATE chat_sessions
+                SET turns = ?, tokens_charged = tokens_charged + ?, updated_at = ?, expires_at = ?
+                WHERE session_id = ?
+                """,
+                (turn.turn, turn.tokens_charged, now, self._expiry(now), session_id),
+            )
+            return turn
+
+        turn = self._transaction(txn)
+        if turn is not None and query != question:
+            with self._lock:
+                self._rewrites += 1
+        return turn
+
+    def set_summary(self, session_id: str, summary: str, summary_tokens: int, through_turn: int) -> bool:
+        """
+        Replace the summary with one covering turns 1..through_turn (ignored if another request
+        already folded as far). Summarized turns beyond the newest `max_stored_turns` are deleted.
+        """
+
+        def txn():
+            updated = self._conn.execute(
+                """
+                UPDATE chat_sessions SET summary = ?, summary_tokens = ?, summarized_turns = ?
+                WHERE session_id = ? AND summarized_turns < ?
+                """,
+                (summary, int(summary_tokens), int(through_turn), session_id, int(through_turn)),
+            ).rowcount
+            if updated and self.max_stored_turns > 0:
+                self._conn.execute(
+                    """
+                    DELETE FROM chat_turns WHERE session_id = ? AND turn <= ?
+                      AND turn <= (SELECT turns FROM chat_sessions WHERE session_id = ?) - ?
+                    """,
+                    (session_id, int(through_turn), session_id, self.max_stored_turns),
+                )
+            return bool(updated)
+
+        updated = self._transaction(txn)
+        if updated:
+            with self._lock:
+                self._summaries += 1
+        return updated
+
+    def delete(self, session_id: str) -> bool:
+        def txn():
+            self._conn.execute("DELETE FROM chat_turns WHERE session_id = ?", (session_id,))
+            return self._conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,)).rowcount
+
+        return bool(self._transaction(txn))
+
+    def purge_expired(self) -> int:
+        """Delete expired sessions and their turns; returns how many sessions were removed"""
+        now = int(time.time())
+
+        def txn():
+            self._conn.execute(
+                "DELETE FROM chat_turns WHERE session_id IN (SELECT session_id FROM chat_sessions WHERE expires_at <= ?)",
+                (now,),
+            )
+            return self._conn.execute("DELETE FROM chat_sessions WHERE expires_at <= ?", (now,)).rowcount
+
+        removed = self._transaction(txn)
+        with self._lock:
+            self._purged += removed
+        return removed
+
+    def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now - self._purged_at >= self._purge_interval:
+            self._purged_at = now
+            self.purge_expired()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            active, turns, charged = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(turns), 0), COALESCE(SUM(tokens_charged), 0) "
+                "FROM chat_sessions WHERE expires_at > ?",
+                (int(time.time()),),
+            ).fetchone()
+            return {
+                "active": int(active),
+                "turns": int(turns),
+                "tokens_charged": int(charged),
+                "created": self._created,
+                "summaries": self._summaries,
+                "rewrites": self._rewrites,
+                "purged": self._purged,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,416 @@
+"""
+Disk layout, usage accounting and garbage collection for VECTOR_STORE_DIR.
+
+Per-video files are spread over 256 shard directories (first two hex digits of
+sha1(video_id)), so no directory grows past a few hundred entries:
+
+    indexes/{shard}/{video_id}/            memory-mapped index (see `app.core.mmap_store`)
+    faiss/{shard}/{video_id}.faiss|.pkl    legacy-format pair (INDEX_FORMAT=faiss)
+    transcripts/{shard}/{video_id}.{language}.jsonl.gz
+    locks/{shard}/{video_id}.{io|build}.lock
+
+Shared files stay at the top level: `manifest.sqlite3`, `quota.sqlite3`, `jobs.sqlite3`,
+`embedding_cache.sqlite3` and `library/`.
+
+Files in the earlier flat layout (`indexes/{video_id}/`, `{video_id}.faiss/.pkl` next to the
+databases, flat transcripts) are moved into their shard when they are next loaded, and all at
+once by the first reconcile pass, which also gives every index already on disk a manifest row
+with its sizes. From then on the manifest is the list of stored videos: status checks and
+listings read it instead of the filesystem.
+
+Garbage collection (`collect`) runs every STORAGE_GC_INTERVAL_SECONDS, in one worker at a time:
+- TTL: videos not accessed for STORAGE_TTL_DAYS are removed.
+- Budget: while everything under VECTOR_STORE_DIR (indexes, transcripts, the library and the
+  shared databases, embedding cache included) takes more than STORAGE_MAX_BYTES, the least
+  recently accessed videos are removed until usage is below STORAGE_LOW_WATERMARK of the
+  budget. Each removal is expected to free the video's files plus its share of the library
+  (in proportion to its index size), which the caller reclaims by compacting the library.
+Videos being built (build lock held) are skipped. The manifest row is deleted before the files,
+so other workers drop their resident copy at their next version check. Access times are
+buffered in memory and written to the manifest at each pass.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+from app.core.mmap_store import META_FILE
+
+if TYPE_CHECKING:
+    from app.core.manifest import IndexLocks, IndexManifest
+    from app.core.transcript_store import TranscriptStore
+
+logger = logging.getLogger(__name__)
+
+_RECONCILED_KEY = "layout_reconciled_at"
+_GC_LOCK_KEY = "storage"
+_LEGACY_EXTS = (".faiss", ".pkl")
+
+
+def shard(video_id: str) -> str:
+    """Shard directory name for a video: 2 hex digits, 256 shards"""
+    return hashlib.sha1(video_id.encode("utf-8")).hexdigest()[:2]
+
+
+def _pair(folder: Path, video_id: str) -> List[Path]:
+    return [folder / f"{video_id}{ext}" for ext in _LEGACY_EXTS]
+
+
+def tree_bytes(path: Path) -> int:
+    """Total size of the files under `path` (a file's own size; 0 if missing)"""
+    try:
+        if not path.is_dir():
+            return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+    total = 0
+    stack = [str(path)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        try:
+                            total += entry.stat(follow_symlinks=False).st_size
+                        except FileNotFoundError:
+                            pass
+        except FileNotFoundError:
+            pass
+    return total
+
+
+class StorageManager:
+    def __init__(
+        self,
+        base_dir: str,
+        manifest: "IndexManifest",
+        locks: "IndexLocks",
+        transcripts: "TranscriptStore",
+        language: str,
+        max_bytes: int = 0,
+        ttl_seconds: float = 0.0,
+        low_watermark: float = 0.9,
+    ):
+        self._base = Path(base_dir)
+        self._manifest = manifest
+        self._locks = locks
+        self._transcripts = transcripts
+        self._language = language
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.low_watermark = min(1.0, max(0.0, float(low_watermark)))
+        # video_id -> unix time of the latest access not yet written to the manifest.
+        self._touched: Dict[str, int] = {}
+        self._reconciled = manifest.get_meta(_RECONCILED_KEY) is not None
+        self._lock = threading.Lock()
+        self.passes = 0
+        self.evicted = 0
+        self.evicted_bytes = 0
+        self.skipped_busy = 0
+        self.last_pass_seconds = 0.0
+        self.last_pass_at = 0
+        self.used_bytes = 0
+
+    # -- layout ---------------------------------------------------------------------
+
+    def index_dir(self, video_id: str) -> Path:
+        return self._base / "indexes" / shard(video_id) / video_id
+
+    def faiss_dir(self, video_id: str) -> Path:
+        """Folder of a video's legacy-format pair (`FAISS.load_local(folder, index_name=video_id)`)"""
+        return self._base / "faiss" / shard(video_id)
+
+    def faiss_paths(self, video_id: str) -> List[Path]:
+        """Legacy pair files in the sharded and the flat layout"""
+        return _pair(self.faiss_dir(video_id), video_id) + _pair(self._base, video_id)
+
+    def _flat_index_dir(self, video_id: str) -> Path:
+        return self._base / "indexes" / video_id
+
+    def index_exists(self, video_id: str) -> bool:
+        """Filesystem check in both layouts (used until the manifest has been reconciled)"""
+        return (
+            (self.index_dir(video_id) / META_FILE).exists()
+            or (self.faiss_dir(video_id) / f"{video_id}.faiss").exists()
+            or (self._flat_index_dir(video_id) / META_FILE).exists()
+            or (self._base / f"{video_id}.faiss").exists()
+        )
+
+    def index_bytes(self, video_id: str) -> int:
+        return tree_bytes(self.index_dir(video_id)) + sum(tree_bytes(p) for p in _pair(self.faiss_dir(video_id), video_id))
+
+    def adopt(self, video_id: str) -> bool:
+        """Move a video's index from the flat layout into its shard; False if there was nothing to move"""
+        flat_dir = self._flat_index_dir(video_id)
+        flat_pair = _pair(self._base, video_id)
+        if not (flat_dir / META_FILE).exists() and not flat_pair[0].exists():
+            return False
+        with self._locks.io(video_id, exclusive=True):
+            if (flat_dir / META_FILE).exists():
+                target = self.index_dir(video_id)
+                if (target / META_FILE).exists():
+                    # Already rebuilt in the sharded layout: the flat copy is older.
+                    shutil.rmtree(flat_dir, ignore_errors=True)
+                else:
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.rmtree(target, ignore_errors=True)
+                    os.replace(flat_dir, target)
+            if flat_pair[0].exists():
+                folder = self.faiss_dir(video_id)
+                folder.mkdir(parents=True, exist_ok=True)
+                # `.pkl` first, so a reader never finds the `.faiss` without its docstore.
+                for path in reversed(flat_pair):
+                    if path.exists():
+                        os.replace(path, folder / path.name)
+        return True
+
+    def scan_ids(self) -> List[str]:
+        """Videos with an index on disk in either layout (walks the directories)"""
+        ids = set()
+        indexes = self._base / "indexes"
+        if indexes.exists():
+            ids.update(p.parent.name for p in indexes.glob(f"*/*/{META_FILE}"))
+            ids.update(p.parent.name for p in indexes.glob(f"*/{META_FILE}"))
+        return sorted(ids | set(self.legacy_ids()))
+
+    def legacy_ids(self) -> List[str]:
+        """Videos stored as legacy `.faiss/.pkl` pairs"""
+        paths = list((self._base / "faiss").glob("*/*.faiss")) + list(self._base.glob("*.faiss"))
+        return sorted({p.stem for p in paths})
+
+    # -- manifest-backed status -----------------------------------------------------
+
+    @property
+    def reconciled(self) -> bool:
+        if not self._reconciled:
+            self._reconciled = self._manifest.get_meta(_RECONCILED_KEY) is not None
+        return self._reconciled
+
+    def is_stored(self, video_id: str) -> bool:
+        if self._manifest.version(video_id) is not None:
+            return True
+        return not self.reconciled and self.index_exists(video_id)
+
+    def video_ids(self) -> List[str]:
+        return self._manifest.video_ids() if self.reconciled else self.scan_ids()
+
+    def touch(self, video_id: str) -> None:
+        self._touched[video_id] = int(time.time())
+
+    def flush_touches(self) -> None:
+        with self._lock:
+            pending, self._touched = self._touched, {}
+        self._manifest.touch_many(pending)
+
+    def _stored_params(self, video_id: str) -> Dict:
+        """Build parameters recoverable from the files of an index saved without them"""
+        meta = self.index_dir(video_id) / META_FILE
+        if not meta.exists():
+            return {"format": "faiss"}
+        try:
+            data = json.loads(meta.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"format": "mmap"}
+        return {"format": "mmap", "chunks": data.get("count"), "dim": data.get("dim"), "dtype": data.get("dtype")}
+
+    def reconcile(self) -> Dict[str, int]:
+        """
+        Move every flat-layout file into its shard and give each index on disk a manifest row
+        with its sizes; afterwards status checks trust the manifest
+        """
+        moved = 0
+        indexes = self._base / "indexes"
+        if indexes.exists():
+            for path in indexes.iterdir():
+                if path.is_dir() and not path.name.startswith(".") and (path / META_FILE).exists():
+                    moved += self.adopt(path.name)
+        for path in self._base.glob("*.faiss"):
+            moved += self.adopt(path.stem)
+        moved += self._transcripts.adopt_flat(self._language)
+
+        known = {entry.video_id: entry for entry in self._manifest.entries()}
+        described = 0
+        for video_id in self.scan_ids():
+            entry = known.get(video_id)
+            if entry is None or entry.index_bytes is None:
+                self._manifest.describe(
+                    video_id,
+                    self.index_bytes(video_id),
+                    self._transcripts.size(video_id, self._language),
+                    params=None if entry is not None and entry.params else self._stored_params(video_id),
+                )
+                described += 1
+        self._manifest.set_meta(_RECONCILED_KEY, str(int(time.time())))
+        self._reconciled = True
+        logger.info("Storage reconciled: %d moved into shards, %d manifest rows backfilled", moved, described)
+        return {"moved": moved, "described": described}
+
+    # -- eviction -------------------------------------------------------------------
+
+    def remove(self, video_id: str) -> Optional[int]:
+        """Delete a video's index, transcript and manifest row; None if it is being built right now"""
+        with self._locks.try_lock(video_id, "build") as acquired:
+            if not acquired:
+                return None
+            with self._locks.io(video_id, exclusive=True):
+                self._manifest.delete(video_id)
+                freed = tree_bytes(self.index_dir(video_id)) + tree_bytes(self._flat_index_dir(video_id))
+                freed += sum(tree_bytes(p) for p in self.faiss_paths(video_id))
+                shutil.rmtree(self.index_dir(video_id), ignore_errors=True)
+                shutil.rmtree(self._flat_index_dir(video_id), ignore_errors=True)
+                for path in self.faiss_paths(video_id):
+                    path.unlink(missing_ok=True)
+            freed += self._transcripts.delete(video_id, self._language)
+        self._touched.pop(video_id, None)
+        return freed
+
+    def collect(self, on_remove: Optional[Callable[[str], None]] = None) -> Dict:
+        """
+        One GC pass: write buffered access times, reconcile (once), then evict expired videos and
+        least recently used ones while over budget. Returns a summary; `{"skipped": True}` if
+        another worker is running a pass.
+        """
+        self.flush_touches()
+        with self._locks.try_lock(_GC_LOCK_KEY, "gc") as acquired:
+            if not acquired:
+                return {"skipped": True}
+            start = time.perf_counter()
+            if not self.reconciled:
+                self.reconcile()
+
+            entries = self._manifest.entries()
+            shared = self._other_bytes()
+            used = sum(entry.bytes for entry in entries) + sum(shared.values())
+            total_index = sum(entry.index_bytes or 0 for entry in entries)
+
+            def freed_by(entry) -> int:
+                """The video's files plus its share of the library"""
+                share = shared["library"] * (entry.index_bytes or 0) // total_index if total_index else 0
+                return entry.bytes + share
+
+            victims = []
+            if self.ttl_seconds > 0:
+                cutoff = time.time() - self.ttl_seconds
+                victims = [(entry, "ttl") for entry in entries if entry.accessed_at < cutoff]
+            if self.max_bytes > 0:
+                expired = {entry.video_id for entry, _ in victims}
+                projected = used - sum(freed_by(entry) for entry, _ in victims)
+                if projected > self.max_bytes:
+                    target = self.max_bytes * self.low_watermark
+                    fixed = sum(shared.values()) - shared["library"]
+                    if fixed > target:
+                        logger.warning(
+                            "Shared databases take %d bytes, more than the storage budget target (%d); "
+                            "evicting videos cannot get below it", fixed, int(target),
+                        )
+                    for entry in sorted(entries, key=lambda e: e.accessed_at):
+                        if projected <= target:
+                            break
+                        if entry.video_id not in expired:
+                            victims.append((entry, "budget"))
+                            projected -= freed_by(entry)
+
+            evicted = {"ttl": 0, "budget": 0}
+            freed_total = 0
+            busy = 0
+            for entry, reason in victims:
+                freed = self.remove(entry.video_id)
+                if freed is None:
+                    busy += 1
+                    continue
+                used -= freed_by(entry)
+                freed_total += freed
+                evicted[reason] += 1
+                logger.info("Evicted %s from disk (%s, %d bytes)", entry.video_id, reason, freed)
+                if on_remove is not None:
+                    on_remove(entry.video_id)
+
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.passes += 1
+                self.evicted += evicted["ttl"] + evicted["budget"]
+                self.evicted_bytes += freed_total
+                self.skipped_busy += busy
+                self.last_pass_seconds = elapsed
+                self.last_pass_at = int(time.time())
+                self.used_bytes = used
+        return {
+            "skipped": False,
+            "seconds": elapsed,
+            "videos": len(entries) - evicted["ttl"] - evicted["budget"],
+            "used_bytes": used,
+            "evicted_ttl": evicted["ttl"],
+            "evicted_budget": evicted["budget"],
+            "freed_bytes": freed_total,
+            "skipped_busy": busy,
+        }
+
+    # -- reporting ------------------------------------------------------------------
+
+    def stats(self) -> Dict:
+        """GC counters (in memory; `usage()` has the full report)"""
+        with self._lock:
+            return {
+                "budget_bytes": self.max_bytes,
+                "used_bytes": self.used_bytes,
+                "gc_passes": self.passes,
+                "evicted": self.evicted,
+                "evicted_bytes": self.evicted_bytes,
+                "skipped_busy": self.skipped_busy,
+                "last_pass_seconds": round(self.last_pass_seconds, 4),
+                "last_pass_at": self.last_pass_at,
+                "reconciled": self.reconciled,
+            }
+
+    def _other_bytes(self) -> Dict[str, int]:
+        """Shared files next to the per-video trees (SQLite databases with their WAL files, library)"""
+        other: Dict[str, int] = {}
+        with os.scandir(self._base) as it:
+            for entry in it:
+                if entry.is_file(follow_symlinks=False) and not entry.name.endswith(_LEGACY_EXTS):
+                    name = entry.name.split(".sqlite3")[0] if ".sqlite3" in entry.name else entry.name
+                    other[name] = other.get(name, 0) + entry.stat().st_size
+        other["library"] = tree_bytes(self._base / "library")
+        return other
+
+    def usage(self, largest: int = 10) -> Dict:
+        count, index_bytes, transcript_bytes = self._manifest.totals()
+        entries = sorted(self._manifest.entries(), key=lambda e: e.bytes, reverse=True)[:max(0, largest)]
+        other = self._other_bytes()
+        # Everything counts against the budget, the library and the shared databases included.
+        used = index_bytes + transcript_bytes + sum(other.values())
+        return {
+            "budget_bytes": self.max_bytes,
+            "ttl_days": self.ttl_seconds / 86400,
+            "low_watermark": self.low_watermark,
+            "used_bytes": used,
+            "budget_used_pct": round(100.0 * used / self.max_bytes, 2) if self.max_bytes else None,
+            "videos": count,
+            "index_bytes": index_bytes,
+            "transcript_bytes": transcript_bytes,
+            "other_bytes": sum(other.values()),
+            "other": other,
+            "largest": [
+                {
+                    "video_id": e.video_id,
+                    "bytes": e.bytes,
+                    "index_bytes": e.index_bytes,
+                    "transcript_bytes": e.transcript_bytes,
+                    "last_access": e.accessed_at,
+                    "version": e.version,
+                    "params": e.params,
+                }
+                for e in entries
+            ],
+            "gc": self.stats(),
+        }
@@ -0,0 +1,119 @@
+"""
+Local copy of the raw timed transcript for each video.
+
+- Format: gzip-compressed JSONL, one `{"text", "start", "duration"}` segment per line.
+- Layout: `{VECTOR_STORE_DIR}/transcripts/{shard}/{video_id}.{language}.jsonl.gz` (see
+  `app.core.storage.shard`). Copies from the earlier flat layout are moved into their shard
+  the first time they are read.
+- Writes are atomic (temp file then rename).
+
+Keeping the segments lets indexes be re-chunked / re-embedded without another YouTube round-trip.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.storage import shard
+
+_SUFFIX = ".jsonl.gz"
+
+
+class TranscriptStore:
+    def __init__(self, base_dir: str):
+        self._dir = Path(base_dir) / "transcripts"
+        self._dir.mkdir(parents=True, exist_ok=True)
+
+    def path(self, video_id: str, language: str) -> Path:
+        return self._dir / shard(video_id) / f"{video_id}.{language}{_SUFFIX}"
+
+    def _flat_path(self, video_id: str, language: str) -> Path:
+        return self._dir / f"{video_id}.{language}{_SUFFIX}"
+
+    def _adopt(self, video_id: str, language: str) -> Path:
+        """The sharded path, after moving a copy from the flat layout into it if there is one"""
+        path = self.path(video_id, language)
+        if not path.exists():
+            flat = self._flat_path(video_id, language)
+            if flat.exists():
+                path.parent.mkdir(exist_ok=True)
+                try:
+                    os.replace(flat, path)
+                except FileNotFoundError:
+                    # Moved by another worker in the meantime.
+                    pass
+        return path
+
+    def exists(self, video_id: str, language: str) -> bool:
+        return self._adopt(video_id, language).exists()
+
+    def size(self, video_id: str, language: str) -> Optional[int]:
+        """Bytes on disk, None if there is no stored copy"""
+        try:
+            return self._adopt(video_id, language).stat().st_size
+        except FileNotFoundError:
+            return None
+
+    def delete(self, video_id: str, language: str) -> int:
+        """Remove the stored copy (either layout); returns the bytes freed"""
+        freed = 0
+        for path in (self.path(video_id, language), self._flat_path(video_id, language)):
+            try:
+                freed += path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        return freed
+
+    def save(self, video_id: str, language: str, segments: List[Dict]) -> None:
+        path = self.path(video_id, language)
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{video_id}.", suffix=".tmp", dir=str(path.parent))
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+                for seg in segments:
+                    line = {
+                        "text": seg.get("text", ""),
+                        "start": round(float(seg.get("start", 0.0)), 3),
+                        "duration": round(float(seg.get("duration", 0.0)), 3),
+                    }
+                    gz.write(json.dumps(line, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+                    gz.write(b"\n")
+            os.replace(tmp_path, path)
+            self._flat_path(video_id, language).unlink(missing_ok=True)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def load(self, video_id: str, language: str) -> Optional[List[Dict]]:
+        path = self._adopt(video_id, language)
+        if not path.exists():
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError):
+            # Corrupt copy: drop it so the next build refetches.
+            path.unlink(missing_ok=True)
+            return None
+
+    def adopt_flat(self, language: str) -> int:
+        """Move every copy still in the flat layout into its shard; returns how many were moved"""
+        suffix = f".{language}{_SUFFIX}"
+        moved = 0
+        for flat in self._dir.glob(f"*{suffix}"):
+            if not flat.name.startswith("."):
+                self._adopt(flat.name[: -len(suffix)], language)
+                moved += 1
+        return moved
+
+    def list_video_ids(self, language: str) -> List[str]:
+        suffix = f".{language}{_SUFFIX}"
+        paths = list(self._dir.glob(f"*/*{suffix}")) + list(self._dir.glob(f"*{suffix}"))
+        return sorted({p.name[: -len(suffix)] for p in paths if not p.name.startswith(".")})
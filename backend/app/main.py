@@ -2,15 +2,41 @@
 FastAPI Backend for YouTube Transcript Chatbot
 Main application entry point
 """
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import video, chat
+from fastapi.responses import PlainTextResponse
+from app.routers import video, chat, admin
+from app.core import metrics, services
 from app.core.config import settings
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy services (RAG pipeline, tokenizer, quota store) are built here, not at import time,
+    # so the process answers /health as soon as it starts listening.
+    job_queue = services.get_job_queue()
+    # Background ingestion workers live for the lifetime of the app.
+    await job_queue.start()
+    app.state.warm_up = await services.start_warm_up(settings.STARTUP_WARMUP)
+    # Disk budget / TTL eviction and the one-time layout reconcile of VECTOR_STORE_DIR.
+    storage_gc = services.start_storage_gc()
+    try:
+        yield
+    finally:
+        if storage_gc is not None:
+            storage_gc.cancel()
+        await job_queue.stop()
+        # Write any quota usage still buffered in memory.
+        services.close()
+
+
 app = FastAPI(
     title="YouTube Transcript Chatbot API",
     description="RAG-based chatbot for YouTube video transcripts",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware for React frontend
@@ -24,9 +50,13 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Request durations by route (and trace spans when METRICS_TRACE_ENABLED); a pass-through when metrics are off.
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Include routers
 app.include_router(video.router, prefix="/api/v1", tags=["video"])
 app.include_router(chat.router, prefix="/api/v1", tags=["chat"])
+app.include_router(admin.router, prefix="/api/v1", tags=["admin"])
 
 
 @app.get("/")
@@ -37,3 +67,12 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    if not metrics.enabled():
+        # Nothing is recorded; an empty 200 would look like a healthy target to the scraper.
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
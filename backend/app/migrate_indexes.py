@@ -0,0 +1,38 @@
+"""
+Convert legacy `{video_id}.faiss` + pickled docstore pairs to the memory-mapped index format.
+
+Indexes are also migrated lazily the first time they are loaded (with INDEX_FORMAT=mmap);
+this converts everything up front, e.g. before rolling out more workers. Run from `backend/`:
+
+    python -m app.migrate_indexes
+    python -m app.migrate_indexes VIDEO_ID [VIDEO_ID ...]
+"""
+import argparse
+import sys
+import time
+
+from app.core.services import get_rag_service
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate legacy FAISS pickle indexes to the memory-mapped format")
+    parser.add_argument("video_ids", nargs="*", help="Videos to migrate (default: every legacy index)")
+    args = parser.parse_args()
+
+    rag_service = get_rag_service()
+    video_ids = args.video_ids or rag_service.legacy_index_ids()
+    failures = 0
+    for video_id in video_ids:
+        start = time.perf_counter()
+        try:
+            migrated = rag_service.migrate_index(video_id)
+            print(f"{'ok' if migrated else 'skipped':<8}{video_id}  {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            failures += 1
+            print(f"failed  {video_id}  {e}", file=sys.stderr)
+    print(f"migrated {len(video_ids) - failures}/{len(video_ids)} index(es)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Offline bulk rebuild of video indexes from the stored raw transcripts.
+
+Re-chunks and re-embeds without YouTube round-trips, e.g. after changing CHUNKING_STRATEGY,
+CHUNK_TOKENS / CHUNK_OVERLAP_TOKENS (or CHUNK_SIZE / CHUNK_OVERLAP for "characters") or
+EMBEDDING_MODEL. Run from `backend/`:
+
+    python -m app.rebuild --all
+    python -m app.rebuild VIDEO_ID [VIDEO_ID ...] --concurrency 4
+
+`--library` instead copies the existing per-video indexes into the global library index
+(no re-embedding), e.g. for videos processed before the library existed:
+
+    python -m app.rebuild --library [VIDEO_ID ...]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import List
+
+from app.core.services import get_rag_service
+
+
+async def rebuild(video_ids: List[str], concurrency: int) -> int:
+    rag_service = get_rag_service()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    failures = 0
+
+    async def one(video_id: str) -> None:
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await rag_service.arebuild_video(video_id)
+                print(f"ok      {video_id}  {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                failures += 1
+                print(f"failed  {video_id}  {e}", file=sys.stderr)
+
+    await asyncio.gather(*(one(v) for v in video_ids))
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild video indexes from stored transcripts")
+    parser.add_argument("video_ids", nargs="*", help="Videos to rebuild")
+    parser.add_argument("--all", action="store_true", help="Rebuild every video with a stored transcript")
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--library", action="store_true", help="Backfill the library index from saved indexes")
+    args = parser.parse_args()
+
+    rag_service = get_rag_service()
+    if args.library:
+        start = time.perf_counter()
+        added = rag_service.backfill_library(args.video_ids or None)
+        print(f"added {added} video(s) to the library index in {time.perf_counter() - start:.2f}s")
+        return
+
+    video_ids = rag_service.stored_transcript_ids() if args.all else args.video_ids
+    if not video_ids:
+        parser.error("pass video ids or --all")
+
+    failures = asyncio.run(rebuild(video_ids, args.concurrency))
+    print(f"rebuilt {len(video_ids) - failures}/{len(video_ids)} video(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
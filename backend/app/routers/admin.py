@@ -0,0 +1,56 @@
+"""
+Admin / operational endpoints
+"""
+from typing import Dict
+
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+
+from app.core import metrics, services
+
+router = APIRouter()
+
+
+def collect_stats(rag_service) -> Dict:
+    from app.core.embedding_cache import CachedEmbeddings
+
+    embeddings = rag_service.embeddings
+    return {
+        "embedding_cache": embeddings.stats() if isinstance(embeddings, CachedEmbeddings) else None,
+        "answer_cache": rag_service.answer_cache.stats(),
+        "residency": rag_service.resident.stats(),
+        "single_flight": rag_service.single_flight.stats(),
+        "transcript_fetcher": rag_service.transcript_fetcher.stats(),
+        "storage": rag_service.storage.stats(),
+        "normalization": rag_service.normalization_stats.stats(),
+        "sessions": rag_service.sessions.stats(),
+    }
+
+
+def _stats_samples() -> metrics.Samples:
+    # A scrape before the first request (or warm-up) must not build the RAG service.
+    rag_service = services.peek_rag_service()
+    return metrics.stats_samples("rag", collect_stats(rag_service)) if rag_service is not None else {}
+
+
+# The same counters as gauges on /metrics, e.g. rag_residency_entries, rag_answer_cache_hit_rate.
+metrics.register_collector(_stats_samples)
+
+
+@router.get("/admin/stats")
+async def get_stats():
+    """
+    Cache and residency counters for the in-memory video indexes, and transcript fetcher health
+    """
+    # Storage and session counters read SQLite.
+    return await run_in_threadpool(collect_stats, await services.aget_rag_service())
+
+
+@router.get("/admin/storage")
+async def get_storage():
+    """
+    Disk usage of VECTOR_STORE_DIR: budget, per-video index / transcript bytes from the manifest,
+    shared files, the largest videos and garbage collection counters
+    """
+    rag_service = await services.aget_rag_service()
+    return await run_in_threadpool(rag_service.storage.usage)
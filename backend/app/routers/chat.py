@@ -1,26 +1,44 @@
 """
 Chat router
 """
+import json
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union
+
+import anyio
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from app.core.rag_service import rag_service
+from app.core import metrics, services
 from app.core.config import settings
-from app.core.quota import TokenQuotaStore, TokenCounter, resolve_user_key, check_quota, _utc_day_key
-import os
+from app.core.quota import (
+    QuotaDecision,
+    Reservation,
+    check_quota,
+    resolve_user_key,
+    reserve_quota,
+)
 
 router = APIRouter()
 
-_quota_store = TokenQuotaStore(
-    db_path=os.path.join(settings.VECTOR_STORE_DIR, "quota.sqlite3")
-)
-_token_counter = TokenCounter(model_name=settings.LLM_MODEL)
-
 
 class ChatRequest(BaseModel):
     """Request model for chat"""
     video_id: str
     question: str
+    # Continue a conversation created with POST /chat/sessions (omit for a one-off question).
+    session_id: Optional[str] = None
+
+
+class Source(BaseModel):
+    """Timestamp citation for a retrieved transcript chunk"""
+    rank: int
+    # Set for library answers, which can cite several videos.
+    video_id: Optional[str] = None
+    chunk_index: Optional[int] = None
+    start: Optional[float] = None
+    end: Optional[float] = None
 
 
 class ChatResponse(BaseModel):
@@ -28,6 +46,164 @@ class ChatResponse(BaseModel):
     video_id: str
     question: str
     answer: str
+    sources: List[Source] = []
+    # Prompt-context tokens before (plain top-k) and after assembly; None for cache hits.
+    context_usage: Optional[Dict[str, int]] = None
+    cached: bool = False
+    session_id: Optional[str] = None
+    # Session turns: turn number, rewritten query, history / overhead / charged tokens.
+    session: Optional[Dict[str, Any]] = None
+
+
+class SessionCreateRequest(BaseModel):
+    """Request model for starting a chat session"""
+    video_id: str
+
+
+class SessionResponse(BaseModel):
+    """A chat session with its running summary and stored turns"""
+    session_id: str
+    video_id: str
+    summary: str = ""
+    summary_tokens: int = 0
+    summarized_turns: int = 0
+    turns: int = 0
+    tokens_charged: int = 0
+    created_at: int
+    updated_at: int
+    expires_at: int
+    history: List[Dict[str, Any]] = []
+
+
+class LibraryChatRequest(BaseModel):
+    """Request model for chat across several videos"""
+    question: str
+    # Processed video ids to search, or "all" for the whole library.
+    video_ids: Union[List[str], Literal["all"]] = "all"
+
+
+class LibraryChatResponse(BaseModel):
+    """Response model for library chat"""
+    video_ids: Union[List[str], Literal["all"]]
+    question: str
+    answer: str
+    sources: List[Source] = []
+    context_usage: Optional[Dict[str, int]] = None
+
+
+def _resolve_quota_identity(http_request: Request) -> Tuple[str, int]:
+    """Return (user_key, effective daily limit) for the caller"""
+    header_user_id = http_request.headers.get("x-user-id")
+    client_ip = http_request.client.host if http_request.client else None
+    user_key = resolve_user_key(header_user_id, client_ip)
+
+    limits = settings.get_user_token_limits()
+    # If X-User-Id is present, allow per-user overrides by raw id string
+    effective_limit = int(limits.get(header_user_id, settings.USER_TOKEN_LIMIT_DEFAULT)) if header_user_id else int(settings.USER_TOKEN_LIMIT_DEFAULT)
+    return user_key, effective_limit
+
+
+def _count_tokens(text: str) -> int:
+    return services.get_token_counter().count(text)
+
+
+# Quota calls run in the threadpool: with QUOTA_SHARED each one is a SQLite write transaction
+# that can wait on other workers' locks, which must not stall the event loop.
+
+async def _reserve_quota(user_key: str, limit: int, question: str, extra_tokens: int = 0) -> Reservation:
+    """Hold the estimated cost of this request against the quota, or raise 429"""
+    estimate = _count_tokens(question) + settings.QUOTA_RESERVE_ANSWER_TOKENS + extra_tokens
+    with metrics.stage("quota_reserve"):
+        # Shielded: a reservation made in the thread must reach the caller, which settles it.
+        with anyio.CancelScope(shield=True):
+            decision, reservation = await run_in_threadpool(
+                reserve_quota, services.get_quota_store(), user_key=user_key, limit=limit, estimated_tokens=estimate
+            )
+    if reservation is None:
+        raise _quota_exceeded(decision)
+    return reservation
+
+
+def _quota_exceeded(decision: QuotaDecision) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=f"Daily token limit exceeded. Limit={decision.limit}, Used={decision.used}. Try again tomorrow."
+    )
+
+
+async def _commit_quota(reservation: Reservation, tokens: int) -> int:
+    """Settle a reservation with actual usage; returns the user's committed usage"""
+    with metrics.stage("quota_commit"):
+        # Shielded: a request cancelled mid-settle must not leave the reservation held.
+        with anyio.CancelScope(shield=True):
+            return await run_in_threadpool(services.get_quota_store().commit, reservation, tokens)
+
+
+async def _release_quota(reservation: Reservation) -> None:
+    with metrics.stage("quota_release"):
+        with anyio.CancelScope(shield=True):
+            await run_in_threadpool(services.get_quota_store().release, reservation)
+
+
+def _should_charge(cached: bool) -> bool:
+    """Answer-cache hits skip the LLM and are free unless ANSWER_CACHE_CHARGE_HITS is set"""
+    return not cached or settings.ANSWER_CACHE_CHARGE_HITS
+
+
+async def _load_session(rag_service, session_id: str, user_key: str, video_id: Optional[str] = None):
+    """The caller's live session, or 404; 400 if it belongs to another video"""
+    session = await run_in_threadpool(rag_service.sessions.get, session_id)
+    if session is None or session.user_key != user_key:
+        raise HTTPException(status_code=404, detail=f"Chat session {session_id} not found or expired")
+    if video_id is not None and session.video_id != video_id:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Chat session {session_id} belongs to video {session.video_id}, not {video_id}"
+        )
+    return session
+
+
+def _session_overhead_estimate(session) -> int:
+    """Tokens reserved for a session turn's rewrite / summary calls (history is bounded by the budgets)"""
+    if session is None or not settings.SESSION_CHARGE_OVERHEAD:
+        return 0
+    return settings.SESSION_HISTORY_TOKENS + settings.SESSION_SUMMARY_TOKENS
+
+
+def _turn_charge(question_tokens: int, answer_tokens: int, plan: Optional[Dict], cached: bool) -> int:
+    """Tokens charged for one turn: question + answer, plus session overhead when configured"""
+    overhead = plan.get("overhead_tokens", 0) if plan and settings.SESSION_CHARGE_OVERHEAD else 0
+    if not _should_charge(cached):
+        return overhead
+    return question_tokens + answer_tokens + overhead
+
+
+def _record_turn(rag_service, session, question: str, answer: str, plan: Dict, question_tokens: int,
+                 answer_tokens: int, tokens_charged: int) -> Dict:
+    """Append the turn to the session; returns the session fields for the response"""
+    turn = rag_service.sessions.add_turn(
+        session.session_id,
+        question=question,
+        query=plan.get("query", question),
+        answer=answer,
+        question_tokens=question_tokens,
+        answer_tokens=answer_tokens,
+        overhead_tokens=plan.get("overhead_tokens", 0),
+        tokens_charged=tokens_charged,
+    )
+    return {
+        **plan,
+        "turn": turn.turn if turn is not None else None,
+        "question_tokens": question_tokens,
+        "answer_tokens": answer_tokens,
+        "tokens_charged": tokens_charged,
+        "session_tokens": session.tokens_charged + tokens_charged,
+    }
+
+
+def _sse(event: str, data) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 @router.post("/chat", response_model=ChatResponse)
@@ -42,33 +218,247 @@ async def chat(request: ChatRequest, http_request: Request):
                 detail="video_id and question are required"
             )
 
-        header_user_id = http_request.headers.get("x-user-id")
-        client_ip = http_request.client.host if http_request.client else None
-        user_key = resolve_user_key(header_user_id, client_ip)
+        rag_service = await services.aget_rag_service()
+        user_key, effective_limit = _resolve_quota_identity(http_request)
+        session = None
+        if request.session_id:
+            session = await _load_session(rag_service, request.session_id, user_key, request.video_id)
+        reservation = await _reserve_quota(
+            user_key, effective_limit, request.question, _session_overhead_estimate(session)
+        )
 
-        limits = settings.get_user_token_limits()
-        # If X-User-Id is present, allow per-user overrides by raw id string
-        effective_limit = int(limits.get(header_user_id, settings.USER_TOKEN_LIMIT_DEFAULT)) if header_user_id else int(settings.USER_TOKEN_LIMIT_DEFAULT)
+        try:
+            result = await rag_service.achat(
+                video_id=request.video_id,
+                question=request.question,
+                session=session,
+            )
+        except BaseException:
+            await _release_quota(reservation)
+            raise
 
-        decision = check_quota(_quota_store, user_key=user_key, limit=effective_limit)
-        if not decision.allowed:
-            raise HTTPException(
-                status_code=429,
-                detail=f"Daily token limit exceeded. Limit={decision.limit}, Used={decision.used}. Try again tomorrow."
+        # Count tokens for question + answer (+ session overhead), then settle the reservation with actual usage.
+        question_tokens = _count_tokens(request.question)
+        answer_tokens = _count_tokens(result.get("answer", ""))
+        tokens_used = _turn_charge(question_tokens, answer_tokens, result.get("session"), result.get("cached", False))
+        await _commit_quota(reservation, tokens_used)
+        if session is not None:
+            result["session"] = await run_in_threadpool(
+                _record_turn, rag_service, session, request.question, result.get("answer", ""),
+                result["session"], question_tokens, answer_tokens, tokens_used,
             )
-        
-        result = rag_service.chat(
-            video_id=request.video_id,
-            question=request.question
-        )
 
-        # Count tokens for question + answer, then charge against quota.
-        tokens_used = _token_counter.count(request.question) + _token_counter.count(result.get("answer", ""))
-        _quota_store.add_tokens(user_key=user_key, day_key=_utc_day_key(), tokens=tokens_used)
-        
         return ChatResponse(**result)
     
+    except HTTPException:
+        # 400 / 429 raised above must not be rewrapped as a 500.
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.post("/chat/library", response_model=LibraryChatResponse)
+async def chat_library(request: LibraryChatRequest, http_request: Request):
+    """
+    Chat across many processed videos at once using the global library index
+    """
+    try:
+        if not request.question:
+            raise HTTPException(
+                status_code=400,
+                detail="question is required"
+            )
+        if isinstance(request.video_ids, list) and not request.video_ids:
+            raise HTTPException(
+                status_code=400,
+                detail='video_ids must list at least one video, or be "all"'
+            )
+
+        rag_service = await services.aget_rag_service()
+        user_key, effective_limit = _resolve_quota_identity(http_request)
+        reservation = await _reserve_quota(user_key, effective_limit, request.question)
+
+        try:
+            result = await rag_service.achat_library(
+                question=request.question,
+                video_ids=None if request.video_ids == "all" else request.video_ids,
+            )
+        except BaseException:
+            await _release_quota(reservation)
+            raise
+
+        tokens_used = _count_tokens(request.question) + _count_tokens(result.get("answer", ""))
+        await _commit_quota(reservation, tokens_used)
+
+        return LibraryChatResponse(**result)
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Stream an answer as Server-Sent Events.
+
+    Events: `context` (retrieved chunk metadata), `token` (answer text as generated),
+    `error` (`detail` and the HTTP `status` the request would have failed with), and a terminal
+    `done` carrying token usage. Tokens are charged against the quota once, when the stream
+    completes or the client disconnects; a stream that ends in an error charges nothing.
+
+    The quota is checked before the response starts (429) but reserved inside the stream, so
+    a client that disconnects before the stream runs never leaves a reservation behind.
+    """
+    if not request.video_id or not request.question:
+        raise HTTPException(
+            status_code=400,
+            detail="video_id and question are required"
+        )
+
+    rag_service = await services.aget_rag_service()
+    if not await run_in_threadpool(rag_service.is_processed, request.video_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Video {request.video_id} not processed. Please process the video first."
+        )
+
+    user_key, effective_limit = _resolve_quota_identity(http_request)
+    session = None
+    if request.session_id:
+        session = await _load_session(rag_service, request.session_id, user_key, request.video_id)
+    decision = await run_in_threadpool(check_quota, services.get_quota_store(), user_key, effective_limit)
+    if not decision.allowed:
+        raise _quota_exceeded(decision)
+
+    async def event_stream():
+        try:
+            reservation = await _reserve_quota(
+                user_key, effective_limit, request.question, _session_overhead_estimate(session)
+            )
+        except HTTPException as e:
+            # The budget was spent by concurrent requests since the check above.
+            yield _sse("error", {"detail": e.detail, "status": e.status_code})
+            return
+
+        answer_parts = []
+        charged = False
+        failed = False
+        cached = False
+        plan = None
+
+        async def charge() -> dict:
+            nonlocal charged
+            charged = True
+            question_tokens = _count_tokens(request.question)
+            answer = "".join(answer_parts)
+            answer_tokens = _count_tokens(answer)
+            tokens_charged = _turn_charge(question_tokens, answer_tokens, plan, cached)
+            used = await _commit_quota(reservation, tokens_charged)
+            usage = {
+                "question_tokens": question_tokens,
+                "answer_tokens": answer_tokens,
+                "cached": cached,
+                "tokens_charged": tokens_charged,
+                "quota_limit": effective_limit,
+                "quota_used": used,
+                "quota_remaining": max(0, effective_limit - used),
+            }
+            if session is not None and plan is not None and answer:
+                usage["session"] = await run_in_threadpool(
+                    _record_turn,
+                    rag_service, session, request.question, answer, plan, question_tokens, answer_tokens, tokens_charged,
+                )
+            return usage
+
+        try:
+            try:
+                async for event, data in rag_service.astream_chat(request.video_id, request.question, session=session):
+                    if event == "token":
+                        answer_parts.append(data)
+                        yield _sse("token", {"text": data})
+                    else:
+                        if event == "context":
+                            cached = bool(data.get("cached"))
+                            plan = data.get("session")
+                        yield _sse(event, data)
+            except ValueError as e:
+                failed = True
+                yield _sse("error", {"detail": str(e), "status": 400})
+                return
+            except Exception as e:
+                failed = True
+                yield _sse("error", {"detail": f"Internal server error: {str(e)}", "status": 500})
+                return
+
+            usage = await charge()
+            done = {"video_id": request.video_id, "usage": usage}
+            if session is not None:
+                done["session_id"] = session.session_id
+            yield _sse("done", done)
+        finally:
+            if failed:
+                # Like /chat: a failed answer is not charged.
+                await _release_quota(reservation)
+            elif not charged:
+                # Client went away mid-stream: still charge what was generated (shielded from
+                # the cancellation that closes the stream).
+                with anyio.CancelScope(shield=True):
+                    await charge()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/chat/sessions", response_model=SessionResponse)
+async def create_session(request: SessionCreateRequest, http_request: Request):
+    """
+    Start a conversation about a processed video; pass the returned `session_id` to /chat
+    or /chat/stream to ask follow-ups. Sessions expire SESSION_TTL_SECONDS after the last turn.
+    """
+    try:
+        if not request.video_id:
+            raise HTTPException(status_code=400, detail="video_id is required")
+        rag_service = await services.aget_rag_service()
+        if not await run_in_threadpool(rag_service.is_processed, request.video_id):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Video {request.video_id} not processed. Please process the video first."
+            )
+        user_key, _ = _resolve_quota_identity(http_request)
+        session = await run_in_threadpool(rag_service.sessions.create, user_key, request.video_id)
+        return SessionResponse(**session.to_dict())
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.get("/chat/sessions/{session_id}", response_model=SessionResponse)
+async def get_session(session_id: str, http_request: Request):
+    """The session's running summary, token totals and stored turns"""
+    rag_service = await services.aget_rag_service()
+    user_key, _ = _resolve_quota_identity(http_request)
+    session = await _load_session(rag_service, session_id, user_key)
+    turns = await run_in_threadpool(rag_service.sessions.turns, session_id)
+    return SessionResponse(**session.to_dict(), history=[t.to_dict() for t in turns])
+
+
+@router.delete("/chat/sessions/{session_id}")
+async def delete_session(session_id: str, http_request: Request):
+    """End a session and delete its history"""
+    rag_service = await services.aget_rag_service()
+    user_key, _ = _resolve_quota_identity(http_request)
+    await _load_session(rag_service, session_id, user_key)
+    await run_in_threadpool(rag_service.sessions.delete, session_id)
+    return {"session_id": session_id, "status": "deleted"}
@@ -2,10 +2,13 @@
 Video processing router
 """
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, HttpUrl
-from typing import Optional
+from typing import List, Optional
 
-from app.core.rag_service import rag_service
+from app.core import services
+from app.core.config import settings
+from app.core.jobs import ACTIVE_STATUSES, STATUS_FAILED
 
 router = APIRouter()
 
@@ -23,6 +26,40 @@ class VideoProcessResponse(BaseModel):
     message: str
 
 
+class BatchProcessRequest(BaseModel):
+    """Request model for bulk ingestion: video ids, video URLs, playlist ids or playlist URLs"""
+    items: List[str] = []
+    playlist_id: Optional[str] = None
+
+
+class BatchVideoResult(BaseModel):
+    """Outcome for one video (or one input that could not be resolved)"""
+    video_id: Optional[str] = None
+    status: str
+    input: Optional[str] = None
+    chunks: Optional[int] = None
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+class BatchProcessResponse(BaseModel):
+    """Response model for bulk ingestion"""
+    processed: int
+    skipped: int
+    failed: int
+    results: List[BatchVideoResult]
+
+
+class JobResponse(BaseModel):
+    """Response model for a background ingestion job"""
+    job_id: str
+    video_id: str
+    status: str
+    stage: str
+    progress: float
+    error: Optional[str] = None
+
+
 @router.post("/video/process", response_model=VideoProcessResponse)
 async def process_video(request: VideoProcessRequest):
     """
@@ -35,38 +72,127 @@ async def process_video(request: VideoProcessRequest):
                 detail="Either youtube_url or video_id must be provided"
             )
         
-        result = rag_service.process_video(
+        rag_service = await services.aget_rag_service()
+        result = await rag_service.aprocess_video(
             video_id=request.video_id or "",
             youtube_url=request.youtube_url
         )
         
         return VideoProcessResponse(**result)
     
+    except HTTPException:
+        # The 400 raised above must not be rewrapped as a 500.
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.post("/video/batch", response_model=BatchProcessResponse)
+async def process_video_batch(request: BatchProcessRequest):
+    """
+    Process many videos (and/or playlists) in one request; results are reported per video
+    """
+    items = list(request.items)
+    if request.playlist_id:
+        items.append(request.playlist_id)
+    if not items:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide items (video ids / URLs / playlists) or playlist_id"
+        )
+
+    try:
+        rag_service = await services.aget_rag_service()
+        video_ids, failures = await rag_service.aresolve_batch_items(items)
+        if len(video_ids) > settings.BATCH_MAX_VIDEOS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Batch resolves to {len(video_ids)} videos; the limit is {settings.BATCH_MAX_VIDEOS}"
+            )
+        results = failures + await rag_service.aingest_batch(video_ids)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+    def count(status: str) -> int:
+        return sum(1 for r in results if r["status"] == status)
+
+    return BatchProcessResponse(
+        processed=count("processed"),
+        skipped=count("skipped"),
+        failed=count("failed"),
+        results=[BatchVideoResult(**r) for r in results],
+    )
+
+
+@router.post("/video/jobs", response_model=JobResponse, status_code=202)
+async def submit_video_job(request: VideoProcessRequest):
+    """
+    Queue a video for background processing and return the job immediately
+    """
+    if not request.youtube_url and not request.video_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Either youtube_url or video_id must be provided"
+        )
+    rag_service = await services.aget_rag_service()
+    try:
+        video_id = rag_service.extract_video_id(request.youtube_url or request.video_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = await services.get_job_queue().submit(video_id)
+    return JobResponse(**job.to_dict())
+
+
+@router.get("/video/jobs/{job_id}", response_model=JobResponse)
+async def get_video_job(job_id: str):
+    """
+    Poll a background ingestion job
+    """
+    job = await run_in_threadpool(services.get_job_queue().store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return JobResponse(**job.to_dict())
+
+
 @router.get("/video/{video_id}/status")
 async def get_video_status(video_id: str):
     """
-    Check if a video has been processed
+    Check if a video has been processed (or is being processed by a background job)
     """
-    from pathlib import Path
-    from app.core.config import settings
-    
-    vector_store_path = Path(settings.VECTOR_STORE_DIR) / f"{video_id}.faiss"
-    
-    if vector_store_path.exists():
+    rag_service = await services.aget_rag_service()
+    # Manifest reads (SQLite); this endpoint is polled, so keep them off the event loop.
+    if await run_in_threadpool(rag_service.is_processed, video_id):
         return {
             "video_id": video_id,
             "status": "processed",
-            "exists": True
+            "exists": True,
+            "normalization": await run_in_threadpool(rag_service.normalization_report, video_id),
+        }
+
+    job = await run_in_threadpool(services.get_job_queue().store.latest_for_video, video_id)
+    if job is not None and job.status in ACTIVE_STATUSES:
+        return {
+            "video_id": video_id,
+            "status": "processing",
+            "exists": False,
+            "job": JobResponse(**job.to_dict()).model_dump(),
         }
-    else:
+    if job is not None and job.status == STATUS_FAILED:
         return {
             "video_id": video_id,
-            "status": "not_processed",
-            "exists": False
+            "status": "failed",
+            "exists": False,
+            "job": JobResponse(**job.to_dict()).model_dump(),
         }
+    return {
+        "video_id": video_id,
+        "status": "not_processed",
+        "exists": False
+    }
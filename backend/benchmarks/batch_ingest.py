@@ -0,0 +1,95 @@
+"""
+Batch ingestion benchmark: N sequential `/video/process` calls vs one `/video/batch` call.
+
+Runs the real app in-process on the stub backends. Each transcript fetch and each
+embedding request costs a fixed latency, so the difference shows the effect of concurrent
+(rate-limited) fetching and of packing chunks from many videos into shared embedding
+requests. One video in the batch is made to fail to show per-video error reporting.
+
+Usage (from `backend/`):
+    python -m benchmarks.batch_ingest --videos 20 --fetch-latency 0.3 --embed-latency 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from benchmarks.concurrency import StubTranscriptClient, app, install_stubs, rag_service
+from app.core.config import settings
+
+FAILING_VIDEO = "badVIDEO000"
+
+
+def _install(fetch_latency: float, embed_latency: float) -> dict:
+    """Stubs with a failing video and a counter of embedding requests"""
+    install_stubs(llm_latency=0.0, embed_latency=embed_latency, fetch_latency=fetch_latency)
+    counts = {"embed_requests": 0}
+    embeddings = rag_service.embeddings
+    aembed_documents = embeddings.aembed_documents
+
+    async def counted(texts):
+        counts["embed_requests"] += 1
+        return await aembed_documents(texts)
+
+    embeddings.aembed_documents = counted
+    rag_service.transcript_fetcher.client = StubTranscriptClient(latency=fetch_latency, unavailable=[FAILING_VIDEO])
+    return counts
+
+
+async def run(videos: int, counts: dict) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        sequential_ids = [f"seqVIDEO{i:03d}" for i in range(videos)]
+        counts["embed_requests"] = 0
+        start = time.perf_counter()
+        for video_id in sequential_ids:
+            resp = await client.post("/api/v1/video/process", json={"video_id": video_id})
+            resp.raise_for_status()
+        sequential_s = time.perf_counter() - start
+        sequential_requests = counts["embed_requests"]
+
+        batch_ids = [f"batVIDEO{i:03d}" for i in range(videos)] + [FAILING_VIDEO]
+        counts["embed_requests"] = 0
+        start = time.perf_counter()
+        resp = await client.post("/api/v1/video/batch", json={"items": batch_ids})
+        resp.raise_for_status()
+        batch_s = time.perf_counter() - start
+        body = resp.json()
+
+    print(
+        f"videos={videos} fetch concurrency={settings.BATCH_FETCH_CONCURRENCY} "
+        f"rate={settings.BATCH_FETCH_RATE_PER_SECOND}/s embedding batch={settings.EMBEDDING_BATCH_SIZE}"
+    )
+    print(f"{'mode':<28}{'wall s':>8}{'per video s':>13}{'embed reqs':>12}")
+    print(f"{'sequential /video/process':<28}{sequential_s:>8.2f}{sequential_s / videos:>13.3f}{sequential_requests:>12}")
+    print(f"{'one /video/batch':<28}{batch_s:>8.2f}{batch_s / videos:>13.3f}{counts['embed_requests']:>12}")
+    print(f"batch result: processed={body['processed']} skipped={body['skipped']} failed={body['failed']}")
+    for result in body["results"]:
+        if result["status"] == "failed":
+            print(f"  failed {result['video_id']}: {result['error'].splitlines()[0]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=20)
+    parser.add_argument("--fetch-latency", type=float, default=0.3)
+    parser.add_argument("--embed-latency", type=float, default=0.2)
+    parser.add_argument("--fetch-rate", type=float, default=5.0, help="BATCH_FETCH_RATE_PER_SECOND")
+    parser.add_argument("--fetch-concurrency", type=int, default=4, help="BATCH_FETCH_CONCURRENCY")
+    args = parser.parse_args()
+
+    settings.BATCH_FETCH_RATE_PER_SECOND = args.fetch_rate
+    settings.BATCH_FETCH_CONCURRENCY = args.fetch_concurrency
+    counts = _install(args.fetch_latency, args.embed_latency)
+    asyncio.run(run(args.videos, counts))
+
+
+if __name__ == "__main__":
+    main()
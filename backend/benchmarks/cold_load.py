@@ -0,0 +1,122 @@
+"""
+Cold-load benchmark: legacy FAISS + pickle pairs vs the memory-mapped index format.
+
+Writes `--videos` synthetic indexes in each format, then for each format starts a fresh
+interpreter that opens every index and runs one top-k query against it, reporting the time
+to open, the time to the first answered query, peak RSS growth and bytes on disk.
+
+Usage (from `backend/`):
+    python -m benchmarks.cold_load --videos 50 --chunks 400 --dim 1536
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from langchain_core.embeddings import FakeEmbeddings
+
+FORMATS = ("faiss", "mmap-float32", "mmap-float16")
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _dir_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def build(root: Path, videos: int, chunks: int, dim: int) -> None:
+    from langchain_community.vectorstores import FAISS
+    from app.core.mmap_store import write_mmap_index
+
+    rng = np.random.default_rng(0)
+    for v in range(videos):
+        vectors = rng.normal(size=(chunks, dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        texts = [f"video {v} chunk {i} " + "lorem ipsum dolor sit amet " * 40 for i in range(chunks)]
+        metadatas = [{"chunk_index": i, "start": i * 30.0, "end": i * 30.0 + 30.0} for i in range(chunks)]
+        video_id = f"video{v:05d}"
+        store = FAISS.from_embeddings(list(zip(texts, vectors.tolist())), FakeEmbeddings(size=dim), metadatas=metadatas)
+        store.save_local(str(root / "faiss"), index_name=video_id)
+        write_mmap_index(str(root / "mmap-float32" / video_id), texts, vectors, metadatas, dtype="float32")
+        write_mmap_index(str(root / "mmap-float16" / video_id), texts, vectors, metadatas, dtype="float16")
+
+
+def child(fmt: str, root: Path, dim: int) -> None:
+    """Runs in a fresh interpreter: open every index of one format and query it once"""
+    if fmt == "faiss":
+        from langchain_community.vectorstores import FAISS
+
+        video_ids = sorted(p.stem for p in (root / "faiss").glob("*.faiss"))
+        open_one = lambda vid: FAISS.load_local(  # noqa: E731
+            str(root / "faiss"), FakeEmbeddings(size=dim), allow_dangerous_deserialization=True, index_name=vid
+        )
+    else:
+        from app.core.mmap_store import MmapVectorStore
+
+        video_ids = sorted(p.name for p in (root / fmt).iterdir())
+        open_one = lambda vid: MmapVectorStore(str(root / fmt / vid), None)  # noqa: E731
+
+    query = np.random.default_rng(1).normal(size=dim).astype(np.float32).tolist()
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    stores = [open_one(vid) for vid in video_ids]
+    opened = time.perf_counter() - start
+    for store in stores:
+        store.similarity_search_by_vector(query, k=4)
+    total = time.perf_counter() - start
+    print(json.dumps({
+        "videos": len(stores),
+        "open_ms": opened * 1000,
+        "open_and_query_ms": total * 1000,
+        "rss_growth_mb": _rss_mb() - rss_before,
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=400)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--child", choices=FORMATS, help=argparse.SUPPRESS)
+    parser.add_argument("--root", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, Path(args.root), args.dim)
+        return
+
+    root = Path(tempfile.mkdtemp(prefix="bench-cold-"))
+    build(root, args.videos, args.chunks, args.dim)
+    print(f"videos={args.videos} chunks/video={args.chunks} dim={args.dim}")
+    print(f"{'format':<14}{'disk MB':>9}{'open ms':>10}{'open+query ms':>15}{'RSS +MB':>9}")
+    for fmt in FORMATS:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.cold_load", "--child", fmt, "--root", str(root), "--dim", str(args.dim)],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        disk_mb = _dir_bytes(root / fmt) / (1024 * 1024)
+        print(
+            f"{fmt:<14}{disk_mb:>9.1f}{result['open_ms']:>10.1f}"
+            f"{result['open_and_query_ms']:>15.1f}{result['rss_growth_mb']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Concurrency benchmark: p50/p99 latency of `/health` and `/chat` with N in-flight chat requests.
+
+Runs the real FastAPI app in-process against stub LLM / embedding / transcript backends
+(fixed artificial latency, no network), so the numbers reflect event-loop behaviour only.
+
+Usage (from `backend/`):
+    python -m benchmarks.concurrency --inflight 50 --llm-latency 0.5
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Iterable, List, Optional
+
+# Point the app at a throwaway vector store dir before it is imported.
+os.environ.setdefault("VECTOR_STORE_DIR", tempfile.mkdtemp(prefix="bench-vs-"))
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+# All benchmark requests share one client IP; keep the daily quota out of the way.
+os.environ.setdefault("USER_TOKEN_LIMIT_DEFAULT", "1000000000")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from app.main import app
+from app.core.backends import FakeChatModel, FakeEmbeddings
+from app.core.services import get_rag_service
+from app.core.transcript_fetcher import TranscriptClient
+
+rag_service = get_rag_service()
+
+
+STUB_SEGMENTS = [
+    {"text": f"Segment {i} talks about topic {i % 7} and mentions keyword{i % 13}.", "start": i * 3.0, "duration": 3.0}
+    for i in range(400)
+]
+
+
+class StubTranscriptClient(TranscriptClient):
+    """Returns STUB_SEGMENTS after a fixed latency; ids in `unavailable` fail like a removed video."""
+
+    def __init__(self, latency: float = 0.0, unavailable: Iterable[str] = ()):
+        self.latency = latency
+        self.unavailable = set(unavailable)
+
+    def fetch(self, endpoint, video_id: str, languages) -> List[dict]:
+        time.sleep(self.latency)
+        if video_id in self.unavailable:
+            raise RuntimeError("Video unavailable")
+        return [dict(seg) for seg in STUB_SEGMENTS]
+
+
+def install_stubs(llm_latency: float, embed_latency: float, fetch_latency: float) -> None:
+    rag_service.embeddings = FakeEmbeddings(latency=embed_latency)
+    rag_service.llm = FakeChatModel(latency=llm_latency)
+    rag_service.transcript_fetcher.client = StubTranscriptClient(latency=fetch_latency)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(math.ceil(pct / 100.0 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+def summarize(name: str, samples: List[float]) -> str:
+    ms = [s * 1000 for s in samples]
+    return (
+        f"{name:<8} n={len(ms):<4} p50={percentile(ms, 50):8.1f}ms "
+        f"p99={percentile(ms, 99):8.1f}ms max={max(ms):8.1f}ms mean={statistics.mean(ms):8.1f}ms"
+    )
+
+
+async def _timed(client: httpx.AsyncClient, method: str, url: str, json: Optional[dict] = None) -> float:
+    start = time.perf_counter()
+    resp = await client.request(method, url, json=json)
+    elapsed = time.perf_counter() - start
+    resp.raise_for_status()
+    return elapsed
+
+
+async def run(inflight: int, health_probes: int, video_id: str) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await _timed(client, "POST", "/api/v1/video/process", {"video_id": video_id})
+
+        chat_body = {"video_id": video_id, "question": "What does segment 12 talk about?"}
+        chat_tasks = [
+            asyncio.create_task(_timed(client, "POST", "/api/v1/chat", chat_body))
+            for _ in range(inflight)
+        ]
+
+        # Probe /health while the chat requests are in flight.
+        health_samples: List[float] = []
+        await asyncio.sleep(0)
+        for _ in range(health_probes):
+            health_samples.append(await _timed(client, "GET", "/health"))
+            await asyncio.sleep(0.005)
+
+        chat_samples = await asyncio.gather(*chat_tasks)
+
+    print(f"in-flight /chat requests: {inflight}")
+    print(summarize("/health", health_samples))
+    print(summarize("/chat", list(chat_samples)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--inflight", type=int, default=50)
+    parser.add_argument("--health-probes", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--fetch-latency", type=float, default=0.2)
+    parser.add_argument("--video-id", default="benchVideo1")
+    args = parser.parse_args()
+
+    install_stubs(args.llm_latency, args.embed_latency, args.fetch_latency)
+    asyncio.run(run(args.inflight, args.health_probes, args.video_id))
+
+
+if __name__ == "__main__":
+    main()
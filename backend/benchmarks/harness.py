@@ -0,0 +1,246 @@
+"""
+Benchmark harness: one run over the main request paths, written as JSON to compare across commits.
+
+Runs the real app in-process on the fake embedding / LLM backends and fixture transcripts,
+selected through the normal settings (EMBEDDING_BACKEND=fake, LLM_BACKEND=fake,
+TRANSCRIPT_FIXTURES_DIR with synthetic segments), and measures:
+
+1. ingest: `/video/process` for `--videos` new videos, `--ingest-concurrency` at a time
+   (videos/s, segments/s, per-video p50 / p95).
+2. chat: `/chat` latency percentiles and throughput at each `--concurrency` level
+   (closed loop, answer cache off so every request runs retrieval and the LLM).
+3. quota: time per chat request spent reserving and committing quota (from the stage
+   timers), and its share of the mean `/chat` latency.
+4. index_load: loading a processed video's index from disk after its resident copy is dropped.
+
+The output holds a flat `metrics` map (e.g. "chat.c8.p95_ms") plus the commit, arguments and
+settings of the run. Lower is better for every metric except those ending in "_per_s".
+
+Usage (from `backend/`):
+    python -m benchmarks.harness --output bench-$(git rev-parse --short HEAD).json
+    python -m benchmarks.harness --compare bench-abc1234.json bench-def5678.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCHEMA_VERSION = 1
+QUESTIONS = (
+    "What happens during the guidance restart?",
+    "How does the crew use the keyboard and display?",
+    "What does part 3 say about fuel and thrust?",
+    "Why did the alarm go off before landing?",
+)
+# Settings recorded with every run (anything that changes the numbers).
+RECORDED_SETTINGS = (
+    "EMBEDDING_BACKEND", "LLM_BACKEND", "FAKE_EMBEDDING_DIM", "FAKE_EMBEDDING_LATENCY_SECONDS",
+    "FAKE_LLM_LATENCY_SECONDS", "FAKE_LLM_TOKEN_LATENCY_SECONDS", "TRANSCRIPT_FIXTURES_SYNTHETIC_SEGMENTS",
+    "TRANSCRIPT_FIXTURES_LATENCY_SECONDS", "INDEX_FORMAT", "INDEX_VECTOR_DTYPE", "INDEX_FACTORY",
+    "CHUNKING_STRATEGY", "CHUNK_TOKENS", "RETRIEVAL_MODE", "CONTEXT_ASSEMBLY_ENABLED", "RETRIEVER_K",
+    "EMBEDDING_CACHE_ENABLED", "ANSWER_CACHE_ENABLED", "QUOTA_SHARED", "METRICS_ENABLED", "CPU_EXECUTOR_WORKERS",
+)
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Select the fake backends through Settings; must run before the app is imported"""
+    os.environ.setdefault("VECTOR_STORE_DIR", tempfile.mkdtemp(prefix="bench-harness-"))
+    os.environ.update({
+        "EMBEDDING_BACKEND": "fake",
+        "LLM_BACKEND": "fake",
+        "FAKE_EMBEDDING_LATENCY_SECONDS": str(args.embed_latency),
+        "FAKE_LLM_LATENCY_SECONDS": str(args.llm_latency),
+        "FAKE_LLM_TOKEN_LATENCY_SECONDS": str(args.token_latency),
+        "TRANSCRIPT_FIXTURES_DIR": str(Path(__file__).parent / "fixtures"),
+        "TRANSCRIPT_FIXTURES_SYNTHETIC_SEGMENTS": str(args.segments),
+        "TRANSCRIPT_FIXTURES_LATENCY_SECONDS": str(args.fetch_latency),
+        "ANSWER_CACHE_ENABLED": "false",
+        # All requests share one client IP; keep the daily quota out of the way.
+        "USER_TOKEN_LIMIT_DEFAULT": "1000000000",
+    })
+
+
+def _percentiles(prefix: str, samples_ms: List[float], out: Dict[str, float]) -> None:
+    from benchmarks.concurrency import percentile
+
+    out[f"{prefix}.p50_ms"] = percentile(samples_ms, 50)
+    out[f"{prefix}.p95_ms"] = percentile(samples_ms, 95)
+    out[f"{prefix}.p99_ms"] = percentile(samples_ms, 99)
+    out[f"{prefix}.mean_ms"] = statistics.mean(samples_ms)
+
+
+async def _timed(client, method: str, url: str, json_body=None) -> float:
+    start = time.perf_counter()
+    resp = await client.request(method, url, json=json_body)
+    elapsed = (time.perf_counter() - start) * 1000
+    resp.raise_for_status()
+    return elapsed
+
+
+async def bench_ingest(client, video_ids: List[str], concurrency: int, segments: int, out: Dict[str, float]) -> None:
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(video_id: str) -> float:
+        async with semaphore:
+            return await _timed(client, "POST", "/api/v1/video/process", {"video_id": video_id})
+
+    start = time.perf_counter()
+    samples = await asyncio.gather(*(one(v) for v in video_ids))
+    wall = time.perf_counter() - start
+    out["ingest.videos_per_s"] = len(video_ids) / wall
+    out["ingest.segments_per_s"] = len(video_ids) * segments / wall
+    _percentiles("ingest.video", list(samples), out)
+
+
+async def bench_chat(client, video_ids: List[str], concurrency: int, requests: int, out: Dict[str, float]) -> None:
+    per_worker = max(1, requests // concurrency)
+
+    async def worker(w: int) -> List[float]:
+        samples = []
+        for i in range(per_worker):
+            n = w * per_worker + i
+            body = {"video_id": video_ids[n % len(video_ids)], "question": QUESTIONS[n % len(QUESTIONS)]}
+            samples.append(await _timed(client, "POST", "/api/v1/chat", body))
+        return samples
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    wall = time.perf_counter() - start
+    samples = [s for worker_samples in results for s in worker_samples]
+    out[f"chat.c{concurrency}.requests_per_s"] = len(samples) / wall
+    _percentiles(f"chat.c{concurrency}", samples, out)
+
+
+def bench_index_load(rag_service, video_ids: List[str], out: Dict[str, float]) -> None:
+    samples = []
+    for video_id in video_ids:
+        rag_service.resident.discard(video_id)
+        start = time.perf_counter()
+        rag_service._get_resident(video_id)
+        samples.append((time.perf_counter() - start) * 1000)
+    _percentiles("index_load", samples, out)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, float]:
+    import httpx
+
+    from app.core import metrics
+    from app.core.services import get_rag_service
+    from app.main import app
+
+    rag_service = get_rag_service()
+
+    metrics.configure(True, False)
+    out: Dict[str, float] = {}
+    video_ids = [f"hv{i:09d}" for i in range(args.videos)]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"1. ingest: {args.videos} videos x {args.segments} segments, {args.ingest_concurrency} at a time")
+        await bench_ingest(client, video_ids, args.ingest_concurrency, args.segments, out)
+
+        chat_means = []
+        quota_before = [metrics.STAGE_SECONDS.totals(s) for s in ("quota_reserve", "quota_commit")]
+        for concurrency in args.concurrency:
+            print(f"2. chat: {args.requests} requests at concurrency {concurrency}")
+            await bench_chat(client, video_ids, concurrency, args.requests, out)
+            chat_means.append(out[f"chat.c{concurrency}.mean_ms"])
+
+    quota_after = [metrics.STAGE_SECONDS.totals(s) for s in ("quota_reserve", "quota_commit")]
+    requests = max(1, quota_after[0][1] - quota_before[0][1])
+    quota_ms = sum(after[0] - before[0] for before, after in zip(quota_before, quota_after)) * 1000 / requests
+    out["quota.per_request_ms"] = quota_ms
+    out["quota.share_of_chat_pct"] = 100.0 * quota_ms / statistics.mean(chat_means)
+
+    print(f"3. index load: {len(video_ids)} videos from disk")
+    bench_index_load(rag_service, video_ids, out)
+    return out
+
+
+def _git(*cmd: str) -> str:
+    try:
+        return subprocess.run(
+            ["git", *cmd], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def write_results(path: str, args: argparse.Namespace, results: Dict[str, float]) -> None:
+    from app.core.config import settings
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        "commit": _git("rev-parse", "HEAD") or None,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "settings": {name: getattr(settings, name) for name in RECORDED_SETTINGS},
+        "metrics": {name: round(value, 4) for name, value in sorted(results.items())},
+    }
+    Path(path).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(f"\nwrote {len(results)} metrics to {path}")
+
+
+def compare(base_path: str, new_path: str) -> None:
+    base = json.loads(Path(base_path).read_text(encoding="utf-8"))
+    new = json.loads(Path(new_path).read_text(encoding="utf-8"))
+    print(f"base {(base.get('commit') or '?')[:10]}  new {(new.get('commit') or '?')[:10]}")
+    if base.get("args") != new.get("args") or base.get("settings") != new.get("settings"):
+        print("warning: the runs used different arguments or settings")
+    print(f"{'metric':<34}{'base':>12}{'new':>12}{'change':>9}")
+    for name in sorted(set(base["metrics"]) | set(new["metrics"])):
+        a, b = base["metrics"].get(name), new["metrics"].get(name)
+        if a is None or b is None:
+            print(f"{name:<34}{a if a is not None else '-':>12}{b if b is not None else '-':>12}")
+            continue
+        change = f"{100.0 * (b - a) / a:+.1f}%" if a else "-"
+        better = (b > a) if name.endswith("_per_s") else (b < a)
+        flag = "" if abs(b - a) <= 0.05 * abs(a) else (" better" if better else " WORSE")
+        print(f"{name:<34}{a:>12.3f}{b:>12.3f}{change:>9}{flag}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=20)
+    parser.add_argument("--segments", type=int, default=400, help="Synthetic transcript segments per video")
+    parser.add_argument("--ingest-concurrency", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=256, help="/chat requests per concurrency level")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Fake LLM time to first token (seconds)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Fake LLM delay per streamed token")
+    parser.add_argument("--embed-latency", type=float, default=0.01, help="Fake embedding latency per call")
+    parser.add_argument("--fetch-latency", type=float, default=0.0, help="Fixture transcript latency per fetch")
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    configure_environment(args)
+    results = asyncio.run(run(args))
+    width = max(len(name) for name in results)
+    for name, value in sorted(results.items()):
+        print(f"   {name:<{width}} {value:10.3f}")
+    write_results(args.output, args, results)
+
+
+if __name__ == "__main__":
+    main()
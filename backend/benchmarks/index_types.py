@@ -0,0 +1,115 @@
+"""
+Index-type benchmark: exact Flat vs compressed / approximate FAISS indexes.
+
+Builds each index type over the same synthetic embedding-like vectors (clusters in a
+low-dimensional latent space projected up to `--dim`, unit-normalised, as real sentence
+embeddings are) with the factory strings the service would use, and reports bytes per
+vector, build (train + add) time, single-query latency and recall@k against exact Flat
+search, both raw and after exact re-ranking of k * `--rerank` candidates (what mmap
+indexes do with INDEX_ANN_RERANK). `--factories` takes any faiss index-factory strings;
+`{nlist}` and `{m}` are filled in like INDEX_FACTORY.
+
+Usage (from `backend/`):
+    python -m benchmarks.index_types --vectors 20000 --dim 768
+    python -m benchmarks.index_types --factories "HNSW16" "IVF{nlist},PQ{m}x4fs"
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+DEFAULT_FACTORIES = (
+    "Flat",
+    "SQfp16",
+    "SQ8",
+    "HNSW32",
+    "HNSW32,SQfp16",
+    "HNSW32,SQ8",
+    "IVF{nlist},Flat",
+    "IVF{nlist},PQ{m}x4fs",
+)
+
+
+def synthetic(count: int, dim: int, queries: int, clusters: int, latent: int = 48, seed: int = 0):
+    """Clustered unit vectors, and queries that are perturbed copies of random data points"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, latent)).astype(np.float32)
+    points = centers[rng.integers(0, clusters, size=count)] + 0.7 * rng.normal(size=(count, latent)).astype(np.float32)
+    projection = rng.normal(size=(latent, dim)).astype(np.float32)
+    data = points @ projection + 0.5 * rng.normal(size=(count, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    query = data[rng.integers(0, count, size=queries)] + 0.02 * rng.normal(size=(queries, dim)).astype(np.float32)
+    query /= np.linalg.norm(query, axis=1, keepdims=True)
+    return data, query
+
+
+def _recall(found: np.ndarray, truth: np.ndarray, k: int) -> float:
+    return float(np.mean([len(set(f[:k]) & set(t[:k])) / k for f, t in zip(found, truth)]))
+
+
+def _rerank(data: np.ndarray, query: np.ndarray, ids: np.ndarray, k: int) -> np.ndarray:
+    ids = ids[ids >= 0]
+    distances = ((data[ids] - query) ** 2).sum(axis=1)
+    return ids[np.argsort(distances, kind="stable")[:k]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--rerank", type=int, default=4)
+    parser.add_argument("--factories", nargs="*", default=None, help="Index-factory strings to compare")
+    args = parser.parse_args()
+
+    import faiss
+    from app.core import ann
+
+    faiss.omp_set_num_threads(1)
+    data, queries = synthetic(args.vectors, args.dim, args.queries, args.clusters)
+    auto = ann.resolve_factory("auto", args.vectors, args.dim)
+    factories = list(dict.fromkeys(args.factories or DEFAULT_FACTORIES))
+
+    truth = None
+    print(f"vectors={args.vectors} dim={args.dim} queries={args.queries} k={args.k} "
+          f"nprobe={args.nprobe} efSearch={args.ef_search}  (auto -> {auto})")
+    print(f"{'factory':<22}{'bytes/vec':>10}{'build s':>9}{'p50 ms':>9}{'p95 ms':>9}{'recall@k':>10}{'reranked':>10}")
+    for template in ["Flat"] + [f for f in factories if f != "Flat"]:
+        factory = ann.resolve_factory(template, args.vectors, args.dim, ann_min_vectors=0)
+        start = time.perf_counter()
+        index = ann.build_index(data, factory)
+        build_s = time.perf_counter() - start
+        ann.configure_search(index, args.nprobe, args.ef_search)
+
+        latencies = []
+        found = np.empty((len(queries), args.k), dtype=np.int64)
+        for i, query in enumerate(queries):
+            start = time.perf_counter()
+            _, ids = index.search(query.reshape(1, -1), args.k)
+            latencies.append(time.perf_counter() - start)
+            found[i] = ids[0]
+        if truth is None:
+            truth = found
+        _, candidates = index.search(queries, args.k * max(1, args.rerank))
+        reranked = [_rerank(data, q, c, args.k) for q, c in zip(queries, candidates)]
+        ms = np.asarray(latencies) * 1000
+        print(
+            f"{factory:<22}{ann.index_bytes(index) / args.vectors:>10.0f}{build_s:>9.2f}"
+            f"{np.percentile(ms, 50):>9.3f}{np.percentile(ms, 95):>9.3f}"
+            f"{_recall(found, truth, args.k):>10.3f}{_recall(reranked, truth, args.k):>10.3f}"
+        )
+        del index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Library search benchmark: retrieval latency over the global index as the library grows.
+
+Appends `--videos` synthetic videos to a fresh `LibraryIndex` (the same `add_video` path
+`process_video` uses), then times top-k queries over the whole library and over random
+subsets of `--subset` videos, reporting p50 / p95 / max latency per query. Appends are
+timed too, as the per-video cost added to ingestion.
+
+Usage (from `backend/`):
+    python -m benchmarks.library_search --videos 2000 --chunks 50 --dim 1536
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+
+def _percentiles(samples):
+    ms = np.asarray(samples) * 1000
+    return np.percentile(ms, 50), np.percentile(ms, 95), ms.max()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=1000)
+    parser.add_argument("--chunks", type=int, default=50, help="Chunks per video")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--subset", type=int, default=10, help="Videos per filtered query")
+    parser.add_argument("--k", type=int, default=12)
+    args = parser.parse_args()
+
+    from app.core.library import LibraryIndex
+    from app.core.manifest import IndexLocks
+
+    root = tempfile.mkdtemp(prefix="bench-library-")
+    try:
+        library = LibraryIndex(root, IndexLocks(root), refresh_interval=3600)
+        rng = np.random.default_rng(0)
+        video_ids = [f"video{v:06d}" for v in range(args.videos)]
+        append_times = []
+        for video_id in video_ids:
+            vectors = rng.normal(size=(args.chunks, args.dim)).astype(np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            texts = [f"{video_id} chunk {i}" for i in range(args.chunks)]
+            metadatas = [{"chunk_index": i, "start": i * 30.0, "end": i * 30.0 + 30.0} for i in range(args.chunks)]
+            start = time.perf_counter()
+            library.add_video(video_id, texts, vectors, metadatas)
+            append_times.append(time.perf_counter() - start)
+
+        # A cold worker: open the library from disk and load every row.
+        start = time.perf_counter()
+        cold = LibraryIndex(root, IndexLocks(root), refresh_interval=3600)
+        cold.refresh(force=True)
+        load_s = time.perf_counter() - start
+
+        queries = rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+        rows = []
+        for label, subset in (("all videos", None), (f"{args.subset} videos", args.subset), ("1 video", 1)):
+            latencies = []
+            for query in queries:
+                video_filter = None if subset is None else list(rng.choice(video_ids, size=subset, replace=False))
+                start = time.perf_counter()
+                hits = cold.search(query, args.k, video_filter)
+                cold.documents([i for i, _ in hits])
+                latencies.append(time.perf_counter() - start)
+            rows.append((label, *_percentiles(latencies)))
+
+        stats = cold.stats()
+        print(f"videos={stats['videos']} vectors={stats['vectors']} dim={stats['dim']} k={args.k}")
+        p50, p95, worst = _percentiles(append_times)
+        print(f"append per video: p50={p50:.1f}ms p95={p95:.1f}ms  cold load: {load_s * 1000:.0f}ms")
+        print(f"{'filter':<14}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+        for label, p50, p95, worst in rows:
+            print(f"{label:<14}{p50:>9.1f}{p95:>9.1f}{worst:>9.1f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Metrics overhead benchmark: cost of stage timers and of the /metrics middleware.
+
+1. Per stage timer: ns per `with metrics.stage(...)` when disabled, enabled, and enabled
+   with a request trace collecting spans (an empty loop is the baseline).
+2. End to end: p50 / mean of `/chat` requests on the stub backends (zero LLM / embedding
+   latency, answer cache off, so the request is all pipeline overhead) with metrics off,
+   on, and on with tracing; plus the time to render `/metrics`.
+
+Usage (from `backend/`):
+    python -m benchmarks.metrics_overhead --requests 300
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from benchmarks.concurrency import app, install_stubs, percentile
+from app.core import metrics
+from app.core.config import settings
+
+VIDEO_ID = "metrVIDEO01"
+MODES = (("off", False, False), ("on", True, False), ("on+trace", True, True))
+
+
+def stage_cost(iterations: int) -> None:
+    def loop_ns(body) -> float:
+        start = time.perf_counter_ns()
+        body(iterations)
+        return (time.perf_counter_ns() - start) / iterations
+
+    def empty(n):
+        for _ in range(n):
+            pass
+
+    def timed(n):
+        for _ in range(n):
+            with metrics.stage("bench"):
+                pass
+
+    baseline = loop_ns(empty)
+    print(f"1. stage timer cost ({iterations} iterations; empty loop {baseline:.0f} ns)")
+    for name, enabled, trace in MODES:
+        metrics.configure(enabled, trace)
+        token = metrics._trace.set([]) if trace else None
+        cost = loop_ns(timed) - baseline
+        if token is not None:
+            metrics._trace.reset(token)
+        print(f"   {name:<10}{cost:>8.0f} ns per stage")
+
+
+async def end_to_end(requests: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        (await client.post("/api/v1/video/process", json={"video_id": VIDEO_ID})).raise_for_status()
+        body = {"video_id": VIDEO_ID, "question": "what does topic 3 say about keyword5"}
+        print(f"\n2. /chat end to end ({requests} requests per mode, modes interleaved)")
+        print(f"   {'mode':<10}{'p50 ms':>9}{'mean ms':>9}")
+        for _ in range(20):  # warm-up
+            (await client.post("/api/v1/chat", json=body)).raise_for_status()
+        results = {name: [] for name, _, _ in MODES}
+        for _ in range(requests):
+            for name, enabled, trace in MODES:
+                metrics.configure(enabled, trace)
+                start = time.perf_counter()
+                (await client.post("/api/v1/chat", json=body)).raise_for_status()
+                results[name].append((time.perf_counter() - start) * 1000)
+        for name, samples in results.items():
+            print(f"   {name:<10}{percentile(samples, 50):>9.3f}{statistics.mean(samples):>9.3f}")
+        off = percentile(results["off"], 50)
+        for name in ("on", "on+trace"):
+            print(f"   overhead {name}: {percentile(results[name], 50) - off:+.3f} ms per request (p50)")
+
+        start = time.perf_counter()
+        text = (await client.get("/metrics")).text
+        print(f"\n   /metrics: {len(text.splitlines())} lines, {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    settings.ANSWER_CACHE_ENABLED = False
+    install_stubs(llm_latency=0.0, embed_latency=0.0, fetch_latency=0.0)
+    stage_cost(args.iterations)
+    asyncio.run(end_to_end(args.requests))
+
+
+if __name__ == "__main__":
+    main()
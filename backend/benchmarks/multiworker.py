@@ -0,0 +1,142 @@
+"""
+Multi-worker load test: a real `uvicorn --workers N` server on the stub backends, all
+workers sharing one VECTOR_STORE_DIR.
+
+1. One `/video/process` (lands on one worker), then a burst of `/chat` requests spread over
+   every worker: each must find the video without processing it again.
+2. A quota burst for one user with a small limit: total usage recorded across workers must
+   not overshoot the limit by more than one request (QUOTA_SHARED=true).
+
+Usage (from `backend/`):
+    python -m benchmarks.multiworker --workers 4 --requests 400 --concurrency 64
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import List, Tuple
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.concurrency import summarize
+
+QUOTA_USER = "bench-quota-user"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(workers: int, port: int, store_dir: str, quota_limit: int, llm_latency: float) -> subprocess.Popen:
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {
+        **os.environ,
+        "VECTOR_STORE_DIR": store_dir,
+        "QUOTA_SHARED": "true",
+        "USER_TOKEN_LIMITS_JSON": json.dumps({QUOTA_USER: quota_limit}),
+        "BENCH_LLM_LATENCY": str(llm_latency),
+        "PYTHONPATH": os.pathsep.join(p for p in (backend_dir, os.environ.get("PYTHONPATH", "")) if p),
+    }
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "benchmarks.stub_app:app",
+            "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=backend_dir,
+        env=env,
+    )
+
+
+async def _wait_healthy(client: httpx.AsyncClient, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become healthy")
+
+
+async def _burst(
+    client: httpx.AsyncClient, video_id: str, n: int, concurrency: int, headers: dict, topic: str
+) -> List[Tuple[int, float]]:
+    """n /chat requests with distinct questions (so the answer cache does not serve them)"""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> Tuple[int, float]:
+        body = {"video_id": video_id, "question": f"What does {topic} {i} talk about?"}
+        async with sem:
+            start = time.perf_counter()
+            resp = await client.post("/api/v1/chat", json=body, headers=headers)
+            return resp.status_code, time.perf_counter() - start
+
+    return await asyncio.gather(*(one(i) for i in range(n)))
+
+
+async def run(args: argparse.Namespace, base_url: str, store_dir: str) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        await _wait_healthy(client)
+        resp = await client.post("/api/v1/video/process", json={"video_id": args.video_id})
+        resp.raise_for_status()
+
+        start = time.perf_counter()
+        results = await _burst(client, args.video_id, args.requests, args.concurrency, {}, "segment")
+        elapsed = time.perf_counter() - start
+        codes = Counter(code for code, _ in results)
+        print(f"workers={args.workers} requests={args.requests} concurrency={args.concurrency}")
+        print(f"/chat status codes: {dict(codes)}  throughput={args.requests / elapsed:.1f} req/s")
+        print(summarize("/chat", [t for code, t in results if code == 200]))
+
+        quota_results = await _burst(
+            client, args.video_id, args.quota_requests, args.concurrency, {"X-User-Id": QUOTA_USER}, "section"
+        )
+        quota_codes = Counter(code for code, _ in quota_results)
+
+    with sqlite3.connect(os.path.join(store_dir, "quota.sqlite3")) as conn:
+        row = conn.execute("SELECT SUM(tokens_used) FROM token_usage WHERE user_key = ?", (f"uid:{QUOTA_USER}",)).fetchone()
+    used = int(row[0] or 0)
+    print(f"quota burst: status codes {dict(quota_codes)}; recorded usage {used} / limit {args.quota_limit}")
+    failures = [code for code in codes if code != 200]
+    if failures:
+        raise SystemExit(f"FAIL: /chat returned {failures} across workers")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--quota-requests", type=int, default=100)
+    parser.add_argument("--quota-limit", type=int, default=300)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--video-id", default="benchVideo1")
+    args = parser.parse_args()
+
+    store_dir = tempfile.mkdtemp(prefix="bench-mw-")
+    port = _free_port()
+    server = _start_server(args.workers, port, store_dir, args.quota_limit, args.llm_latency)
+    try:
+        asyncio.run(run(args, f"http://127.0.0.1:{port}", store_dir))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
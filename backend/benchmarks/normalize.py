@@ -0,0 +1,131 @@
+"""
+Caption normalization benchmark: characters, chunks and embedding tokens saved per video,
+and the time the extra step costs.
+
+Inputs (from the fixture transcript in `benchmarks/fixtures/`):
+- clean: the fixture as-is (punctuated, one sentence per segment; only the speaker's own
+  verbatim repeats are removed), to show what normalization costs on tidy transcripts;
+- auto-captions: the same speech rendered the way YouTube's automatic captions arrive: lower
+  case, no punctuation, two-line rolling captions (each caption repeats the previous line),
+  `[Music]` / `[Applause]` tags, filler words, a sponsor read repeated `--repeats` times and
+  an opening passage of `--replay` words played again at the end (a recap / rerun).
+
+Each input is chunked as before (raw segments) and through the normalization path
+(`RAGService._prepare_chunks`: cleanup, chunking, SimHash near-duplicate removal) with the
+normal chunking settings, on the fake backends. `--length` concatenates the fixture N times
+for a video of realistic length; those copies chunk at different boundaries, so they only count
+as near-duplicates when they happen to line up.
+
+Usage (from `backend/`):
+    python -m benchmarks.normalize --copies 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "apollo_agc_transcript.json"
+SPONSOR = (
+    "this video is sponsored by orbital supply co if you want to build your own replica of the "
+    "display and keyboard unit head over to the link in the description and use the code apollo "
+    "for ten percent off your first order they ship worldwide and every kit comes with a printed "
+    "manual the soldering iron is not included but honestly you probably have one already and "
+    "thanks again to orbital supply co for supporting the channel now back to the computer"
+)
+FILLERS = ("um", "uh", "um", "uh", "erm")
+
+
+def load_clean() -> List[Dict]:
+    data = json.loads(FIXTURE.read_text(encoding="utf-8"))
+    return data["segments"] if isinstance(data, dict) else data
+
+
+def autocaptions(segments: List[Dict], repeats: int, replay: int, seed: int = 0) -> List[Dict]:
+    """The fixture's speech as rolling, unpunctuated auto-captions with tags, fillers and repeats"""
+    rng = random.Random(seed)
+    speech = " ".join(re.sub(r"[^\w\s']", " ", s["text"]).lower() for s in segments).split()
+    words: List[str] = []
+    every = max(1, len(speech) // (repeats + 1)) if repeats else len(speech) + 1
+    for i, word in enumerate(speech):
+        if repeats and i and i % every == 0 and i // every <= repeats:
+            words.extend(SPONSOR.split())
+        if rng.random() < 0.04:
+            words.append(rng.choice(FILLERS))
+        words.append(word)
+    words.extend(words[:replay])
+
+    lines = [" ".join(words[i:i + 7]) for i in range(0, len(words), 7)]
+    duration = segments[-1]["start"] + segments[-1].get("duration", 0.0)
+    step = duration / max(1, len(lines))
+    out = [{"text": "[Music]", "start": 0.0, "duration": 2.0}]
+    previous = ""
+    for i, line in enumerate(lines):
+        if rng.random() < 0.02:
+            out.append({"text": rng.choice(["[Music]", "[Applause]", "[Laughter]"]), "start": 2.0 + i * step, "duration": step})
+        out.append({"text": f"{previous} {line}".strip(), "start": 2.0 + i * step, "duration": step})
+        previous = line
+    out.append({"text": "[Music]", "start": 2.0 + len(lines) * step, "duration": 2.0})
+    return out
+
+
+def measure(rag_service, label: str, segments: List[Dict], copies: int) -> None:
+    start = time.perf_counter()
+    for _ in range(copies):
+        rag_service._split(segments)
+    raw_seconds = (time.perf_counter() - start) / copies
+    start = time.perf_counter()
+    for _ in range(copies):
+        chunks, report = rag_service._prepare_chunks(label, segments)
+    seconds = (time.perf_counter() - start) / copies
+    r = report.to_dict()
+
+    def pct(before: int, after: int) -> str:
+        return f"{100.0 * (before - after) / before:5.1f}%" if before else "    -"
+
+    print(f"\n{label}")
+    print(f"   {'':<22}{'raw':>10}{'normalized':>12}{'saved':>8}")
+    print(f"   {'characters':<22}{r['chars_before']:>10}{r['chars_after']:>12}{pct(r['chars_before'], r['chars_after']):>8}")
+    print(f"   {'segments':<22}{r['segments_before']:>10}{r['segments_after']:>12}{pct(r['segments_before'], r['segments_after']):>8}")
+    print(f"   {'chunks':<22}{r['chunks_before']:>10}{r['chunks_after']:>12}{pct(r['chunks_before'], r['chunks_after']):>8}")
+    print(f"   {'embedding tokens':<22}{r['tokens_before']:>10}{r['tokens_after']:>12}{pct(r['tokens_before'], r['tokens_after']):>8}")
+    print(f"   removed: {r['tags_removed']} tags, {r['fillers_removed']} fillers, "
+          f"{r['repeated_words_removed']} repeated caption words, {r['duplicate_chunks']} near-duplicate chunks")
+    print(f"   chunking {raw_seconds * 1000:.1f} ms raw vs {seconds * 1000:.1f} ms with normalization, "
+          f"SimHash dedup and the token counts for the report ({len(chunks)} chunks to embed)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=5, help="Timing repetitions per input")
+    parser.add_argument("--repeats", type=int, default=3, help="Times the sponsor read appears in the auto-captions")
+    parser.add_argument("--replay", type=int, default=1200, help="Opening words replayed at the end")
+    parser.add_argument("--length", type=int, default=4, help="Fixture speech repeated N times (longer video)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("VECTOR_STORE_DIR", tempfile.mkdtemp(prefix="bench-normalize-"))
+    os.environ.update({"EMBEDDING_BACKEND": "fake", "LLM_BACKEND": "fake"})
+    from app.core.services import get_rag_service
+
+    rag_service = get_rag_service()
+    clean = load_clean()
+    span = clean[-1]["start"] + clean[-1].get("duration", 0.0)
+    long_clean = [
+        {**seg, "start": seg["start"] + k * span} for k in range(max(1, args.length)) for seg in clean
+    ]
+    measure(rag_service, f"clean fixture x{args.length} ({len(long_clean)} segments)", long_clean, args.copies)
+    captions = autocaptions(long_clean, args.repeats, args.replay)
+    measure(rag_service, f"auto-captions ({len(captions)} segments)", captions, args.copies)
+
+
+if __name__ == "__main__":
+    main()
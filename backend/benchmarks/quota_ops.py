@@ -0,0 +1,121 @@
+"""
+Quota microbenchmark: operations per second for one chat's worth of quota accounting.
+
+Compares the write-behind `TokenQuotaStore` (in-memory counters, batched SQLite flushes
+over one connection) with a write-through baseline that opens a connection and writes
+on every call, which is how usage was recorded before. One "op" is a full request cycle:
+reserve + commit for the write-behind store, check + add for the baseline.
+
+Usage (from `backend/`):
+    python -m benchmarks.quota_ops --ops 20000 --threads 8 --users 100
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.quota import TokenQuotaStore, _utc_day_key
+
+
+class WriteThroughStore:
+    """Baseline: a fresh WAL connection and committed write per call."""
+
+    def __init__(self, db_path: str):
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS token_usage (user_key TEXT, day_key TEXT, tokens_used INTEGER, "
+                "updated_at INTEGER, PRIMARY KEY (user_key, day_key))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._db_path)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        return conn
+
+    def get_used(self, user_key: str, day_key: str) -> int:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT tokens_used FROM token_usage WHERE user_key = ? AND day_key = ?", (user_key, day_key)
+            ).fetchone()
+        return int(row[0]) if row else 0
+
+    def add_tokens(self, user_key: str, day_key: str, tokens: int) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO token_usage VALUES (?, ?, ?, ?) ON CONFLICT(user_key, day_key) "
+                "DO UPDATE SET tokens_used = tokens_used + excluded.tokens_used",
+                (user_key, day_key, int(tokens), int(time.time())),
+            )
+
+
+def _run(ops: int, threads: int, op: Callable[[int], None]) -> float:
+    per_thread = ops // threads
+
+    def worker(offset: int) -> None:
+        for i in range(per_thread):
+            op(offset + i)
+
+    pool = [threading.Thread(target=worker, args=(t * per_thread,)) for t in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--baseline-ops", type=int, default=2000, help="ops for the (slow) write-through baseline")
+    args = parser.parse_args()
+
+    day = _utc_day_key()
+    limit = 10 ** 12
+    tmp = tempfile.mkdtemp(prefix="bench-quota-")
+
+    store = TokenQuotaStore(os.path.join(tmp, "behind", "quota.sqlite3"), flush_interval=0.5)
+
+    def behind_op(i: int) -> None:
+        user = f"user{i % args.users}"
+        _, reservation = store.reserve(user, day, 300, limit)
+        store.commit(reservation, 120)
+
+    behind = _run(args.ops, args.threads, behind_op)
+    flush_start = time.perf_counter()
+    store.close()
+    flush_ms = (time.perf_counter() - flush_start) * 1000
+    reopened = TokenQuotaStore(os.path.join(tmp, "behind", "quota.sqlite3"), flush_interval=0)
+    persisted = sum(reopened.get_used(f"user{u}", day) for u in range(args.users))
+    reopened.close()
+
+    baseline_store = WriteThroughStore(os.path.join(tmp, "through.sqlite3"))
+
+    def through_op(i: int) -> None:
+        user = f"user{i % args.users}"
+        baseline_store.get_used(user, day)
+        baseline_store.add_tokens(user, day, 120)
+
+    through = _run(args.baseline_ops, args.threads, through_op)
+
+    print(f"threads={args.threads} users={args.users}")
+    print(f"write-through  {through:12,.0f} ops/s")
+    print(f"write-behind   {behind:12,.0f} ops/s  ({behind / through:,.0f}x), final flush {flush_ms:.1f}ms")
+    expected = (args.ops // args.threads) * args.threads * 120
+    print(f"persisted tokens after close: {persisted:,} (expected {expected:,})")
+
+
+if __name__ == "__main__":
+    main()
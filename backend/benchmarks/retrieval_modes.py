@@ -0,0 +1,104 @@
+"""
+Offline relevance benchmark: recall@k, MRR and latency of vector, lexical (BM25) and hybrid
+retrieval on a labelled fixture transcript (`fixtures/apollo_agc_transcript.json`).
+
+Each fixture query is labelled with the time span of the segment that answers it; a retrieved
+chunk is relevant if its [start, end] overlaps that span.
+
+By default vectors come from the hashed bag-of-words stub used by the other benchmarks (no
+network). Pass `--embeddings openai` to use EMBEDDING_MODEL (needs OPENAI_API_KEY) for
+numbers that reflect real semantic embeddings.
+
+Usage (from `backend/`):
+    python -m benchmarks.retrieval_modes --k 1 3 5 --chunk-tokens 48
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.concurrency import percentile
+from app.core.backends import FakeEmbeddings
+from app.core.chunking import SegmentChunker
+from app.core.config import settings
+from app.core.lexical import LEXICAL_FILE, BM25Index
+from app.core.mmap_store import MmapVectorStore, write_mmap_index
+from app.core.quota import TokenCounter
+from app.core.rag_service import ResidentVideo
+from app.core.services import get_rag_service
+
+FIXTURE = Path(__file__).parent / "fixtures" / "apollo_agc_transcript.json"
+MODES = ("vector", "lexical", "hybrid")
+
+
+def _relevant(doc_meta: Dict, query: Dict) -> bool:
+    return doc_meta.get("start", 0.0) < query["end"] and doc_meta.get("end", 0.0) > query["start"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--chunk-tokens", type=int, default=48)
+    parser.add_argument("--chunk-overlap", type=int, default=8)
+    parser.add_argument("--embeddings", choices=("stub", "openai"), default="stub")
+    parser.add_argument("--repeat", type=int, default=5, help="latency samples per query")
+    args = parser.parse_args()
+
+    fixture = json.loads(FIXTURE.read_text(encoding="utf-8"))
+    rag_service = get_rag_service()
+    if args.embeddings == "openai":
+        rag_service._ensure_clients()
+    else:
+        rag_service.embeddings = FakeEmbeddings()
+
+    chunker = SegmentChunker(TokenCounter(settings.LLM_MODEL), args.chunk_tokens, args.chunk_overlap)
+    chunks = chunker.split(fixture["segments"])
+    texts = [c.page_content for c in chunks]
+    index_dir = tempfile.mkdtemp(prefix="bench-retrieval-")
+    write_mmap_index(index_dir, texts, rag_service.embeddings.embed_documents(texts), [c.metadata for c in chunks])
+    BM25Index.build(texts).save(os.path.join(index_dir, LEXICAL_FILE))
+    resident = ResidentVideo(vector_store=MmapVectorStore(index_dir, rag_service.embeddings))
+
+    queries = fixture["queries"]
+    # Embed each question once up front so latency reflects retrieval, not the embedding call.
+    vectors = {q["question"]: rag_service.embeddings.embed_query(q["question"]) for q in queries}
+    max_k = max(args.k)
+
+    print(f"fixture: {len(fixture['segments'])} segments -> {len(chunks)} chunks, {len(queries)} queries, "
+          f"embeddings={args.embeddings}")
+    header = "".join(f"{f'recall@{k}':>11}" for k in args.k)
+    print(f"{'mode':<9}{header}{'MRR':>8}{'p50 ms':>9}{'p99 ms':>9}")
+    for mode in MODES:
+        settings.RETRIEVAL_MODE = mode
+        hits = {k: 0 for k in args.k}
+        reciprocal_ranks: List[float] = []
+        latencies: List[float] = []
+        for query in queries:
+            vector = None if mode == "lexical" else vectors[query["question"]]
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                if mode == "vector":
+                    docs = resident.vector_store.similarity_search_by_vector(vector, k=max_k)
+                else:
+                    docs = rag_service._ranked_search(resident, query["question"], vector, max_k)
+                latencies.append((time.perf_counter() - start) * 1000)
+            ranks = [i for i, doc in enumerate(docs, start=1) if _relevant(doc.metadata, query)]
+            first = ranks[0] if ranks else None
+            for k in args.k:
+                hits[k] += bool(first and first <= k)
+            reciprocal_ranks.append(1.0 / first if first else 0.0)
+        recalls = "".join(f"{hits[k] / len(queries):>11.2f}" for k in args.k)
+        mrr = sum(reciprocal_ranks) / len(queries)
+        print(f"{mode:<9}{recalls}{mrr:>8.3f}{percentile(latencies, 50):>9.3f}{percentile(latencies, 99):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Chat session benchmark: prompt size and quota charged per turn over a long conversation.
+
+Runs the real app in-process on the fake backends and the fixture transcript, asking the same
+`--turns` follow-up questions two ways:
+
+1. paste: no session; every question carries the earlier answers (what users did before
+   sessions existed). Prompt tokens grow with every turn.
+2. session: `session_id` on /chat. The prompt carries the running summary plus the newest
+   turns within SESSION_HISTORY_TOKENS; the rewrite / summary calls are charged as overhead.
+
+Prompt tokens = question (+ pasted answers) + session history + assembled context. The fake
+LLM answers every prompt, including rewrites and summaries, with one fixed `--answer-words`
+answer, so the token numbers are realistic but the rewritten queries are not; the answer
+cache is off so every turn runs the full path.
+
+Usage (from `backend/`):
+    python -m benchmarks.sessions --turns 40
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+VIDEO_ID = "apollo_agc_transcript"
+QUESTIONS = (
+    "What was the guidance computer doing during the landing?",
+    "Why did it raise those alarms?",
+    "Who decided it was safe to continue?",
+    "How did the software recover?",
+    "What would have happened without that design?",
+    "Where was that idea first used?",
+)
+HEADERS = {"x-user-id": "bench"}
+
+
+async def converse(client, turns: int, session: bool) -> List[Dict]:
+    from app.core import services
+
+    counter = services.get_token_counter()
+    session_id = None
+    if session:
+        resp = await client.post("/api/v1/chat/sessions", json={"video_id": VIDEO_ID}, headers=HEADERS)
+        resp.raise_for_status()
+        session_id = resp.json()["session_id"]
+
+    rows: List[Dict] = []
+    pasted: List[str] = []
+    for turn in range(turns):
+        question = QUESTIONS[turn % len(QUESTIONS)]
+        if not session and pasted:
+            question = "Earlier you said:\n" + "\n".join(pasted) + f"\n\nFollow-up: {question}"
+        body = {"video_id": VIDEO_ID, "question": question, "session_id": session_id}
+        start = time.perf_counter()
+        resp = await client.post("/api/v1/chat", json=body, headers=HEADERS)
+        seconds = time.perf_counter() - start
+        resp.raise_for_status()
+        data = resp.json()
+        info = data.get("session") or {}
+        question_tokens = counter.count(question)
+        answer_tokens = counter.count(data["answer"])
+        context_tokens = (data.get("context_usage") or {}).get("context_tokens", 0)
+        rows.append({
+            "prompt_tokens": question_tokens + info.get("history_tokens", 0) + context_tokens,
+            "charged": info.get("tokens_charged", question_tokens + answer_tokens),
+            "overhead": info.get("overhead_tokens", 0),
+            "summarized": info.get("summarized", False),
+            "seconds": seconds,
+        })
+        pasted.append(data["answer"])
+    return rows
+
+
+def report(label: str, rows: List[Dict], marks: List[int]) -> None:
+    print(f"\n{label}")
+    print(f"   {'turn':>6}{'prompt tokens':>15}{'charged':>9}{'overhead':>10}")
+    for turn in marks:
+        row = rows[turn - 1]
+        print(f"   {turn:>6}{row['prompt_tokens']:>15}{row['charged']:>9}{row['overhead']:>10}")
+    total = sum(r["charged"] for r in rows)
+    summaries = sum(1 for r in rows if r["summarized"])
+    latency = statistics.median(r["seconds"] for r in rows) * 1000
+    print(f"   total charged {total} tokens, max prompt {max(r['prompt_tokens'] for r in rows)} tokens, "
+          f"{summaries} summary updates, median turn {latency:.1f} ms")
+
+
+async def run(turns: int, answer_words: int) -> None:
+    import httpx
+
+    from app.core import services
+    from app.core.config import settings
+    from app.main import app
+
+    rag_service = await services.aget_rag_service()
+    rag_service._ensure_clients()
+    words = ("the computer restarted and dropped low priority work so guidance kept running while "
+             "the crew watched the alarms and mission control confirmed the landing could continue").split()
+    rag_service.llm.answer = " ".join(words[i % len(words)] for i in range(answer_words)) + "."
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        (await client.post("/api/v1/video/process", json={"video_id": VIDEO_ID})).raise_for_status()
+        paste = await converse(client, turns, session=False)
+        session = await converse(client, turns, session=True)
+
+    print(f"turns={turns} answer={answer_words} words SESSION_HISTORY_TOKENS={settings.SESSION_HISTORY_TOKENS} "
+          f"SESSION_SUMMARY_TOKENS={settings.SESSION_SUMMARY_TOKENS} CONTEXT_TOKEN_BUDGET={settings.CONTEXT_TOKEN_BUDGET}")
+    marks = sorted({m for m in (1, 2, 5, 10, 20, 40, 80, turns) if m <= turns})
+    report("1. paste earlier answers into the question", paste, marks)
+    report("2. session_id (summary + recent turns)", session, marks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--answer-words", type=int, default=80)
+    args = parser.parse_args()
+
+    os.environ.setdefault("VECTOR_STORE_DIR", tempfile.mkdtemp(prefix="bench-sessions-"))
+    os.environ.update({
+        "EMBEDDING_BACKEND": "fake",
+        "LLM_BACKEND": "fake",
+        "TRANSCRIPT_FIXTURES_DIR": str(FIXTURES_DIR),
+        "ANSWER_CACHE_ENABLED": "false",
+        "USER_TOKEN_LIMIT_DEFAULT": "1000000000",
+    })
+    asyncio.run(run(max(1, args.turns), max(1, args.answer_words)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Startup benchmark: import time, time to the first `/health` answer and RSS at boot.
+
+1. Import: a fresh interpreter imports `app.main` (what uvicorn loads before it can listen),
+   compared with also importing the RAG pipeline, which `app.main` used to pull in eagerly.
+2. Boot: a real `uvicorn app.main:app` process per STARTUP_WARMUP mode (off / background /
+   blocking) on the fake backends and fixture transcripts. Reports the time from spawn to
+   the first 200 from `/health` and the process RSS at that moment, then the time until a
+   first `/video/process` + `/chat` round trip completes and the RSS after it.
+
+RSS is read from /proc (Linux). Every number is the median of `--runs` runs.
+
+Usage (from `backend/`):
+    python -m benchmarks.startup --runs 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+VIDEO_ID = "apollo_agc_transcript"
+MODES = ("off", "background", "blocking")
+
+_IMPORT_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+print(json.dumps({"seconds": time.perf_counter() - start, "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def _env(vector_store_dir: str, warmup: str = "background") -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "VECTOR_STORE_DIR": vector_store_dir,
+        "STARTUP_WARMUP": warmup,
+        "EMBEDDING_BACKEND": "fake",
+        "LLM_BACKEND": "fake",
+        "TRANSCRIPT_FIXTURES_DIR": str(FIXTURES_DIR),
+        "USER_TOKEN_LIMIT_DEFAULT": "1000000000",
+        "PYTHONPATH": os.pathsep.join(p for p in (str(BACKEND_DIR), env.get("PYTHONPATH", "")) if p),
+    })
+    return env
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return None
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _request(url: str, body: Optional[dict] = None, timeout: float = 30.0) -> int:
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"} if data else {})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        resp.read()
+        return resp.status
+
+
+def measure_import(modules: List[str]) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as tmp:
+        out = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE, *modules],
+            cwd=BACKEND_DIR, env=_env(tmp), capture_output=True, text=True, check=True,
+        )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure_boot(warmup: str, timeout: float = 60.0) -> Dict[str, float]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as tmp:
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=_env(tmp, warmup), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            while True:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+                if time.perf_counter() - start > timeout:
+                    raise RuntimeError("timed out waiting for /health")
+                try:
+                    if _request(f"{base}/health", timeout=1.0) == 200:
+                        break
+                except (urllib.error.URLError, ConnectionError, OSError):
+                    time.sleep(0.005)
+            health = time.perf_counter() - start
+            health_rss = _rss_mb(proc.pid)
+
+            _request(f"{base}/api/v1/video/process", {"video_id": VIDEO_ID})
+            _request(f"{base}/api/v1/chat", {"video_id": VIDEO_ID, "question": "How did the computer recover from alarms?"})
+            first_chat = time.perf_counter() - start
+            return {"health_s": health, "health_rss_mb": health_rss, "first_chat_s": first_chat, "rss_mb": _rss_mb(proc.pid)}
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+def _median(runs: List[Dict[str, float]], key: str) -> Optional[float]:
+    values = [r[key] for r in runs if r.get(key) is not None]
+    return statistics.median(values) if values else None
+
+
+def _fmt(value: Optional[float], spec: str) -> str:
+    return format(value, spec) if value is not None else "n/a"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"1. import ({args.runs} runs, fresh interpreter each)")
+    print(f"   {'modules':<40}{'seconds':>9}{'max RSS MB':>12}")
+    for label, modules in (
+        ("app.main", ["app.main"]),
+        ("app.main + RAG pipeline (old eager)", ["app.main", "app.core.rag_service"]),
+    ):
+        runs = [measure_import(modules) for _ in range(args.runs)]
+        print(f"   {label:<40}{_median(runs, 'seconds'):>9.3f}{_median(runs, 'rss_mb'):>12.1f}")
+
+    print(f"\n2. uvicorn boot ({args.runs} runs per STARTUP_WARMUP mode)")
+    print(f"   {'mode':<12}{'/health s':>10}{'RSS MB':>9}{'first chat s':>14}{'RSS MB':>9}")
+    for mode in args.modes:
+        runs = [measure_boot(mode) for _ in range(args.runs)]
+        print(
+            f"   {mode:<12}{_median(runs, 'health_s'):>10.3f}{_fmt(_median(runs, 'health_rss_mb'), '.1f'):>9}"
+            f"{_median(runs, 'first_chat_s'):>14.3f}{_fmt(_median(runs, 'rss_mb'), '.1f'):>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
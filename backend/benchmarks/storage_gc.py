@@ -0,0 +1,143 @@
+"""
+Storage benchmark: video status lookups and listings from the manifest vs the filesystem,
+the one-time layout reconcile, and a GC pass evicting down to a disk budget.
+
+Builds `--videos` placeholder indexes (a `meta.json` plus a small vectors file, and a stored
+transcript) in the earlier flat layout: every index directory under `indexes/` and every
+legacy `{video_id}.faiss` next to the databases. Then:
+
+1. flat layout: `exists()` checks (what `/video/{id}/status` used to do) for hits and misses,
+   and a full listing by globbing the directories.
+2. reconcile: moving everything into 256 shards and backfilling the manifest (once per store).
+3. manifest: the same lookups / listing answered from `manifest.sqlite3`.
+4. GC: one pass with STORAGE_MAX_BYTES at half the current usage (LRU eviction).
+
+Lookups run against a warm page cache; on a cold or network volume the filesystem numbers grow,
+the manifest numbers do not.
+
+Usage (from `backend/`):
+    python -m benchmarks.storage_gc --videos 20000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.concurrency import percentile  # noqa: E402
+
+LANGUAGE = "en"
+
+
+def build_flat(root: Path, videos: int, legacy_share: float) -> List[str]:
+    """Placeholder indexes in the flat layout; returns the video ids"""
+    rng = random.Random(0)
+    video_ids = [f"v{i:010d}" for i in range(videos)]
+    (root / "indexes").mkdir(parents=True)
+    (root / "transcripts").mkdir()
+    payload = os.urandom(4096)
+    for video_id in video_ids:
+        if rng.random() < legacy_share:
+            (root / f"{video_id}.faiss").write_bytes(payload)
+            (root / f"{video_id}.pkl").write_bytes(payload[:1024])
+        else:
+            index_dir = root / "indexes" / video_id
+            index_dir.mkdir()
+            (index_dir / "meta.json").write_text(json.dumps({"count": 4, "dim": 256, "dtype": "float32"}))
+            (index_dir / "vectors.npy").write_bytes(payload)
+        (root / "transcripts" / f"{video_id}.{LANGUAGE}.jsonl.gz").write_bytes(payload[:512])
+    return video_ids
+
+
+def flat_exists(root: Path, video_id: str) -> bool:
+    return (root / "indexes" / video_id / "meta.json").exists() or (root / f"{video_id}.faiss").exists()
+
+
+def flat_listing(root: Path) -> List[str]:
+    ids = {p.parent.name for p in (root / "indexes").glob("*/meta.json")}
+    return sorted(ids | {p.stem for p in root.glob("*.faiss")})
+
+
+def time_lookups(check: Callable[[str], bool], video_ids: List[str]) -> List[float]:
+    samples = []
+    for video_id in video_ids:
+        start = time.perf_counter()
+        check(video_id)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def report(label: str, samples: List[float]) -> None:
+    print(f"   {label:<34}p50 {percentile(samples, 50):8.1f} us   p95 {percentile(samples, 95):8.1f} us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--legacy-share", type=float, default=0.3, help="Share of videos stored as .faiss/.pkl pairs")
+    args = parser.parse_args()
+
+    from app.core.manifest import IndexLocks, IndexManifest
+    from app.core.storage import StorageManager
+    from app.core.transcript_store import TranscriptStore
+
+    root = Path(tempfile.mkdtemp(prefix="bench-storage-"))
+    try:
+        start = time.perf_counter()
+        video_ids = build_flat(root, args.videos, args.legacy_share)
+        print(f"built {args.videos} placeholder videos in {time.perf_counter() - start:.1f}s ({root})")
+        rng = random.Random(1)
+        hits = rng.sample(video_ids, min(args.lookups, len(video_ids)))
+        misses = [f"m{i:010d}" for i in range(args.lookups)]
+        top_level = len(os.listdir(root))
+
+        print(f"\n1. flat layout ({top_level} entries at the top level, {len(os.listdir(root / 'indexes'))} in indexes/)")
+        report("status lookup, processed", time_lookups(lambda v: flat_exists(root, v), hits))
+        report("status lookup, not processed", time_lookups(lambda v: flat_exists(root, v), misses))
+        start = time.perf_counter()
+        listed = flat_listing(root)
+        print(f"   {'listing':<34}{(time.perf_counter() - start) * 1000:8.1f} ms  ({len(listed)} videos)")
+
+        manifest = IndexManifest(str(root / "manifest.sqlite3"))
+        locks = IndexLocks(str(root))
+        transcripts = TranscriptStore(str(root))
+        storage = StorageManager(str(root), manifest, locks, transcripts, LANGUAGE)
+        start = time.perf_counter()
+        result = storage.reconcile()
+        print(f"\n2. reconcile: {result['moved']} entries moved into shards, {result['described']} manifest rows "
+              f"in {time.perf_counter() - start:.1f}s (once per store)")
+
+        largest = max(len(os.listdir(p)) for p in (root / "indexes").iterdir())
+        print(f"\n3. manifest ({len(os.listdir(root))} entries at the top level, at most {largest} per index shard)")
+        report("status lookup, processed", time_lookups(storage.is_stored, hits))
+        report("status lookup, not processed", time_lookups(storage.is_stored, misses))
+        start = time.perf_counter()
+        listed = storage.video_ids()
+        print(f"   {'listing':<34}{(time.perf_counter() - start) * 1000:8.1f} ms  ({len(listed)} videos)")
+
+        now = int(time.time())
+        manifest.touch_many({video_id: now - rng.randrange(86400 * 30) for video_id in video_ids})
+        _, index_bytes, transcript_bytes = manifest.totals()
+        # Half of the videos, plus room for the shared databases (they count against the budget too).
+        storage.max_bytes = storage.usage()["other_bytes"] + (index_bytes + transcript_bytes) // 2
+        summary = storage.collect()
+        print(f"\n4. GC to a budget of {storage.max_bytes / 2**20:.1f} MiB: evicted {summary['evicted_budget']} videos "
+              f"({summary['freed_bytes'] / 2**20:.1f} MiB) in {summary['seconds']:.2f}s; "
+              f"{summary['used_bytes'] / 2**20:.1f} MiB left")
+        manifest.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""
+The real FastAPI app with stub LLM / embedding / transcript backends installed at import time,
+so it can be served by a real uvicorn process (including `--workers N`).
+
+    uvicorn benchmarks.stub_app:app --workers 4
+
+Latencies come from BENCH_LLM_LATENCY / BENCH_EMBED_LATENCY / BENCH_FETCH_LATENCY (seconds).
+"""
+import os
+
+from benchmarks.concurrency import app, install_stubs
+
+install_stubs(
+    llm_latency=float(os.environ.get("BENCH_LLM_LATENCY", "0.2")),
+    embed_latency=float(os.environ.get("BENCH_EMBED_LATENCY", "0.02")),
+    fetch_latency=float(os.environ.get("BENCH_FETCH_LATENCY", "0.2")),
+)
+
+__all__ = ["app"]
@@ -0,0 +1,197 @@
+"""
+Transcript fetcher benchmark against local stub HTTP servers (no YouTube, no network).
+
+Each stub server plays a proxy (requests sends it absolute-URI requests) that answers for
+the upstream itself: `ok` returns segments, `blocked` answers 403, `flaky` answers 429 for a
+share of requests. Fetches go through `HttpTranscriptClient`, i.e. the same endpoints,
+pooled sessions, rotation, backoff and breaker as production fetches.
+
+1. Connection reuse: N fetches with a new session per attempt (as before) vs pooled sessions;
+   wall time and TCP connections accepted by the server.
+2. Rotation: a pool of blocked, flaky and healthy proxies; success rate, attempts per
+   fetch, and the per-proxy metrics the fetcher reports.
+3. Circuit breaker: every proxy blocked; upstream requests made and time per failed fetch
+   once the breaker is open.
+
+Usage (from `backend/`):
+    python -m benchmarks.transcript_fetcher --fetches 200 --latency 0.005
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from youtube_transcript_api.proxies import GenericProxyConfig
+
+from app.core.transcript_fetcher import (
+    Backoff,
+    CircuitBreaker,
+    HttpTranscriptClient,
+    ProxyEndpoint,
+    ProxyPool,
+    TranscriptFetcher,
+)
+
+UPSTREAM = "http://transcripts.stub/v"
+SEGMENTS = json.dumps([
+    {"text": f"Segment {i} of the stub transcript.", "start": i * 3.0, "duration": 3.0} for i in range(200)
+]).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; with Nagle on, keep-alive responses stall on delayed ACKs.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        time.sleep(server.latency)
+        video_id = urlparse(self.path).path.rsplit("/", 1)[-1]
+        if server.mode == "blocked":
+            status, body = 403, b"blocked"
+        elif server.mode == "flaky" and server.rng.random() < server.failure_rate:
+            status, body = 429, b"too many requests"
+        else:
+            status, body = 200, SEGMENTS
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json" if status == 200 else "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Video-Id", video_id)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, mode: str = "ok", latency: float = 0.0, failure_rate: float = 0.5, seed: int = 0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.mode = mode
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+def _fetcher(servers, max_attempts=4, breaker_threshold=5, breaker_reset=60.0, cooldown=0.5) -> TranscriptFetcher:
+    endpoints = [ProxyEndpoint(f"{s.mode}@{s.server_address[1]}", GenericProxyConfig(http_url=s.url)) for s in servers]
+    return TranscriptFetcher(
+        pool=ProxyPool(endpoints, block_cooldown=cooldown, rate_limit_cooldown=cooldown / 4),
+        client=HttpTranscriptClient(UPSTREAM),
+        max_attempts=max_attempts,
+        backoff=Backoff(base=0.01, cap=0.1, rng=random.Random(0)),
+        breaker=CircuitBreaker(breaker_threshold, breaker_reset),
+    )
+
+
+def connection_reuse(fetches: int, latency: float) -> None:
+    print(f"1. connection reuse ({fetches} fetches, one healthy proxy)")
+    print(f"   {'mode':<26}{'wall s':>8}{'ms/fetch':>10}{'TCP conns':>11}")
+
+    server = StubServer("ok", latency)
+    proxies = {"http": server.url, "https": server.url}
+    start = time.perf_counter()
+    for i in range(fetches):
+        with requests.Session() as session:
+            session.proxies = proxies
+            session.get(f"{UPSTREAM}/vid{i:08d}", params={"lang": "en"}, timeout=10).json()
+    wall = time.perf_counter() - start
+    print(f"   {'new session per attempt':<26}{wall:>8.2f}{1000 * wall / fetches:>10.2f}{server.connections:>11}")
+    server.shutdown()
+
+    server = StubServer("ok", latency)
+    fetcher = _fetcher([server])
+    start = time.perf_counter()
+    for i in range(fetches):
+        fetcher.fetch(f"vid{i:08d}")
+    wall = time.perf_counter() - start
+    print(f"   {'pooled session':<26}{wall:>8.2f}{1000 * wall / fetches:>10.2f}{server.connections:>11}")
+    server.shutdown()
+
+
+def rotation(fetches: int, latency: float) -> None:
+    servers = [StubServer("blocked", latency), StubServer("flaky", latency, failure_rate=0.5), StubServer("ok", latency)]
+    fetcher = _fetcher(servers)
+    failed = 0
+    start = time.perf_counter()
+    for i in range(fetches):
+        try:
+            fetcher.fetch(f"vid{i:08d}")
+        except ValueError:
+            failed += 1
+    wall = time.perf_counter() - start
+    upstream = sum(s.requests for s in servers)
+    print(f"\n2. rotation ({fetches} fetches; proxies: blocked, 50% 429, healthy)")
+    print(f"   succeeded={fetches - failed}/{fetches} attempts/fetch={upstream / fetches:.2f} wall={wall:.2f}s")
+    print(f"   {'endpoint':<18}{'score':>7}{'attempts':>10}{'ok':>6}{'blocked':>9}{'429':>6}{'avg ms':>8}")
+    for stats in fetcher.stats()["endpoints"]:
+        print(
+            f"   {stats['name']:<18}{stats['score']:>7.2f}{stats['attempts']:>10}{stats['successes']:>6}"
+            f"{stats['blocked']:>9}{stats['rate_limited']:>6}{stats['avg_latency_ms'] or 0:>8.1f}"
+        )
+    for s in servers:
+        s.shutdown()
+
+
+def breaker(fetches: int, latency: float) -> None:
+    servers = [StubServer("blocked", latency) for _ in range(3)]
+    fetcher = _fetcher(servers, breaker_threshold=5)
+    fast = []
+    for i in range(fetches):
+        start = time.perf_counter()
+        try:
+            fetcher.fetch(f"vid{i:08d}")
+        except ValueError:
+            pass
+        if fetcher.breaker.state == CircuitBreaker.OPEN:
+            fast.append(time.perf_counter() - start)
+    stats = fetcher.stats()["breaker"]
+    print(f"\n3. circuit breaker ({fetches} fetches; all 3 proxies blocked, threshold 5)")
+    print(
+        f"   upstream requests={sum(s.requests for s in servers)} state={stats['state']} "
+        f"rejected={stats['rejected']} fail-fast p50={1000 * sorted(fast)[len(fast) // 2]:.3f}ms"
+    )
+    for s in servers:
+        s.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fetches", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.005, help="Stub server latency per request (seconds)")
+    args = parser.parse_args()
+
+    connection_reuse(args.fetches, args.latency)
+    rotation(args.fetches, args.latency)
+    breaker(args.fetches, args.latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Warm `/video/process` benchmark: repeated process calls for a video that is already resident.
+
+Runs the real app in-process on the stub backends. After one cold build, the same video is
+processed `--repeats` times:
+
+- resident: the fast path, answered from the resident copy without touching disk.
+- reload: the resident copy is dropped before each call (untimed), so every call reopens the
+  index and re-registers it, which is what each repeat call used to cost.
+
+Also reports the memory held per video by a per-video compiled chain (the previous layout:
+retriever lambda + RunnableParallel + prompt + LLM + parser per video) against the single
+shared chain that now takes the video's retriever at call time.
+
+Usage (from `backend/`):
+    python -m benchmarks.warm_process --repeats 200
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda, RunnableParallel, RunnablePassthrough
+
+from benchmarks.concurrency import app, install_stubs, percentile, rag_service
+from app.core.rag_service import RAG_PROMPT, format_docs
+
+VIDEO_ID = "warmVIDEO01"
+
+
+async def _timed_process(client: httpx.AsyncClient) -> float:
+    start = time.perf_counter()
+    resp = await client.post("/api/v1/video/process", json={"video_id": VIDEO_ID})
+    elapsed = time.perf_counter() - start
+    resp.raise_for_status()
+    return elapsed
+
+
+async def run(repeats: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        cold = await _timed_process(client)
+
+        resident = [await _timed_process(client) for _ in range(repeats)]
+
+        reload = []
+        for _ in range(repeats):
+            rag_service.resident.discard(VIDEO_ID)
+            reload.append(await _timed_process(client))
+
+    print(f"cold build: {cold * 1000:.1f}ms  repeats={repeats}")
+    print(f"{'mode':<10}{'p50 ms':>9}{'p99 ms':>9}{'mean ms':>9}")
+    for name, samples in (("resident", resident), ("reload", reload)):
+        ms = [s * 1000 for s in samples]
+        print(f"{name:<10}{percentile(ms, 50):>9.3f}{percentile(ms, 99):>9.3f}{sum(ms) / len(ms):>9.3f}")
+
+
+def _legacy_chain(entry):
+    """The per-video chain every registered video used to carry"""
+    retriever = RunnableLambda(lambda question: rag_service._retrieve(entry, question))
+    parallel_chain = RunnableParallel({
+        "context": retriever | RunnableLambda(format_docs),
+        "question": RunnablePassthrough(),
+    })
+    return retriever, parallel_chain | RAG_PROMPT | rag_service.llm | StrOutputParser()
+
+
+def chain_memory(videos: int) -> None:
+    entry = rag_service.resident.get(VIDEO_ID) or rag_service._get_resident(VIDEO_ID)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    legacy = [_legacy_chain(entry) for _ in range(videos)]
+    legacy_bytes = tracemalloc.get_traced_memory()[0] - base
+    del legacy
+    rag_service._chains = None
+    base = tracemalloc.get_traced_memory()[0]
+    rag_service._get_chains()
+    shared_bytes = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    print(f"\nchain objects for {videos} resident videos:")
+    print(f"  per-video chains: {legacy_bytes / 1024:9.1f} KiB ({legacy_bytes / videos / 1024:.1f} KiB per video)")
+    print(f"  shared chains:    {shared_bytes / 1024:9.1f} KiB (once, independent of the number of videos)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--videos", type=int, default=64, help="Resident videos for the chain memory comparison")
+    args = parser.parse_args()
+
+    install_stubs(llm_latency=0.0, embed_latency=0.0, fetch_latency=0.0)
+    asyncio.run(run(args.repeats))
+    chain_memory(args.videos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Shared test setup: the fake embedding / LLM backends, the fixture transcripts and a word-level
+tokenizer in place of tiktoken (whose encoders are downloaded on first use), so the suite runs
+offline without OPENAI_API_KEY or YouTube.
+
+Usage (from `backend/`):
+    python -m pytest tests
+"""
+from __future__ import annotations
+
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES_DIR = Path(__file__).resolve().parents[1] / "benchmarks" / "fixtures"
+VIDEO_ID = "apollo_agc_transcript"
+
+# Settings are read once at import; each test still gets its own VECTOR_STORE_DIR below.
+os.environ.setdefault("VECTOR_STORE_DIR", tempfile.mkdtemp(prefix="tests-"))
+os.environ.update({
+    "EMBEDDING_BACKEND": "fake",
+    "LLM_BACKEND": "fake",
+    "TRANSCRIPT_FIXTURES_DIR": str(FIXTURES_DIR),
+    "STARTUP_WARMUP": "off",
+})
+
+
+class WordEncoding:
+    """Deterministic stand-in for a tiktoken encoding: one token per word or punctuation mark"""
+
+    _TOKEN = re.compile(r"\w+|[^\w\s]")
+
+    def encode(self, text: str):
+        return [sum(map(ord, token)) for token in self._TOKEN.findall(text)]
+
+
+@pytest.fixture(autouse=True)
+def offline_tokenizer(monkeypatch):
+    from app.core.quota import TokenCounter
+
+    def __init__(self, model_name: str):
+        self._enc = WordEncoding()
+
+    monkeypatch.setattr(TokenCounter, "__init__", __init__)
+
+
+@pytest.fixture
+def video_id() -> str:
+    """The fixture transcript in `benchmarks/fixtures/`"""
+    return VIDEO_ID
+
+
+@pytest.fixture
+def rag_service(tmp_path, monkeypatch):
+    """A fresh RAGService over an empty VECTOR_STORE_DIR"""
+    from app.core.config import settings
+    from app.core.rag_service import RAGService
+
+    monkeypatch.setattr(settings, "VECTOR_STORE_DIR", str(tmp_path))
+    service = RAGService()
+    yield service
+    service.sessions.close()
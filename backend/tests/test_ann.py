@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+import faiss
+import numpy as np
+import pytest
+
+from app.core import ann
+
+
+@pytest.mark.parametrize("factory", ["Flat", "SQ8", "HNSW32", "HNSW32,SQfp16", "IVF16,Flat", "IVF16,PQ8x4fs"])
+def test_index_bytes_estimates_the_serialized_size(factory):
+    vectors = np.random.default_rng(0).standard_normal((2000, 32)).astype(np.float32)
+    index = ann.build_index(vectors, factory)
+    serialized = faiss.serialize_index(index).nbytes
+    assert ann.index_bytes(index) == pytest.approx(serialized, rel=0.15)
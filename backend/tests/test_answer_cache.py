@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.core.answer_cache import AnswerCache
+from app.core.backends import FakeEmbeddings
+
+embeddings = FakeEmbeddings()
+
+
+def test_exact_hit_ignores_case_and_punctuation():
+    cache = AnswerCache(similarity_threshold=0)
+    cache.put("v1", "What is the DSKY?", "A display and keyboard.")
+    assert cache.lookup_exact("v1", "what is the dsky").answer == "A display and keyboard."
+    assert cache.lookup_exact("v2", "what is the dsky") is None
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_semantic_hit_above_threshold_only():
+    cache = AnswerCache(similarity_threshold=0.95)
+    question = "which alarms did the guidance computer raise"
+    cache.put("v1", question, "1201 and 1202.", embeddings.embed_query(question))
+
+    reordered = embeddings.embed_query("the guidance computer raise which alarms did")
+    entry, score = cache.lookup_similar("v1", reordered)
+    assert entry.answer == "1201 and 1202." and score >= 0.95
+    assert cache.lookup_similar("v1", embeddings.embed_query("who built the rope memory")) is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_invalidate_drops_the_video():
+    cache = AnswerCache()
+    question = "what is the dsky"
+    cache.put("v1", question, "A display and keyboard.", embeddings.embed_query(question))
+    cache.put("v2", question, "Something else.")
+    cache.invalidate("v1")
+    assert cache.lookup_exact("v1", question) is None
+    assert cache.lookup_similar("v1", embeddings.embed_query(question)) is None
+    assert cache.lookup_exact("v2", question) is not None
+
+
+def test_lru_bound_per_video():
+    cache = AnswerCache(similarity_threshold=0, max_entries_per_video=2)
+    for i in range(3):
+        cache.put("v1", f"question {i}", f"answer {i}")
+    assert cache.lookup_exact("v1", "question 0") is None
+    assert cache.lookup_exact("v1", "question 2") is not None
+
+
+def test_chat_is_served_from_the_cache_until_rebuild(rag_service, video_id):
+    async def main():
+        await rag_service.aprocess_video(video_id=video_id)
+        question = "Why did the guidance computer raise alarms during the landing?"
+        first = await rag_service.achat(video_id, question)
+        exact = await rag_service.achat(video_id, question.upper())
+        # Same words in another order: a different exact key, the same fake embedding.
+        similar = await rag_service.achat(video_id, "During the landing? Why did the guidance computer raise alarms")
+        await rag_service.arebuild_video(video_id)
+        after_rebuild = await rag_service.achat(video_id, question)
+        return first, exact, similar, after_rebuild
+
+    first, exact, similar, after_rebuild = asyncio.run(main())
+    assert not first["cached"]
+    assert exact["cached"] and exact["answer"] == first["answer"]
+    assert similar["cached"]
+    assert not after_rebuild["cached"]
+    stats = rag_service.answer_cache.stats()
+    assert stats["exact_hits"] == 1 and stats["semantic_hits"] == 1 and stats["invalidations"] == 1
+
+
+def test_unrewritten_follow_ups_skip_the_cache(rag_service, video_id, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "SESSION_REWRITE_QUERIES", False)
+
+    async def main():
+        await rag_service.aprocess_video(video_id=video_id)
+        answers = []
+        for user in ("uid:a", "uid:b"):
+            session = rag_service.sessions.create(user, video_id)
+            first = await rag_service.achat(video_id, "Tell me about the alarms", session=session)
+            rag_service.sessions.add_turn(
+                session.session_id, question=first["question"], query=first["question"], answer=first["answer"],
+                question_tokens=5, answer_tokens=10, overhead_tokens=0, tokens_charged=15,
+            )
+            session = rag_service.sessions.get(session.session_id)
+            answers.append(await rag_service.achat(video_id, "What about it?", session=session))
+        return answers
+
+    # Without a rewrite the follow-up means something else in every session.
+    for answer in asyncio.run(main()):
+        assert not answer["cached"] and not answer["session"]["rewritten"]
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import services
+from app.core.quota import check_quota
+from app.main import app
+
+
+@pytest.fixture
+def client(rag_service, monkeypatch):
+    """The API over the test's RAGService and a fresh quota store (no lifespan: no job workers or GC)"""
+    monkeypatch.setattr(services, "_rag_service", services._Lazy(lambda: rag_service))
+    monkeypatch.setattr(services, "_quota_store", services._Lazy(services._build_quota_store))
+    monkeypatch.setattr(services, "_token_counter", services._Lazy(services._build_token_counter))
+    yield TestClient(app)
+    services.get_quota_store().close()
+
+
+def _events(body: str):
+    """(event, data) pairs of a Server-Sent Events body"""
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        yield fields["event"], json.loads(fields["data"])
+
+
+def test_process_then_chat(client, video_id):
+    response = client.post("/api/v1/video/process", json={"video_id": video_id})
+    assert response.status_code == 200, response.text
+    assert response.json()["video_id"] == video_id
+
+    response = client.post(
+        "/api/v1/chat",
+        json={"video_id": video_id, "question": "What did the guidance computer do?"},
+        headers={"X-User-Id": "tester"},
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["answer"] and body["sources"]
+
+
+def test_chat_about_an_unprocessed_video_is_a_400(client):
+    response = client.post("/api/v1/chat", json={"video_id": "missing", "question": "Anything?"})
+    assert response.status_code == 400
+
+
+def test_chat_stream_charges_the_answer(client, video_id):
+    assert client.post("/api/v1/video/process", json={"video_id": video_id}).status_code == 200
+
+    response = client.post(
+        "/api/v1/chat/stream",
+        json={"video_id": video_id, "question": "What did the guidance computer do?"},
+        headers={"X-User-Id": "tester"},
+    )
+    assert response.status_code == 200, response.text
+    events = list(_events(response.text))
+    names = [name for name, _ in events]
+    assert names[0] == "context" and "token" in names and names[-1] == "done"
+    answer = "".join(data["text"] for name, data in events if name == "token")
+    usage = events[-1][1]["usage"]
+    assert answer and usage["answer_tokens"] > 0
+    assert usage["quota_used"] == usage["tokens_charged"] == usage["question_tokens"] + usage["answer_tokens"]
+
+
+def test_a_failed_stream_releases_its_reservation(client, rag_service, video_id, monkeypatch):
+    assert client.post("/api/v1/video/process", json={"video_id": video_id}).status_code == 200
+
+    async def broken_stream(*args, **kwargs):
+        yield "context", {"cached": False}
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(rag_service, "astream_chat", broken_stream)
+    response = client.post(
+        "/api/v1/chat/stream",
+        json={"video_id": video_id, "question": "What did the guidance computer do?"},
+        headers={"X-User-Id": "tester"},
+    )
+    name, data = list(_events(response.text))[-1]
+    assert name == "error" and data["status"] == 500
+    decision = check_quota(services.get_quota_store(), "uid:tester", limit=1000)
+    assert decision.used == 0 and decision.remaining == 1000
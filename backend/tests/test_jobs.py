@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from app.core.jobs import STATUS_QUEUED, STATUS_RUNNING, STATUS_SUCCEEDED, JobQueue, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"), lease_seconds=60)
+
+
+def test_create_returns_the_active_job_for_a_video(store):
+    job = store.create("v1")
+    assert store.create("v1").job_id == job.job_id
+    assert store.create("v2").job_id != job.job_id
+
+
+def test_claim_is_oldest_first_and_exclusive(store):
+    first, second = store.create("v1"), store.create("v2")
+    assert store.claim_next("worker-a").job_id == first.job_id
+    assert store.claim_next("worker-b").job_id == second.job_id
+    assert store.claim_next("worker-a") is None
+    assert store.get(first.job_id).status == STATUS_RUNNING
+
+
+def test_live_leases_are_not_requeued(store, tmp_path):
+    job = store.create("v1")
+    store.claim_next("worker-a")
+    # Another worker booting must leave the running job alone.
+    assert JobStore(str(tmp_path / "jobs.sqlite3")).requeue_expired() == 0
+    assert store.get(job.job_id).status == STATUS_RUNNING
+
+
+def test_expired_leases_are_requeued(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.05)
+    job = store.create("v1")
+    store.claim_next("worker-a")
+    time.sleep(0.1)
+    assert store.requeue_expired() == 1
+    requeued = store.get(job.job_id)
+    assert requeued.status == STATUS_QUEUED and requeued.progress == 0
+    assert not store.renew_lease(job.job_id, "worker-a")
+    assert store.claim_next("worker-b").job_id == job.job_id
+
+
+def test_renewing_keeps_the_lease(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.2)
+    job = store.create("v1")
+    store.claim_next("worker-a")
+    for _ in range(3):
+        time.sleep(0.1)
+        assert store.renew_lease(job.job_id, "worker-a")
+        assert store.requeue_expired() == 0
+    assert not store.renew_lease(job.job_id, "worker-b")
+
+
+def test_databases_without_lease_columns_are_migrated(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE ingest_jobs (job_id TEXT PRIMARY KEY, video_id TEXT NOT NULL, status TEXT NOT NULL, "
+            "stage TEXT NOT NULL, progress REAL NOT NULL DEFAULT 0, error TEXT, created_at INTEGER NOT NULL, "
+            "updated_at INTEGER NOT NULL)"
+        )
+        conn.execute("INSERT INTO ingest_jobs VALUES ('old', 'v1', 'running', 'embedding', 0.5, NULL, 0, 0)")
+    store = JobStore(db_path)
+    # Running rows from before leases have no lease and count as expired.
+    assert store.requeue_expired() == 1
+    assert store.claim_next("worker-a").job_id == "old"
+
+
+def test_queue_runs_jobs_and_takes_over_from_a_dead_worker(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    started = []
+
+    async def runner(video_id, progress):
+        started.append(video_id)
+        await progress("embedding", 0.5)
+        await asyncio.sleep(0.3)
+
+    async def main():
+        dead = JobQueue(JobStore(db_path, lease_seconds=0.2), runner, workers=1, poll_interval=0.02)
+        await dead.start()
+        job = await dead.submit("v1")
+        while not started:
+            await asyncio.sleep(0.01)
+        live = JobQueue(JobStore(db_path, lease_seconds=0.2), runner, workers=1, poll_interval=0.02)
+        await live.start()
+        assert live.store.get(job.job_id).status == STATUS_RUNNING
+        # The first worker stops renewing; the second requeues the job once the lease runs out.
+        await dead.stop()
+        deadline = time.monotonic() + 5
+        while live.store.get(job.job_id).status != STATUS_SUCCEEDED and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        await live.stop()
+        return live.store.get(job.job_id)
+
+    done = asyncio.run(main())
+    assert done.status == STATUS_SUCCEEDED and done.progress == 1.0
+    assert started == ["v1", "v1"]
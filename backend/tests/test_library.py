@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.core.library import LibraryIndex
+from app.core.manifest import IndexLocks
+
+DIM = 8
+
+
+def rows(video_id: str, n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    texts = [f"{video_id} chunk {i}" for i in range(n)]
+    return texts, vectors, [{"chunk_index": i, "start": float(i), "end": i + 1.0} for i in range(n)]
+
+
+@pytest.fixture
+def make_library(tmp_path):
+    locks = IndexLocks(str(tmp_path))
+
+    def make(**kwargs) -> LibraryIndex:
+        return LibraryIndex(str(tmp_path), locks, refresh_interval=0, **kwargs)
+
+    return make
+
+
+def top_text(library: LibraryIndex, vector, video_ids=None) -> str:
+    hits = library.search(vector, 1, video_ids)
+    return library.documents([hits[0][0]])[0].page_content
+
+
+def test_rebuilds_tombstone_until_compacted(make_library):
+    library = make_library(compact_threshold=1.0)
+    texts, vectors, metas = rows("a", 10, 0)
+    library.add_video("a", texts, vectors, metas)
+    library.add_video("b", *rows("b", 10, 1))
+    for seed in range(2, 5):
+        texts, vectors, metas = rows("a", 10, seed)
+        library.add_video("a", texts, vectors, metas)
+    assert library.dead_fraction() == pytest.approx(30 / 50)
+
+    assert library.compact() == 30
+    assert library.dead_fraction() == 0
+    assert library._vectors_path().stat().st_size == 20 * DIM * 4
+    # Ids and vectors still line up after the rows moved.
+    assert top_text(library, vectors[3], ["a"]) == "a chunk 3"
+    assert library.stats()["vectors"] == 20
+
+
+def test_threshold_triggers_compaction(make_library):
+    library = make_library(compact_threshold=0.5)
+    library.add_video("a", *rows("a", 10, 0))
+    library.add_video("b", *rows("b", 10, 1))
+    library.remove_video("a")
+    assert library.compactions == 1 and library.dead_fraction() == 0
+    assert library.video_ids() == ["b"]
+
+
+def test_other_workers_reload_after_a_compaction(make_library):
+    writer, reader = make_library(compact_threshold=1.0), make_library(compact_threshold=1.0)
+    library_rows = rows("a", 10, 0)
+    writer.add_video("a", *library_rows)
+    writer.add_video("b", *rows("b", 10, 1))
+    assert top_text(reader, library_rows[1][4]) == "a chunk 4"
+
+    writer.remove_video("b")
+    texts, vectors, metas = rows("c", 10, 2)
+    writer.add_video("c", texts, vectors, metas)
+    writer.compact()
+    assert reader.video_ids() == ["a", "c"]
+    assert top_text(reader, vectors[7]) == "c chunk 7"
+    assert top_text(reader, library_rows[1][4], ["a"]) == "a chunk 4"
+
+
+def test_ids_are_not_reused_after_compaction(make_library):
+    library = make_library(compact_threshold=1.0)
+    library.add_video("a", *rows("a", 5, 0))
+    library.add_video("b", *rows("b", 5, 1))
+    before = {hit for hit, _ in library.search(rows("b", 5, 1)[1][0], 5)}
+    library.remove_video("b")
+    library.compact()
+    library.add_video("c", *rows("c", 5, 2))
+    after = {hit for hit, _ in library.search(rows("c", 5, 2)[1][0], 5, ["c"])}
+    assert not before & after
+
+
+def test_chunks_without_a_row_use_their_id(make_library):
+    # Libraries written before compaction existed stored row == id and no row column value.
+    library = make_library(compact_threshold=1.0)
+    texts, vectors, metas = rows("a", 6, 0)
+    library.add_video("a", texts, vectors, metas)
+    library._conn.execute("UPDATE library_chunks SET row = NULL")
+    library.add_video("b", *rows("b", 6, 1))
+    library.remove_video("a")
+    library.add_video("a", texts, vectors, metas)
+    library.compact()
+    assert top_text(make_library(), vectors[2], ["a"]) == "a chunk 2"
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import faiss
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+
+from app.core import ann, rag_service as rag_service_module
+from app.core.mmap_store import MmapVectorStore
+
+
+@pytest.fixture
+def legacy_ivf_index(rag_service, video_id, monkeypatch):
+    """The fixture video saved as a legacy FAISS pickle over an IVF index"""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "INDEX_FORMAT", "faiss")
+    monkeypatch.setattr(settings, "INDEX_FACTORY", "IVF{nlist},Flat")
+    monkeypatch.setattr(settings, "INDEX_ANN_MIN_VECTORS", 0)
+    rag_service.process_video(video_id=video_id)
+    monkeypatch.setattr(settings, "INDEX_FORMAT", "mmap")
+    return video_id
+
+
+def test_reconstructs_ivf_indexes_without_a_direct_map():
+    vectors = np.random.default_rng(0).standard_normal((400, 16)).astype(np.float32)
+    index = ann.build_index(vectors, "IVF4,Flat")
+    index = faiss.deserialize_index(faiss.serialize_index(index))
+    np.testing.assert_allclose(ann.reconstruct_all(index), vectors, rtol=1e-6)
+
+
+def test_ivf_pickles_are_migrated_on_load(rag_service, legacy_ivf_index):
+    vector_store, _ = rag_service._load_versioned(legacy_ivf_index)
+    assert isinstance(vector_store, MmapVectorStore)
+
+
+def test_a_failed_migration_keeps_serving_the_faiss_index(rag_service, legacy_ivf_index, monkeypatch):
+    def fail(vector_store):
+        raise RuntimeError("reconstruct not implemented")
+
+    monkeypatch.setattr(rag_service_module, "export_faiss_store", fail)
+    vector_store, _ = rag_service._load_versioned(legacy_ivf_index)
+    assert isinstance(vector_store, FAISS)
+    assert vector_store.similarity_search("guidance computer", k=1)
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from langchain_core.documents import Document
+
+from app.core.chunking import SegmentChunker
+from app.core.normalize import dedup_chunks, normalize_segments, simhash
+
+
+class WordCounter:
+    """One token per word, so chunk sizes are easy to reason about"""
+
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+
+def segment(text: str, start: float, duration: float = 2.0) -> dict:
+    return {"text": text, "start": start, "duration": duration}
+
+
+def test_tags_and_fillers_are_removed():
+    segments = [segment("[Music]", 0), segment("um so the computer uh restarted", 2), segment("(applause)", 4)]
+    cleaned, report = normalize_segments(segments)
+    assert [s["text"] for s in cleaned] == ["so the computer restarted"]
+    assert report.tags_removed == 2 and report.fillers_removed == 2
+    assert report.segments_before == 3 and report.segments_after == 1
+
+
+def test_fillers_are_kept_when_asked():
+    cleaned, _ = normalize_segments([segment("um so the computer restarted", 0)], remove_fillers=False)
+    assert cleaned[0]["text"] == "um so the computer restarted"
+
+
+def test_rolling_caption_repeats_keep_only_new_words():
+    segments = [
+        segment("the computer restarted", 0),
+        segment("the computer restarted and dropped low priority work", 2),
+        segment("the computer restarted and dropped low priority work", 4),
+    ]
+    cleaned, report = normalize_segments(segments)
+    assert [s["text"] for s in cleaned] == ["the computer restarted", "and dropped low priority work"]
+    # The identical third caption's time goes to the previous segment.
+    assert cleaned[-1]["start"] == 2 and cleaned[-1]["duration"] == 4
+    assert report.repeated_words_removed == 3 + 8
+
+
+def test_near_duplicate_chunks_are_dropped():
+    sponsor = (
+        "this video is sponsored by orbital supply co if you want to build your own replica of the display "
+        "and keyboard unit head over to the link in the description and use the code apollo for ten percent "
+        "off your first order they ship worldwide and every kit comes with a printed manual"
+    )
+    docs = [
+        Document(page_content=sponsor, metadata={"chunk_index": 0}),
+        Document(page_content="the guidance computer restarted and kept the landing on track", metadata={"chunk_index": 1}),
+        # The same read with one word changed.
+        Document(page_content=sponsor.replace("ten", "10"), metadata={"chunk_index": 2}),
+        Document(page_content="short line", metadata={"chunk_index": 3}),
+        Document(page_content="Short line", metadata={"chunk_index": 4}),
+    ]
+    kept, dropped = dedup_chunks(docs)
+    assert dropped == 2
+    assert [d.metadata["chunk_index"] for d in kept] == [0, 1, 3]
+
+
+def test_simhash_needs_enough_words():
+    assert simhash("too short to hash") is None
+    assert simhash("one two three four five six seven eight") is not None
+
+
+def test_chunks_respect_the_token_budget_and_overlap():
+    segments = [segment(" ".join(f"w{i}-{j}" for j in range(4)), i * 2.0) for i in range(10)]
+    docs = SegmentChunker(WordCounter(), max_tokens=12, overlap_tokens=4).split(segments)
+    assert all(d.metadata["tokens"] <= 12 for d in docs)
+    assert [d.metadata["chunk_index"] for d in docs] == list(range(len(docs)))
+    # Each chunk after the first starts with the last segment of the previous one.
+    for previous, current in zip(docs, docs[1:]):
+        assert current.page_content.split()[:4] == previous.page_content.split()[-4:]
+        assert current.metadata["start"] < previous.metadata["end"]
+    assert docs[0].metadata["start"] == 0 and docs[-1].metadata["end"] == 20
+
+
+def test_oversized_segments_are_split_on_words():
+    docs = SegmentChunker(WordCounter(), max_tokens=5, overlap_tokens=0).split([segment(" ".join(["word"] * 12), 0, 12)])
+    assert [d.metadata["tokens"] for d in docs] == [5, 5, 2]
+    assert docs[-1].metadata["end"] == 12
+
+
+def test_prepare_chunks_reports_what_was_saved(rag_service):
+    captions = [segment("[Music]", 0)]
+    line = "the guidance computer restarted and kept the landing on track while the crew watched"
+    captions += [segment(line, 2 + i * 2) for i in range(3)]
+    chunks, report = rag_service._prepare_chunks("v1", captions)
+    assert len(chunks) == 1 and chunks[0].page_content == line
+    assert report.tags_removed == 1 and report.chars_after < report.chars_before
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import pytest
+
+from app.core.quota import SharedTokenQuotaStore, TokenQuotaStore, check_quota, reserve_quota
+
+DAY = "2026-01-01"
+
+
+@pytest.fixture(params=["local", "shared"])
+def store(request, tmp_path):
+    db_path = str(tmp_path / "quota.sqlite3")
+    store = TokenQuotaStore(db_path, flush_interval=0) if request.param == "local" else SharedTokenQuotaStore(db_path)
+    yield store
+    store.close()
+
+
+def test_reserve_holds_tokens_until_commit(store):
+    decision, reservation = reserve_quota(store, "uid:a", limit=100, estimated_tokens=30, day_key=DAY)
+    assert decision.allowed and reservation.tokens == 30
+    assert store.get_pending("uid:a", DAY) == (0, 30)
+
+    assert store.commit(reservation, 12) == 12
+    assert store.get_pending("uid:a", DAY) == (12, 0)
+
+
+def test_release_charges_nothing(store):
+    _, reservation = reserve_quota(store, "uid:a", limit=100, estimated_tokens=30, day_key=DAY)
+    store.release(reservation)
+    assert store.get_pending("uid:a", DAY) == (0, 0)
+
+
+def test_reservations_cap_concurrent_requests(store):
+    _, first = reserve_quota(store, "uid:a", limit=50, estimated_tokens=40, day_key=DAY)
+    _, second = reserve_quota(store, "uid:a", limit=50, estimated_tokens=40, day_key=DAY)
+    # The second hold is capped at what remains; nothing is left for a third.
+    assert second.tokens == 10
+    decision, third = reserve_quota(store, "uid:a", limit=50, estimated_tokens=40, day_key=DAY)
+    assert third is None and not decision.allowed
+    assert not check_quota(store, "uid:a", 50, day_key=DAY).allowed
+
+    store.release(second)
+    store.commit(first, 20)
+    decision = check_quota(store, "uid:a", 50, day_key=DAY)
+    assert decision.allowed and decision.used == 20 and decision.remaining == 30
+
+
+def test_users_have_separate_budgets(store):
+    _, reservation = reserve_quota(store, "uid:a", limit=10, estimated_tokens=10, day_key=DAY)
+    store.commit(reservation, 10)
+    assert not check_quota(store, "uid:a", 10, day_key=DAY).allowed
+    assert check_quota(store, "uid:b", 10, day_key=DAY).allowed
+
+
+def test_local_usage_survives_flush_and_reopen(tmp_path):
+    db_path = str(tmp_path / "quota.sqlite3")
+    store = TokenQuotaStore(db_path, flush_interval=0)
+    _, reservation = reserve_quota(store, "uid:a", limit=100, estimated_tokens=30, day_key=DAY)
+    store.commit(reservation, 25)
+    store.close()
+
+    reopened = TokenQuotaStore(db_path, flush_interval=0)
+    assert reopened.get_used("uid:a", DAY) == 25
+    reopened.close()
+
+
+def test_shared_store_enforces_one_limit_across_processes(tmp_path):
+    db_path = str(tmp_path / "quota.sqlite3")
+    worker_a, worker_b = SharedTokenQuotaStore(db_path), SharedTokenQuotaStore(db_path)
+    try:
+        _, held = reserve_quota(worker_a, "uid:a", limit=50, estimated_tokens=50, day_key=DAY)
+        assert worker_b.get_pending("uid:a", DAY) == (0, 50)
+        decision, reservation = reserve_quota(worker_b, "uid:a", limit=50, estimated_tokens=10, day_key=DAY)
+        assert reservation is None and not decision.allowed
+
+        worker_a.commit(held, 30)
+        _, reservation = reserve_quota(worker_b, "uid:a", limit=50, estimated_tokens=50, day_key=DAY)
+        assert reservation.tokens == 20
+        worker_b.commit(reservation, 20)
+        assert worker_a.get_used("uid:a", DAY) == 50
+    finally:
+        worker_a.close()
+        worker_b.close()
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.core.rag_service import RAGService
+
+
+def test_an_index_rebuilt_by_another_worker_is_reloaded(rag_service, video_id, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "INDEX_VERSION_CHECK_SECONDS", 0)
+    other_worker = RAGService()
+
+    async def main():
+        await rag_service.aprocess_video(video_id=video_id)
+        await other_worker.arebuild_video(video_id)
+        # The manifest check runs off the loop and drops the stale copy.
+        assert await rag_service._acurrent_resident(video_id) is None
+        await rag_service.achat(video_id, "What did the guidance computer do?")
+        return rag_service.resident.get(video_id).version
+
+    try:
+        assert asyncio.run(main()) == 2
+    finally:
+        other_worker.sessions.close()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "built"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("v1", work) for _ in range(5)), flight.do("v2", work))
+
+    assert asyncio.run(main()) == ["built"] * 6
+    assert len(calls) == 2
+    assert flight.stats() == {"in_flight": 0, "executions": 2, "coalesced": 4}
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("no transcript")
+
+    async def main():
+        results = await asyncio.gather(flight.do("v1", fail), flight.do("v1", fail), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        with pytest.raises(ValueError):
+            await flight.do("v1", fail)
+
+    asyncio.run(main())
+    assert flight.executions == 2
+
+
+def test_a_cancelled_caller_does_not_abort_the_work():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "built"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("v1", work))
+        second = asyncio.ensure_future(flight.do("v1", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "built"
+
+
+def test_concurrent_process_requests_build_once(rag_service, video_id):
+    async def main():
+        return await asyncio.gather(*(rag_service.aprocess_video(video_id=video_id) for _ in range(4)))
+
+    results = asyncio.run(main())
+    assert {r["status"] for r in results} == {"processed"}
+    assert rag_service.single_flight.stats()["executions"] == 1
+    assert rag_service._current_resident(video_id).version == 1
+
+
+def test_rebuild_is_not_absorbed_by_an_in_flight_build(rag_service, video_id):
+    async def main():
+        await rag_service.aprocess_video(video_id=video_id)
+        await asyncio.gather(rag_service.arebuild_video(video_id), rag_service.arebuild_video(video_id))
+        return rag_service._current_resident(video_id).version
+
+    # The two rebuilds coalesce with each other only.
+    assert asyncio.run(main()) == 2
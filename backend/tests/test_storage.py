@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.rag_service import RAGService
+
+VIDEOS = ["vid0000000a", "vid0000000b", "vid0000000c", "vid0000000d"]
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """A RAGService with four synthetic videos, accessed oldest (a) to newest (d)"""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "VECTOR_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "TRANSCRIPT_FIXTURES_SYNTHETIC_SEGMENTS", 120)
+    service = RAGService()
+
+    async def ingest():
+        for video_id in VIDEOS:
+            await service.aprocess_video(video_id=video_id)
+
+    asyncio.run(ingest())
+    now = int(time.time())
+    service.manifest.touch_many({video_id: now - 3600 * (len(VIDEOS) - i) for i, video_id in enumerate(VIDEOS)})
+    yield service
+    service.sessions.close()
+
+
+def test_usage_counts_the_library_and_shared_databases(service):
+    usage = service.storage.usage()
+    assert usage["other"]["library"] > 0 and usage["other"]["manifest"] > 0
+    assert usage["used_bytes"] == usage["index_bytes"] + usage["transcript_bytes"] + usage["other_bytes"]
+
+
+def test_budget_evicts_least_recently_used_videos(service):
+    usage = service.storage.usage()
+    per_video = (usage["index_bytes"] + usage["transcript_bytes"] + usage["other"]["library"]) / len(VIDEOS)
+    # Room for the shared databases and about two and a half videos.
+    service.storage.max_bytes = int(usage["used_bytes"] - 1.5 * per_video)
+    service.storage.low_watermark = 1.0
+
+    result = service.collect_storage()
+    assert result["evicted_budget"] == 2
+    assert not service.is_processed(VIDEOS[0]) and not service.is_processed(VIDEOS[1])
+    assert service.is_processed(VIDEOS[2]) and service.is_processed(VIDEOS[3])
+    assert service.manifest.entry(VIDEOS[0]) is None
+    assert not service.storage.index_dir(VIDEOS[0]).exists()
+    assert VIDEOS[0] not in service.resident
+
+    library = service._get_library()
+    assert library.video_ids() == VIDEOS[2:]
+    # The evicted videos' library rows were compacted away, not just tombstoned.
+    assert library.dead_fraction() == 0
+    assert library.compactions >= 1
+    assert service.storage.usage()["used_bytes"] <= service.storage.max_bytes
+
+
+def test_videos_being_built_are_skipped(service):
+    service.storage.max_bytes = 1
+    with service.index_locks.try_lock(VIDEOS[0], "build") as acquired:
+        assert acquired
+        result = service.collect_storage()
+    assert result["skipped_busy"] == 1
+    assert service.is_processed(VIDEOS[0])
+    assert not any(service.is_processed(video_id) for video_id in VIDEOS[1:])
@@ -9,7 +9,15 @@ import {
   Check,
   MessageSquare,
 } from "lucide-react";
-import { sendMessage } from "../services/api";
+import { streamMessage } from "../services/api";
+
+const formatTimestamp = (seconds) => {
+  const total = Math.floor(seconds);
+  const h = Math.floor(total / 3600);
+  const m = Math.floor((total % 3600) / 60);
+  const s = String(total % 60).padStart(2, "0");
+  return h ? `${h}:${String(m).padStart(2, "0")}:${s}` : `${m}:${s}`;
+};
 
 function ChatInterface({ videoId }) {
   const [messages, setMessages] = useState([]);
@@ -46,12 +54,32 @@ function ChatInterface({ videoId }) {
       { role: "user", content: userMessage, timestamp: new Date() },
     ]);
 
+    let streamStarted = false;
+    let sources = [];
     try {
-      const response = await sendMessage(videoId, userMessage);
-      setMessages((prev) => [
-        ...prev,
-        { role: "assistant", content: response.answer, timestamp: new Date() },
-      ]);
+      await streamMessage(videoId, userMessage, {
+        onContext: (context) => {
+          sources = (context.sources || []).filter((s) => s.start != null);
+        },
+        onToken: (token) => {
+          if (!streamStarted) {
+            // First token: replace the typing indicator with the answer bubble.
+            streamStarted = true;
+            setIsLoading(false);
+            setMessages((prev) => [
+              ...prev,
+              { role: "assistant", content: token, sources, timestamp: new Date() },
+            ]);
+            return;
+          }
+          setMessages((prev) => {
+            const next = [...prev];
+            const last = next[next.length - 1];
+            next[next.length - 1] = { ...last, content: last.content + token };
+            return next;
+          });
+        },
+      });
     } catch (err) {
       const statusCode = err.response?.status;
       const backendDetail =
@@ -65,18 +93,21 @@ function ChatInterface({ videoId }) {
       } else {
         setError(backendDetail);
       }
-      setMessages((prev) => [
-        ...prev,
-        {
-          role: "assistant",
-          content:
-            statusCode === 429
-              ? quotaMessage
-              : "Sorry, I encountered an error. Please try again.",
-          timestamp: new Date(),
-          isError: true,
-        },
-      ]);
+      const errorMessage = {
+        role: "assistant",
+        content:
+          statusCode === 429
+            ? quotaMessage
+            : "Sorry, I encountered an error. Please try again.",
+        timestamp: new Date(),
+        isError: true,
+      };
+      // If the stream failed mid-answer, replace the partial bubble.
+      setMessages((prev) =>
+        streamStarted
+          ? [...prev.slice(0, -1), errorMessage]
+          : [...prev, errorMessage]
+      );
     } finally {
       setIsLoading(false);
       inputRef.current?.focus();
@@ -165,6 +196,24 @@ function ChatInterface({ videoId }) {
               >
                 <p className="whitespace-pre-wrap break-words">{msg.content}</p>
 
+                {msg.sources?.length > 0 && (
+                  <div className="mt-2 flex flex-wrap gap-1.5">
+                    {[...msg.sources]
+                      .sort((a, b) => a.start - b.start)
+                      .map((source) => (
+                        <a
+                          key={source.rank}
+                          href={`https://www.youtube.com/watch?v=${videoId}&t=${Math.floor(source.start)}s`}
+                          target="_blank"
+                          rel="noopener noreferrer"
+                          className="text-[11px] px-2 py-0.5 rounded-md bg-purple-50 dark:bg-purple-900/30 text-purple-600 dark:text-purple-300 border border-purple-200 dark:border-purple-800 hover:bg-purple-100 dark:hover:bg-purple-900/50"
+                        >
+                          {formatTimestamp(source.start)}
+                        </a>
+                      ))}
+                  </div>
+                )}
+
                 {msg.role === "assistant" && !msg.isError && (
                   <button
                     onClick={() => copyToClipboard(msg.content, i)}
@@ -2,6 +2,15 @@ import { useState } from 'react'
 import { Loader2, Play, AlertCircle, CheckCircle2, Link2, X } from 'lucide-react'
 import { processVideo } from '../services/api'
 
+const STAGE_LABELS = {
+  queued: 'Queued for processing...',
+  loading: 'Checking for an existing index...',
+  fetching: 'Fetching transcript...',
+  chunking: 'Splitting transcript...',
+  embedding: 'Creating embeddings...',
+  saving: 'Saving index...',
+}
+
 function VideoInput({ onVideoProcessed, onProcessingStart, isProcessing }) {
   const [youtubeUrl, setYoutubeUrl] = useState('')
   const [error, setError] = useState('')
@@ -40,8 +49,11 @@ function VideoInput({ onVideoProcessed, onProcessingStart, isProcessing }) {
 
     try {
       onProcessingStart()
-      setStatus('Fetching transcript and creating embeddings...')
-      const response = await processVideo(youtubeUrl)
+      setStatus('Queued for processing...')
+      const response = await processVideo(youtubeUrl, (job) => {
+        const label = STAGE_LABELS[job.stage]
+        if (label) setStatus(`${label} (${Math.round(job.progress * 100)}%)`)
+      })
 
       if (response.video_id) {
         setIsSuccess(true)
@@ -53,13 +53,33 @@ api.interceptors.response.use(
   }
 )
 
-export const processVideo = async (youtubeUrl) => {
+const JOB_POLL_INTERVAL_MS = 1000
+
+// Queue the video as a background job, then poll until it finishes.
+// onProgress({ stage, progress }) is called on every poll.
+export const processVideo = async (youtubeUrl, onProgress) => {
   try {
     ensureApiBaseUrl()
-    const response = await api.post('/api/v1/video/process', {
+    const submitted = await api.post('/api/v1/video/jobs', {
       youtube_url: youtubeUrl,
     })
-    return response.data
+    let job = submitted.data
+
+    while (job.status === 'queued' || job.status === 'running') {
+      onProgress?.(job)
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
+      const polled = await api.get(`/api/v1/video/jobs/${job.job_id}`)
+      job = polled.data
+    }
+
+    if (job.status === 'failed') {
+      const error = new Error(job.error || 'Failed to process video')
+      error.response = { status: 400, data: { detail: job.error } }
+      throw error
+    }
+
+    onProgress?.(job)
+    return { video_id: job.video_id, status: 'processed', message: 'Video processed successfully' }
   } catch (error) {
     console.error('Error processing video:', error)
     throw error
@@ -80,6 +100,72 @@ export const sendMessage = async (videoId, question) => {
   }
 }
 
+// Stream an answer over Server-Sent Events from /api/v1/chat/stream.
+// Calls onToken(text) per token and onContext(data) once; resolves with the `done` payload.
+// Errors mirror the axios shape (error.response.status / error.response.data.detail).
+export const streamMessage = async (videoId, question, { onToken, onContext } = {}) => {
+  ensureApiBaseUrl()
+  const response = await fetch(`${API_BASE_URL}/api/v1/chat/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Accept: 'text/event-stream',
+    },
+    body: JSON.stringify({ video_id: videoId, question }),
+  })
+
+  if (!response.ok || !response.body) {
+    let detail = `HTTP ${response.status}: ${response.statusText}`
+    try {
+      const data = await response.json()
+      detail = data?.detail || detail
+    } catch {
+      // Non-JSON error body; keep the status text.
+    }
+    const error = new Error(detail)
+    error.response = { status: response.status, data: { detail } }
+    throw error
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  let done = null
+
+  const handleEvent = (rawEvent) => {
+    let event = 'message'
+    const dataLines = []
+    for (const line of rawEvent.split('\n')) {
+      if (line.startsWith('event:')) event = line.slice(6).trim()
+      else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim())
+    }
+    if (!dataLines.length) return
+    const data = JSON.parse(dataLines.join('\n'))
+
+    if (event === 'token') onToken?.(data.text)
+    else if (event === 'context') onContext?.(data)
+    else if (event === 'done') done = data
+    else if (event === 'error') {
+      const error = new Error(data.detail || 'Failed to get response')
+      error.response = { status: data.status ?? 500, data }
+      throw error
+    }
+  }
+
+  for (;;) {
+    const { value, done: streamDone } = await reader.read()
+    if (streamDone) break
+    buffer += decoder.decode(value, { stream: true })
+    let boundary
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      handleEvent(buffer.slice(0, boundary))
+      buffer = buffer.slice(boundary + 2)
+    }
+  }
+
+  return done
+}
+
 export const checkVideoStatus = async (videoId) => {
   try {
     ensureApiBaseUrl()